@@ -1,9 +1,32 @@
-from flask import Flask, jsonify
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+from logging.handlers import RotatingFileHandler
+from typing import Any, Mapping, Optional
+
+from flask import Flask, jsonify
+
+from app.services.columnar_cache import columnar_cache
+from app.services.dataset_registry import (
+    DEFAULT_DATASET_TTL,
+    DEFAULT_MEMORY_BUDGET,
+    DatasetRegistry,
+)
+from app.services.export import export_manager
+from app.services.job_queue import DEFAULT_JOB_TTL, JobQueue, ThreadPoolBackend
+from app.services.model_registry import (
+    DEFAULT_MODEL_CACHE_SIZE,
+    DEFAULT_MODEL_TTL,
+    ModelRegistry,
+)
+from app.services.model_search import DEFAULT_N_JOBS
+from app.utils import http_cache
 from app.utils.exceptions import DataProcessingError, ValidationError
 from app.utils.json_encoder import CustomJSONProvider
+from app.utils.metrics import instrument
+
+# Rotate the log at 10 MB rather than every few requests
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 ** 2
 
 def register_error_handlers(app):
     @app.errorhandler(ValidationError)
@@ -22,22 +45,32 @@ def register_error_handlers(app):
     def handle_server_error(error):
         return jsonify({'error': 'Internal server error'}), 500
 
-def create_app():
+def create_app(config: Optional[Mapping[str, Any]] = None):
+    """
+    Create the application.
+    Settings are read from YUGEN_* environment variables (e.g.
+    YUGEN_DATASET_MEMORY_BUDGET), then from config; anything left unset
+    falls back to the defaults below.
+    """
     app = Flask(__name__, 
         static_folder='static',
         template_folder='templates'
     )
+    app.config.from_prefixed_env('YUGEN')
+    if config:
+        app.config.update(config)
     app.json = CustomJSONProvider(app)
-    os.makedirs('instance', exist_ok=True)
+    os.makedirs(app.instance_path, exist_ok=True)
     # Register error handlers
     register_error_handlers(app)
     
     if not os.path.exists('logs'):
         os.mkdir('logs')
     
+    app.config.setdefault('LOG_MAX_BYTES', DEFAULT_LOG_MAX_BYTES)
     file_handler = RotatingFileHandler(
         'logs/yugen.log',
-        maxBytes=10240,
+        maxBytes=app.config['LOG_MAX_BYTES'],
         backupCount=10
     )
     file_handler.setFormatter(logging.Formatter(
@@ -45,11 +78,77 @@ def create_app():
     ))
     app.logger.addHandler(file_handler)
     app.logger.setLevel(logging.INFO)
+    # The services log to 'yugen'; send it to the same file
+    service_logger = logging.getLogger('yugen')
+    if not any(isinstance(h, RotatingFileHandler) for h in service_logger.handlers):
+        service_logger.addHandler(file_handler)
+    service_logger.setLevel(logging.INFO)
+    
+    # Request timing, body sizes and the opt-in per-request profiler
+    instrument(app)
+    
+    # ETags, Cache-Control and compression for the profile and visualize responses
+    http_cache.configure(app)
+    
+    # Set YUGEN_SECRET_KEY in production; sessions signed with the default can be forged
+    # (Flask predefines SECRET_KEY as None, so setdefault would never apply)
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = 'secret-key'
     
-    app.secret_key = 'secret-key'
+    # Parsed uploads are cached by content hash and shared by both services
+    columnar_cache.configure(
+        cache_dir=app.config.get('COLUMNAR_CACHE_DIR'),
+        max_bytes=app.config.get('COLUMNAR_CACHE_MAX_BYTES')
+    )
+    
+    # Per-session datasets, spilled to disk when over the memory budget
+    # and removed after DATASET_TTL idle seconds
+    app.config.setdefault('DATASET_MEMORY_BUDGET', DEFAULT_MEMORY_BUDGET)
+    app.config.setdefault('DATASET_SPILL_DIR', None)
+    app.config.setdefault('DATASET_TTL', DEFAULT_DATASET_TTL)
+    app.extensions['datasets'] = DatasetRegistry(
+        memory_budget=app.config['DATASET_MEMORY_BUDGET'],
+        spill_dir=app.config['DATASET_SPILL_DIR'],
+        ttl=app.config['DATASET_TTL']
+    )
+    
+    # Exports are written lazily and expire after EXPORT_TTL seconds
+    export_manager.configure(
+        directory=app.config.get('EXPORT_DIR'),
+        ttl=app.config.get('EXPORT_TTL')
+    )
+    
+    # Background jobs for long uploads, cleaning and training
+    app.config.setdefault('JOB_WORKERS', None)
+    app.config.setdefault('JOB_TTL', DEFAULT_JOB_TTL)
+    jobs = JobQueue(
+        backend=ThreadPoolBackend(max_workers=app.config['JOB_WORKERS']),
+        ttl=app.config['JOB_TTL']
+    )
+    app.extensions['jobs'] = jobs
+    atexit.register(jobs.shutdown)
+    
+    # Worker processes for cross-validated model search, -1 for all cores
+    app.config.setdefault('MODEL_SEARCH_JOBS', DEFAULT_N_JOBS)
+    
+    # Trained models are persisted and loaded on demand for /models/<id>/predict.
+    # They are deleted with their dataset, or after MODEL_TTL seconds without use
+    app.config.setdefault('MODEL_DIR', os.path.join(app.instance_path, 'models'))
+    app.config.setdefault('MODEL_CACHE_SIZE', DEFAULT_MODEL_CACHE_SIZE)
+    app.config.setdefault('MODEL_TTL', DEFAULT_MODEL_TTL)
+    models = ModelRegistry(
+        directory=app.config['MODEL_DIR'],
+        cache_size=app.config['MODEL_CACHE_SIZE'],
+        ttl=app.config['MODEL_TTL']
+    )
+    app.extensions['models'] = models
+    app.extensions['datasets'].on_remove(models.remove_owner)
     
-    from app.routes import data_routes
+    from app.routes import data_routes, job_routes, metrics_routes, model_routes
     app.register_blueprint(data_routes.bp)
+    app.register_blueprint(job_routes.bp)
+    app.register_blueprint(model_routes.bp)
+    app.register_blueprint(metrics_routes.bp)
     
     app.logger.info('Yugen startup')
     return app
\ No newline at end of file
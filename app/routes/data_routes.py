@@ -1,15 +1,232 @@
-from flask import Blueprint, jsonify, request, render_template, session
-import numpy as np
-import pandas as pd
+import json
+import logging
 from pathlib import Path
-import tempfile
+
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    render_template,
+    request,
+    send_file,
+    session,
+    stream_with_context,
+)
+
 from app.services.data_service import DataService
-from app.services.model_service import ModelService
-import atexit
+from app.services.dataset_registry import DatasetRegistry
+from app.services.downsampling import (
+    DEFAULT_BINS,
+    DEFAULT_MAX_POINTS,
+    MAX_BINS,
+    MAX_POINTS_LIMIT,
+)
+from app.services.export import EXPORT_FORMATS, export_manager, iter_csv
+from app.services.file_reader import ENGINE_NAMES
+from app.services.incremental import DEFAULT_EPOCHS, DEFAULT_TRAIN_CHUNKSIZE
+from app.services.job_queue import JobQueue
+from app.services.model_registry import ModelRegistry
+from app.services.model_search import DEFAULT_FOLDS, DEFAULT_N_ITER
+from app.services.row_browser import DEFAULT_PAGE_ROWS
+from app.services.upload import receive_upload
+from app.utils.arrow_ipc import (
+    arrow_response,
+    profile_response,
+    trace_response,
+    wants_arrow,
+)
+from app.utils.exceptions import ValidationError
+from app.utils.http_cache import cacheable, make_etag, not_modified
+
+logger = logging.getLogger('yugen')
 
 bp = Blueprint('data', __name__, url_prefix='/')
-data_service = DataService()
-model_service = ModelService()
+
+def get_registry() -> DatasetRegistry:
+    return current_app.extensions['datasets']
+
+def get_jobs() -> JobQueue:
+    return current_app.extensions['jobs']
+
+def wants_async() -> bool:
+    return request.args.get('async', 'false').lower() == 'true'
+
+def session_dataset_id(create: bool = False) -> str:
+    """
+    Get the id of the dataset bound to the current session.
+    Args:
+        create (bool): Register a new dataset if the session has none.
+    Returns:
+        str: The dataset id.
+    """
+    registry = get_registry()
+    dataset_id = session.get('dataset_id')
+    if not registry.exists(dataset_id):
+        if not create:
+            raise ValidationError("No data loaded")
+        dataset_id = registry.create()
+        session['dataset_id'] = dataset_id
+    return dataset_id
+
+def checkout_dataset(create: bool = False):
+    """
+    Check out the dataset bound to the current session.
+    Args:
+        create (bool): Register a new dataset if the session has none.
+    Returns:
+        ContextManager[DatasetEntry]: The locked dataset entry.
+    """
+    return get_registry().checkout(session_dataset_id(create))
+
+def dataset_etag(*params):
+    """
+    ETag of the session dataset's response for params in its last known state, or None
+    """
+    dataset_id = session.get('dataset_id')
+    token = get_registry().state_token(dataset_id)
+    if token is None:
+        return None
+    return make_etag(dataset_id, token, *params)
+
+def submit_job(kind: str, fn, *args):
+    """Run fn(*args, progress=...) as a background job and answer 202 with its id"""
+    job = get_jobs().submit(
+        kind,
+        lambda job: fn(*args, progress=job.report),
+        owner=session.get('dataset_id'),
+    )
+    return jsonify(
+        {'job_id': job.id, 'status': job.status, 'status_url': f'/jobs/{job.id}'}
+    ), 202
+
+def process_upload(registry: DatasetRegistry, dataset_id: str, temp_path: Path,
+                   engine=None, progress=None):
+    """
+    Parse an uploaded file into a dataset, removing the file if
+    parsing fails or is cancelled
+    """
+    try:
+        with registry.checkout(dataset_id) as dataset:
+            return dataset.data_service.process_file(
+                temp_path, progress=progress, engine=engine
+            )
+    except BaseException:
+        # JobCancelled is a BaseException
+        temp_path.unlink(missing_ok=True)
+        raise
+
+def reuse_upload(registry: DatasetRegistry, dataset_id: str, digest: str):
+    """
+    Load a dataset from a resident dataset with an identical upload, skipping the parse.
+    Args:
+        registry (DatasetRegistry): The dataset registry.
+        dataset_id (str): The dataset to load.
+        digest (str): Content digest of the upload.
+    Returns:
+        Optional[Dict[str, Any]]: The data info, or None without a match.
+    """
+    source_id = registry.find_by_digest(digest)
+    if source_id is None:
+        return None
+    if source_id != dataset_id:
+        # Copy the references out under the source's lock, so two
+        # locks are never held at once
+        with registry.checkout(source_id) as source:
+            if source.data_service.get_source_digest() != digest:
+                return None
+            snapshot = DataService()
+            snapshot.adopt_source(source.data_service)
+    with registry.checkout(dataset_id) as dataset:
+        data_service = dataset.data_service
+        result = data_service.adopt_source(
+            snapshot if source_id != dataset_id else data_service
+        )
+        return result
+
+def receive_request_file():
+    """
+    Stream the uploaded file to disk, hashing it on the way.
+    Accepts a multipart 'file' field, or the raw file as the request body with a
+    'filename' query parameter, which avoids buffering the body for form parsing.
+    Returns:
+        Tuple[Path, str]: The temporary file and its content digest.
+    """
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            raise ValidationError("No file part")
+        file = request.files['file']
+        filename, stream = file.filename, file.stream
+    else:
+        filename, stream = request.args.get('filename'), request.stream
+    if not filename:
+        raise ValidationError("No selected file")
+    if not filename.endswith(('.csv', '.xlsx')):
+        raise ValidationError("Invalid file type")
+    return receive_upload(stream, Path(filename).suffix)
+
+def clean_dataset(registry: DatasetRegistry, dataset_id: str, options, progress=None):
+    """Clean a dataset; the result is only written to disk when exported"""
+    with registry.checkout(dataset_id) as dataset:
+        return dataset.data_service.clean_data(options, progress=progress)
+
+def train_model(registry: DatasetRegistry, models: ModelRegistry, dataset_id: str, data,
+                n_jobs=None, progress=None):
+    """
+    Fit a model on a dataset's current frame, shared with its
+    model service, and register it.
+    A 'search' object in data runs a cross-validated search instead of a single linear
+    regression, and a 'streaming' object trains chunk by chunk, reading the uploaded
+    file itself while the data is untransformed.
+    """
+    with registry.checkout(dataset_id) as dataset:
+        results = fit_model(
+            dataset.data_service, dataset.model_service, data, n_jobs, progress
+        )
+        # The results may be the model service's cached fit, so they are copied, and a
+        # reused fit is registered again since its earlier version may have been pruned
+        results = dict(results)
+        model, imputation_means = dataset.model_service.get_model()
+        results['model_id'] = models.register(
+            model, results, imputation_means, owner=dataset_id
+        )
+        return results
+
+def fit_model(data_service, model_service, data, n_jobs=None, progress=None):
+    """Run the training mode requested in data"""
+    model_service.attach(data_service.get_data(), data_service.get_version())
+    search = data.get('search')
+    streaming = data.get('streaming')
+    if streaming:
+        return model_service.train_incremental(
+            data['feature_columns'],
+            data['target_column'],
+            float(data['test_size']),
+            solver=streaming.get('solver', 'ols'),
+            chunksize=streaming.get('chunksize', DEFAULT_TRAIN_CHUNKSIZE),
+            epochs=streaming.get('epochs', DEFAULT_EPOCHS),
+            file_path=data_service.get_source_file(),
+            progress=progress
+        )
+    if search:
+        return model_service.search_models(
+            data['feature_columns'],
+            data['target_column'],
+            float(data['test_size']),
+            estimators=search.get('estimators'),
+            method=search.get('method', 'grid'),
+            folds=search.get('folds', DEFAULT_FOLDS),
+            n_iter=search.get('n_iter', DEFAULT_N_ITER),
+            n_jobs=n_jobs,
+            progress=progress,
+            precision=data.get('precision', 'float64')
+        )
+    return model_service.train_linear_regression(
+        data['feature_columns'],
+        data['target_column'],
+        float(data['test_size']),
+        progress=progress,
+        precision=data.get('precision', 'float64')
+    )
 
 @bp.route('/')
 def index():
@@ -19,45 +236,67 @@ def index():
 def upload_file():
     """
     Route to upload a data file.
-    This route handles POST requests to upload a CSV or Excel file, saves it to a temporary location, processes it, and returns the result.
+    This route handles POST requests to upload a CSV or Excel file, streams it to a
+    temporary location, processes it, and returns the result.
+    The file is sent as a multipart 'file' field, or as the raw request body
+    with a 'filename' query parameter.
+    A file identical to one already loaded reuses that parse instead of parsing again.
+    The 'engine' query parameter picks the reader (pandas, pyarrow, parallel or
+    calamine); by default it is chosen from the file type and size. The result's
+    'ingest' entry names the engine used.
+    With async=true the file is parsed in a background job and a job
+    id is returned with status 202.
+    Clients accepting application/vnd.apache.arrow.stream get the
+    preview rows as an Arrow IPC stream.
     Returns:
-        Response: A JSON response containing the result of the file processing or an error message.
+        Response: A JSON response containing the result of the file
+            processing or an error message.
     Raises:
-        Exception: If an error occurs during file upload or processing, a JSON response with the error message and a 500 status code is returned.
+        Exception: If an error occurs during file upload or processing, a JSON response
+            with the error message and a 500 status code is returned.
     """
     
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-        
-    file = request.files['file']
+    engine = request.args.get('engine')
+    if engine is not None and engine not in ENGINE_NAMES:
+        error = f"Unknown engine: {engine}. Use one of: {', '.join(ENGINE_NAMES)}"
+        return jsonify({'error': error}), 400
     
-    if not file.filename or file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-        
-    if not file.filename.endswith(('.csv', '.xlsx')):
-        return jsonify({'error': 'Invalid file type'}), 400
-
     temp_path = None
     try:
-        # Create temp file with correct extension
-        suffix = Path(file.filename).suffix
-        temp_dir = tempfile.gettempdir()
-        temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False, dir=temp_dir)
-        temp_path = Path(temp_file.name)
-        
-        # Save uploaded file to temp location
-        file.save(temp_path)
+        try:
+            temp_path, digest = receive_request_file()
+        except ValidationError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Process file
-        result = data_service.process_file(temp_path)
+        registry = get_registry()
+        dataset_id = session_dataset_id(create=True)
         
-        # Store temp path in session
-        session['file_path'] = str(temp_path)
+        # An identical file already loaded in memory is reused without parsing
+        reused = reuse_upload(registry, dataset_id, digest)
+        if reused is not None:
+            temp_path.unlink(missing_ok=True)
+            temp_path = None
+            result = reused
+            if wants_async():
+                return submit_job('upload', lambda progress=None: result)
+        elif wants_async():
+            return submit_job(
+                'upload', process_upload, registry, dataset_id, temp_path, engine
+            )
+        else:
+            result = process_upload(registry, dataset_id, temp_path, engine)
+        preview_df = None
+        if wants_arrow(request):
+            with registry.checkout(dataset_id) as dataset:
+                preview_df = dataset.data_service.get_preview()
         
+        if preview_df is not None:
+            result.pop('preview')
+            return arrow_response(preview_df, result)
         return jsonify(result)
     
     except Exception as e:
-        print("Upload error:", str(e))
+        logger.error(f"Upload error: {str(e)}")
         if temp_path:
             temp_path.unlink(missing_ok=True)
         return jsonify({'error': str(e)}), 500
@@ -67,39 +306,174 @@ def get_profiling_data():
     """
     Route to get profiling data.
     This route handles GET requests to retrieve profiling data from the data service.
+    Pass approximate=true to use sketch-based statistics for very large datasets.
+    Clients accepting application/vnd.apache.arrow.stream get the
+    numeric summary as an Arrow IPC stream.
+    Responses carry an ETag for the dataset version; a matching
+    If-None-Match is answered with 304 before the dataset is touched. Large
+    bodies are compressed with zstd or gzip.
     Returns:
         Response: A JSON response containing profiling data or an error message.
     Raises:
-        Exception: If an error occurs while retrieving the profiling data, a JSON response with the error message and a 500 status code is returned.
+        Exception: If an error occurs while retrieving the profiling data, a JSON
+            response with the error message and a 500 status code is returned.
+    """
+    
+    try:
+        approximate = request.args.get('approximate', 'false').lower() == 'true'
+        arrow = wants_arrow(request)
+        params = ('profile', approximate, arrow)
+        cached = not_modified(dataset_etag(*params))
+        if cached is not None:
+            return cached
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.profiling(approximate=approximate)
+            etag = make_etag(
+                dataset.dataset_id, dataset.data_service.get_state_token(), *params
+            )
+        return cacheable(profile_response(result) if arrow else jsonify(result), etag)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+@bp.route('/data/rows', methods=['GET'])
+def get_rows():
+    """
+    Route to browse the current data a page at a time.
+    Query parameters: offset and limit, or after=<row label> for keyset paging;
+    sort=<column> with order=asc|desc; filters=<JSON list of {column, op, value}>;
+    columns=<comma separated>.
+    The sorted, filtered row order is cached, so later pages
+    cost only the rows they return.
+    Clients accepting application/vnd.apache.arrow.stream get the
+    page as an Arrow IPC stream.
+    Returns:
+        Response: A JSON response with the page and paging
+            metadata, or an error message.
     """
     
     try:
-        result = data_service.profiling()
+        try:
+            filters = json.loads(request.args.get('filters', '[]'))
+        except ValueError:
+            raise ValidationError("filters must be a JSON list") from None
+        if not isinstance(filters, list):
+            raise ValidationError("filters must be a JSON list")
+        after = request.args.get('after')
+        if after is not None:
+            # Row labels are the integer positions of the uploaded rows
+            try:
+                after = int(after)
+            except ValueError:
+                raise ValidationError("after must be a row label") from None
+        order = request.args.get('order', 'asc').lower()
+        if order not in ('asc', 'desc'):
+            raise ValidationError("order must be asc or desc")
+        arrow = wants_arrow(request)
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.get_rows(
+                offset=request.args.get('offset', 0, type=int),
+                limit=request.args.get('limit', DEFAULT_PAGE_ROWS, type=int),
+                sort=request.args.get('sort') or None,
+                descending=order == 'desc',
+                filters=filters,
+                after=after,
+                columns=[c for c in request.args.get('columns', '').split(',') if c]
+                or None,
+                raw=arrow,
+            )
+        if arrow:
+            return arrow_response(result.pop('data'), result)
         return jsonify(result)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
-@bp.route('/data/visualize', methods=['POST'])
+@bp.route('/data/duplicates', methods=['GET'])
+def get_duplicates():
+    """
+    Route to report duplicate rows.
+    The optional 'columns' query parameter (comma separated) restricts the key to a
+    subset of columns, and 'limit' caps the number of most repeated keys returned.
+    Returns:
+        Response: A JSON response with duplicate counts and the most
+            repeated keys, or an error message.
+    """
+    
+    try:
+        columns = [c for c in request.args.get('columns', '').split(',') if c] or None
+        limit = request.args.get('limit', 10, type=int)
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.duplicate_report(columns, limit=limit)
+        return jsonify(result)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+@bp.route('/data/visualize', methods=['GET', 'POST'])
 def create_visualization():
     """
     Route to create a data visualization.
-    This route handles POST requests to generate a plot based on the provided plot type and data columns.
+    This route handles POST requests to generate a plot based on the
+    provided plot type and data columns.
+    GET takes the same fields as query parameters, so browsers can
+    cache and revalidate the result.
+    Clients sending 'Accept: application/vnd.apache.arrow.stream' get
+    the trace as an Arrow IPC stream.
+    Optional JSON fields: 'bins' (histogram/heatmap resolution), 'max_points'
+    (scatter point budget) and 'strategy' ('sample' or 'density') for scatter plots
+    with more points than the budget.
+    Responses carry an ETag for the dataset version and parameters; a
+    GET with a matching If-None-Match is answered with 304. Large bodies
+    are compressed with zstd or gzip.
     Returns:
         Response: A JSON response containing the data for plotting or an error message.
     Raises:
-        Exception: If an error occurs while generating the plot, a JSON response with the error message and a 500 status code is returned.
+        Exception: If an error occurs while generating the plot, a JSON response with
+            the error message and a 500 status code is returned.
     """
     
     try:
-        if not request.json:
+        options = (
+            request.args if request.method == 'GET' else request.get_json(silent=True)
+        )
+        if not options:
             return jsonify({'error': 'No JSON data provided'}), 400
             
-        plot_type = request.json.get('type')
-        x = request.json.get('x')
-        y = request.json.get('y')
+        plot_type = options.get('type')
+        x = options.get('x')
+        y = options.get('y') or None
+        bins = min(max(int(options.get('bins') or DEFAULT_BINS), 1), MAX_BINS)
+        max_points = min(
+            max(int(options.get('max_points') or DEFAULT_MAX_POINTS), 1),
+            MAX_POINTS_LIMIT,
+        )
+        strategy = options.get('strategy') or 'sample'
+        if strategy not in ('sample', 'density'):
+            return jsonify({'error': f'Unsupported strategy: {strategy}'}), 400
         
-        result = data_service.get_plot_data(plot_type, x, y)
-        return jsonify(result)
+        arrow = wants_arrow(request)
+        params = ('visualize', plot_type, x, y, bins, max_points, strategy, arrow)
+        cached = not_modified(dataset_etag(*params))
+        if cached is not None:
+            return cached
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.get_plot_data(
+                plot_type,
+                x,
+                y,
+                bins=bins,
+                max_points=max_points,
+                strategy=strategy,
+                raw=arrow,
+            )
+            etag = make_etag(
+                dataset.dataset_id, dataset.data_service.get_state_token(), *params
+            )
+        return cacheable(
+            trace_response(result['data'][0]) if arrow else jsonify(result), etag
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -108,12 +482,16 @@ def clean_data():
     """
     Route to clean data.
     This route handles POST requests to clean the data based on provided options. 
+    With async=true cleaning runs in a background job and a job id
+    is returned with status 202.
     Args:
         None
     Returns:
         Response: A JSON response containing the cleaned data or an error message.
     Raises:
-        Exception: If an error occurs while cleaning the data, a JSON response with the error message and a 500 status code is returned.
+        Exception: Invalid steps or values (e.g. an ordering filter on an
+            unordered column) get a 400; any other error while cleaning the data
+            gets a 500 with the error message.
     """
     
     options = request.json
@@ -122,30 +500,101 @@ def clean_data():
         return jsonify({'error': 'No JSON data provided'}), 400
     
     try:
-        result = data_service.clean_data(options)
+        registry = get_registry()
+        dataset_id = session_dataset_id()
+        if wants_async():
+            return submit_job('clean', clean_dataset, registry, dataset_id, options)
         
-        if 'data' in result:
-            original_path = Path(session['file_path'])
-            suffix = original_path.suffix
-            
-            temp_dir = tempfile.gettempdir()
-            
-            cleaned_temp_file = tempfile.NamedTemporaryFile(
-                suffix=f"_cleaned{suffix}", 
-                delete=False, 
-                dir=temp_dir
+        result = clean_dataset(registry, dataset_id, options)
+        return jsonify(result)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/data/export', methods=['GET'])
+def export_data():
+    """
+    Route to download the current (cleaned) data.
+    The 'format' query parameter selects csv, parquet or xlsx; it
+    defaults to the uploaded file's type.
+    CSV is streamed in row chunks; parquet and xlsx are written once per dataset state
+    to a temporary file that is removed after EXPORT_TTL seconds without use.
+    Returns:
+        Response: The file as an attachment, or a JSON error message.
+    """
+    
+    try:
+        dataset_id = session_dataset_id()
+        with get_registry().checkout(dataset_id) as dataset:
+            df = dataset.data_service.get_data()
+            state_token = dataset.data_service.get_state_token()
+            # Set by the upload only once its parse completed
+            file_path = dataset.data_service.get_file_path()
+        
+        default_format = Path(file_path or 'data.csv').suffix.lstrip('.') or 'csv'
+        fmt = request.args.get('format', default_format).lower()
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+        
+        download_name = f"cleaned.{fmt}"
+        if fmt == 'csv':
+            return current_app.response_class(
+                stream_with_context(iter_csv(df)),
+                mimetype=EXPORT_FORMATS[fmt],
+                headers={'Content-Disposition': f'attachment; filename={download_name}'}
             )
-            cleaned_temp_path = Path(cleaned_temp_file.name)
-            
-            cleaned_df = result['data']
-            if suffix == '.csv':
-                cleaned_df.to_csv(cleaned_temp_path, index=False)
-            elif suffix == '.xlsx':
-                cleaned_df.to_excel(cleaned_temp_path, index=False)
-                     
-            session['cleaned_file_path'] = str(cleaned_temp_path)
-            
-            
+        path = export_manager.materialize(df, f"{dataset_id}_{state_token}", fmt)
+        return send_file(
+            path,
+            mimetype=EXPORT_FORMATS[fmt],
+            as_attachment=True,
+            download_name=download_name,
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/data/reset', methods=['POST'])
+def reset_data():
+    """
+    Route to reset the data to its uploaded state.
+    Returns:
+        Response: A JSON response containing the data info or an error message.
+    """
+    
+    try:
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.reset_data()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/data/undo', methods=['POST'])
+def undo_transformation():
+    """
+    Route to revert the most recent cleaning step.
+    Returns:
+        Response: A JSON response containing the data info or an error message.
+    """
+    
+    try:
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.undo()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/data/redo', methods=['POST'])
+def redo_transformation():
+    """
+    Route to re-apply the most recently undone cleaning step.
+    Returns:
+        Response: A JSON response containing the data info or an error message.
+    """
+    
+    try:
+        with checkout_dataset() as dataset:
+            result = dataset.data_service.redo()
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -155,15 +604,25 @@ def modeling():
     """
     Handle the '/modeling' route for both GET and POST requests.
     GET:
-        - Checks if 'file_path' is in the session.
-        - Loads data from the file path stored in the session.
-        - Returns a JSON response with the numeric columns of the dataframe.
+        - Returns a JSON response with the numeric columns of the
+          session's current dataset.
     POST:
         - Expects JSON data with 'feature_columns', 'target_column', and 'test_size'.
-        - Trains a linear regression model using the provided data.
-        - Returns a JSON response with the training results.
+        - Trains a linear regression model on the current (cleaned) data, reusing the
+          fit if the data and parameters are unchanged.
+        - An optional 'search' object ({'estimators', 'method', 'folds', 'n_iter'})
+          cross-validates LinearRegression/Ridge/Lasso/ElasticNet candidates in parallel
+          and keeps the best one; per-fold metrics and timings are returned under 'cv'.
+        - An optional 'streaming' object ({'solver': 'ols' or 'sgd', 'chunksize',
+          'epochs'}) trains in passes over row chunks with a hash-assigned
+          holdout, keeping working memory bounded.
+        - An optional 'precision' of 'float32' halves the cached feature matrix.
+        - Registers the trained model and returns the training results with its
+          'model_id', usable with /models/<model_id>/predict.
+        - With async=true training runs in a background job and a job
+          id is returned with status 202.
     Returns:
-        - JSON response with error message and status code 400 if 'file_path' is not in the session or file does not exist.
+        - JSON response with error message and status code 400 if no data is loaded.
         - JSON response with numeric columns and success status for GET requests.
         - JSON response with training results for POST requests.
         - JSON response with error message and status code 500 for any exceptions.
@@ -172,34 +631,31 @@ def modeling():
     """
     
     try:
-        if 'file_path' not in session:
+        registry = get_registry()
+        if not registry.exists(session.get('dataset_id')):
             return jsonify({'error': 'No data available'}), 400
-            
-        file_path = Path(session['file_path'])
-        
-        model_service.load_data(file_path)
-        
-        if not file_path.exists():
-            return jsonify({'error': f'File not found: {file_path}'}), 400
+        dataset_id = session['dataset_id']
         
         if request.method == 'GET':
-            df = pd.read_json(session['df'])
-            numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+            with registry.checkout(dataset_id) as dataset:
+                numeric_columns = dataset.data_service.get_numeric_columns()
             return jsonify({
                 'numeric_columns': numeric_columns,
                 'success': True
             })            
         elif request.method == 'POST':
             data = request.get_json()
-            results = model_service.train_linear_regression(
-                data['feature_columns'],
-                data['target_column'],
-                float(data['test_size'])
-            )
+            n_jobs = current_app.config['MODEL_SEARCH_JOBS']
+            models = current_app.extensions['models']
+            if wants_async():
+                return submit_job(
+                    'train', train_model, registry, models, dataset_id, data, n_jobs
+                )
+            results = train_model(registry, models, dataset_id, data, n_jobs)
             return jsonify(results)
         else:
             return jsonify({'error': 'Method not allowed'}), 405
         
     except Exception as e:
-        print("Modeling error:", str(e))
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        logger.error(f"Modeling error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
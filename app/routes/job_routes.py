@@ -0,0 +1,40 @@
+from flask import Blueprint, current_app, jsonify, session
+
+from app.services.job_queue import JobQueue
+
+bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+def get_jobs() -> JobQueue:
+    return current_app.extensions['jobs']
+
+@bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Route to poll a background job.
+    Returns:
+        Response: A JSON response with the job status, progress and, once
+            finished, its result or error.
+    """
+    
+    try:
+        job = get_jobs().get(job_id, owner=session.get('dataset_id'))
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
+
+@bp.route('/<job_id>', methods=['DELETE'])
+@bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Route to cancel a background job.
+    Queued jobs are cancelled immediately; running jobs stop at
+    their next progress checkpoint.
+    Returns:
+        Response: A JSON response with the job status.
+    """
+    
+    try:
+        job = get_jobs().cancel(job_id, owner=session.get('dataset_id'))
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
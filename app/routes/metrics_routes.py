@@ -0,0 +1,57 @@
+from flask import Blueprint, current_app
+
+from app.services.columnar_cache import columnar_cache
+from app.utils.metrics import PROMETHEUS_MIMETYPE, metrics, render_family
+
+bp = Blueprint('metrics', __name__)
+
+def state_metrics():
+    """Gauges read from the services at scrape time"""
+    datasets = current_app.extensions['datasets']
+    stats = datasets.stats()
+    lines = render_family(
+        'yugen_datasets',
+        'gauge',
+        'Registered datasets, by residency',
+        [
+            ({'state': 'resident'}, stats['resident']),
+            ({'state': 'spilled'}, stats['datasets'] - stats['resident']),
+        ],
+    )
+    # Aggregates only: dataset ids are session keys and would
+    # make the label set unbounded
+    lines += render_family('yugen_dataset_memory_bytes', 'gauge',
+                           'Deep DataFrame memory of all resident datasets',
+                           [({}, stats['memory_usage'])])
+    lines += render_family('yugen_dataset_memory_max_bytes', 'gauge',
+                           'Deep DataFrame memory of the largest resident dataset',
+                           [({}, datasets.largest_memory_usage())])
+    lines += render_family('yugen_dataset_memory_budget_bytes', 'gauge',
+                           'Memory budget before datasets are spilled to disk',
+                           [({}, stats['memory_budget'])])
+    lines += render_family(
+        'yugen_jobs',
+        'gauge',
+        'Tracked background jobs, by status',
+        [
+            ({'status': status}, count)
+            for status, count in current_app.extensions['jobs'].stats().items()
+        ],
+    )
+    lookups = columnar_cache.hits + columnar_cache.misses
+    lines += render_family('yugen_columnar_cache_hit_ratio', 'gauge',
+                           'Share of uploads served from the columnar cache',
+                           [({}, columnar_cache.hits / lookups if lookups else 0.0)])
+    return lines
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Route exposing request, stage and cache metrics in the Prometheus text format.
+    Returns:
+        Response: The metrics as text/plain.
+    """
+
+    return current_app.response_class(
+        metrics.render(state_metrics()), content_type=PROMETHEUS_MIMETYPE
+    )
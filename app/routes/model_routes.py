@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from flask import Blueprint, current_app, jsonify, request, session
+
+from app.services.model_registry import ModelRegistry
+from app.utils.arrow_ipc import (
+    arrow_response,
+    is_arrow_request,
+    read_arrow_frame,
+    wants_arrow,
+)
+from app.utils.exceptions import ValidationError
+from app.utils.serialization import to_json_list
+
+bp = Blueprint('models', __name__, url_prefix='/models')
+
+def get_models() -> ModelRegistry:
+    return current_app.extensions['models']
+
+def feature_matrix(feature_columns) -> np.ndarray:
+    """
+    Read the rows to score from the request, ordered as the model's features.
+    Accepts an Arrow IPC stream, or JSON with either 'columns' ({name: [values]}) or
+    'rows' ([[values in feature order]]). Missing values may be null.
+    Returns:
+        np.ndarray: Float matrix with NaN for missing values.
+    """
+    if is_arrow_request(request):
+        df = read_arrow_frame(request.get_data())
+    else:
+        payload = request.get_json(silent=True) or {}
+        if 'columns' in payload:
+            df = pd.DataFrame(payload['columns'])
+        elif 'rows' in payload:
+            rows = payload['rows']
+            if any(len(row) != len(feature_columns) for row in rows):
+                raise ValidationError(
+                    f"Each row must have {len(feature_columns)} values"
+                )
+            df = pd.DataFrame(rows, columns=feature_columns)
+        else:
+            raise ValidationError("Provide 'columns' or 'rows', or an Arrow stream")
+    missing = [col for col in feature_columns if col not in df.columns]
+    if missing:
+        raise ValidationError(f"Missing feature columns: {', '.join(missing)}")
+    try:
+        return (
+            np.column_stack(
+                [
+                    df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                    for col in feature_columns
+                ]
+            )
+            if len(df)
+            else np.empty((0, len(feature_columns)))
+        )
+    except (TypeError, ValueError) as e:
+        raise ValidationError(f"Feature values must be numeric: {str(e)}") from e
+
+@bp.route('', methods=['GET'])
+def list_models():
+    """
+    Route to list the models trained on the session's dataset.
+    Returns:
+        Response: A JSON response with the model metadata, newest first.
+    """
+
+    try:
+        dataset_id = session.get('dataset_id')
+        return jsonify({'models': get_models().list(dataset_id) if dataset_id else []})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<model_id>', methods=['GET'])
+def get_model(model_id):
+    """
+    Route to get the metadata and training results of a model
+    trained on the session's dataset.
+    Returns:
+        Response: A JSON response with the metadata, or an
+            error message with status 404.
+    """
+
+    try:
+        return jsonify(
+            get_models().get_metadata(model_id, owner=session.get('dataset_id'))
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 404
+
+@bp.route('/<model_id>/predict', methods=['POST'])
+def predict(model_id):
+    """
+    Route to score rows with a model trained on the session's dataset.
+    The body is an Arrow IPC stream or JSON with 'columns' or
+    'rows' (see feature_matrix).
+    Concurrent requests for the same model are scored together in
+    one vectorised predict call.
+    Clients accepting application/vnd.apache.arrow.stream get the
+    predictions as an Arrow IPC stream.
+    Returns:
+        Response: The predictions, or an error message.
+    """
+
+    models = get_models()
+    try:
+        metadata = models.get_metadata(model_id, owner=session.get('dataset_id'))
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        X = feature_matrix(metadata['feature_columns'])
+        predictions = models.predict(model_id, X)
+        result = {
+            'model_id': model_id,
+            'version': metadata['version'],
+            'rows': len(predictions),
+        }
+        if wants_arrow(request):
+            return arrow_response({'prediction': predictions}, result)
+        result['predictions'] = to_json_list(predictions)
+        return jsonify(result)
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,554 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from app.services.fingerprints import (
+    combine_hashes,
+    exact_codes,
+    group_rows,
+    hash_column,
+)
+from app.utils.exceptions import ValidationError
+
+logger = logging.getLogger('yugen')
+
+# Operations that only remove rows, so their result is a mask over the source frame
+ROW_FILTERS = {'drop_nulls', 'drop_duplicates', 'filter'}
+COLUMN_OPERATIONS = {'fillna', 'cast', 'clip'}
+OPERATIONS = ROW_FILTERS | COLUMN_OPERATIONS | {'drop_columns'}
+
+FILTER_OPS = (
+    '==',
+    '!=',
+    '<',
+    '<=',
+    '>',
+    '>=',
+    'in',
+    'not_in',
+    'between',
+    'isnull',
+    'notnull',
+)
+FILL_STRATEGIES = ('value', 'zero', 'mean', 'median', 'mode', 'ffill', 'bfill')
+CAST_TYPES = ('int', 'float', 'str', 'category', 'datetime')
+CLIP_METHODS = ('bounds', 'quantile', 'iqr')
+DEFAULT_IQR_FACTOR = 1.5
+# Row filters are evaluated over this many selected rows at a time, bounding temporaries
+PLAN_CHUNK_ROWS = 1_000_000
+
+
+def steps_from_options(options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Plan steps for a clean request.
+    The drop_nulls and drop_duplicates flags come first, followed by the 'steps' list,
+    each step being {'operation': ..., 'params': {...}}.
+    """
+    steps = [
+        {'operation': name, 'params': {}}
+        for name in ('drop_nulls', 'drop_duplicates') if options.get(name)
+    ]
+    extra = options.get('steps') or []
+    if not isinstance(extra, list):
+        raise ValidationError("steps must be a list")
+    for step in extra:
+        if not isinstance(step, dict) or 'operation' not in step:
+            raise ValidationError("Each step needs an 'operation'")
+        steps.append(
+            {'operation': step['operation'], 'params': dict(step.get('params') or {})}
+        )
+    return steps
+
+
+def written_columns(steps: List[Dict[str, Any]], columns: List[str]) -> Set[str]:
+    """Columns whose values the steps change, given the frame's columns before them"""
+    return {
+        name
+        for step in CleanPlan(steps).optimize(columns)
+        for inner in step.steps
+        if inner.operation in COLUMN_OPERATIONS
+        for name in inner.writes
+    }
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+@dataclass
+class Step:
+    """One validated operation with the columns it reads and writes"""
+    operation: str
+    params: Dict[str, Any]
+    reads: Optional[List[str]]  # None when every live column is read
+    writes: List[str] = field(default_factory=list)
+
+    @property
+    def row_local(self) -> bool:
+        """Column operation whose result for a row depends on that row alone"""
+        if self.operation == 'cast':
+            # Categories come from the values present, and to_datetime
+            # infers its format from the first value
+            return self.params['dtype'] not in ('category', 'datetime')
+        if self.operation == 'fillna':
+            return self.params.get('strategy', 'value') in ('value', 'zero')
+        if self.operation == 'clip':
+            return self.params.get('method', 'bounds') == 'bounds'
+        return False
+
+    @property
+    def may_raise(self) -> bool:
+        """
+        Column operation that can fail on some values, so the
+        rows it sees must not change
+        """
+        if self.operation != 'cast':
+            return False
+        # Casts to int reject missing and fractional values whatever errors says
+        return self.params['dtype'] == 'int' or (
+            self.params['dtype'] in ('float', 'datetime')
+            and self.params.get('errors', 'raise') == 'raise'
+        )
+
+
+def _validate(operation: str, params: Dict[str, Any], columns: List[str]) -> Step:
+    """Check a step against the columns live at its position in the plan"""
+    if operation not in OPERATIONS:
+        raise ValidationError(f"Unsupported operation: {operation}")
+
+    def known(names: List[str]) -> List[str]:
+        missing = [c for c in names if c not in columns]
+        if missing:
+            raise ValidationError(f"{operation}: unknown columns {missing}")
+        return names
+
+    if operation in ('drop_nulls', 'drop_duplicates'):
+        subset = _as_list(params.get('columns'))
+        return Step(operation, params, known(subset) or None)
+    if operation == 'filter':
+        op = params.get('op')
+        if op not in FILTER_OPS:
+            raise ValidationError(f"filter: op must be one of {', '.join(FILTER_OPS)}")
+        if op not in ('isnull', 'notnull') and 'value' not in params:
+            raise ValidationError(f"filter: op {op} needs a value")
+        if op == 'between' and (
+            not isinstance(params['value'], list) or len(params['value']) != 2
+        ):
+            raise ValidationError("filter: between needs a [low, high] value")
+        if not isinstance(params.get('column'), str):
+            raise ValidationError("filter: needs a column")
+        return Step(operation, params, known([params['column']]))
+    if operation == 'drop_columns':
+        return Step(operation, params, [], known(_as_list(params.get('columns'))))
+
+    targets = known(_as_list(params.get('columns'))) or list(columns)
+    if operation == 'fillna':
+        strategy = params.get('strategy', 'value')
+        if strategy not in FILL_STRATEGIES:
+            raise ValidationError(
+                f"fillna: strategy must be one of {', '.join(FILL_STRATEGIES)}"
+            )
+        if strategy == 'value' and 'value' not in params:
+            raise ValidationError("fillna: strategy value needs a value")
+    elif operation == 'cast':
+        if params.get('dtype') not in CAST_TYPES:
+            raise ValidationError(f"cast: dtype must be one of {', '.join(CAST_TYPES)}")
+        if params.get('errors', 'raise') not in ('raise', 'coerce'):
+            raise ValidationError("cast: errors must be raise or coerce")
+    elif operation == 'clip':
+        method = params.get('method', 'bounds')
+        if method not in CLIP_METHODS:
+            raise ValidationError(
+                f"clip: method must be one of {', '.join(CLIP_METHODS)}"
+            )
+        if (
+            method == 'bounds'
+            and params.get('lower') is None
+            and params.get('upper') is None
+        ):
+            raise ValidationError("clip: bounds needs a lower or upper value")
+    return Step(operation, params, targets, targets)
+
+
+@dataclass
+class Stage:
+    """
+    A unit of execution: fused row filters, a global filter, a
+    column operation or a projection
+    """
+    kind: str  # 'filter', 'dedupe', 'column' or 'project'
+    steps: List[Step]
+
+
+class CleanPlan:
+    """
+    Cleaning steps recorded lazily and run as one optimized pass over a frame.
+    The optimizer drops column operations whose output is never read, moves row filters
+    ahead of row-local column operations on other columns, and fuses consecutive filters
+    into one mask. Execution keeps a selection of surviving row positions; columns are
+    only read where a step needs them, and the kept columns are copied once at the end.
+    """
+
+    def __init__(self, steps: List[Dict[str, Any]]):
+        self.steps = steps
+
+    def optimize(self, columns: List[str]) -> List[Stage]:
+        """
+        Validate the steps against the frame's columns and build the stages to execute
+        """
+        live = list(columns)
+        validated = []
+        for entry in self.steps:
+            step = _validate(entry['operation'], entry.get('params') or {}, live)
+            if step.reads is None:
+                # Subset-less drop_nulls and drop_duplicates read every live column
+                step.reads = list(live)
+            if step.operation == 'drop_columns':
+                live = [c for c in live if c not in step.writes]
+            validated.append(step)
+        validated = self._eliminate_dead(validated, live)
+        validated = self._push_filters(validated)
+        return self._fuse(validated)
+
+    @staticmethod
+    def _eliminate_dead(steps: List[Step], output: List[str]) -> List[Step]:
+        """
+        Drop column writes that are dropped before anything reads them.
+        Operations that can raise are kept whole, so the plan fails where they would.
+        """
+        needed: Set[str] = set(output)
+        kept = []
+        for step in reversed(steps):
+            if step.operation in COLUMN_OPERATIONS and not step.may_raise:
+                writes = [c for c in step.writes if c in needed]
+                if not writes:
+                    continue
+                if len(writes) < len(step.writes):
+                    step = Step(
+                        step.operation,
+                        {**step.params, 'columns': writes},
+                        writes,
+                        writes,
+                    )
+            needed.update(step.reads)
+            kept.append(step)
+        return kept[::-1]
+
+    @staticmethod
+    def _push_filters(steps: List[Step]) -> List[Step]:
+        """
+        Move stateless row filters ahead of row-local column operations they don't read.
+        Operations that can raise on some values keep their place, so a filter never
+        hides (or exposes) the rows they would fail on.
+        """
+        steps = list(steps)
+        for i in range(1, len(steps)):
+            j = i
+            while (
+                j > 0
+                and steps[j].operation in ('filter', 'drop_nulls')
+                and steps[j - 1].operation in COLUMN_OPERATIONS
+                and steps[j - 1].row_local
+                and not steps[j - 1].may_raise
+                and not set(steps[j].reads) & set(steps[j - 1].writes)
+            ):
+                steps[j - 1], steps[j] = steps[j], steps[j - 1]
+                j -= 1
+        return steps
+
+    @staticmethod
+    def _fuse(steps: List[Step]) -> List[Stage]:
+        stages: List[Stage] = []
+        for step in steps:
+            if step.operation in ('filter', 'drop_nulls'):
+                if stages and stages[-1].kind == 'filter':
+                    stages[-1].steps.append(step)
+                else:
+                    stages.append(Stage('filter', [step]))
+            elif step.operation == 'drop_duplicates':
+                stages.append(Stage('dedupe', [step]))
+            elif step.operation == 'drop_columns':
+                stages.append(Stage('project', [step]))
+            else:
+                stages.append(Stage('column', [step]))
+        return stages
+
+    def execute(
+        self,
+        df: pd.DataFrame,
+        chunk_rows: int = PLAN_CHUNK_ROWS,
+        progress: Optional[Callable[..., None]] = None,
+        hashes: Optional[Callable[[str], Optional[np.ndarray]]] = None,
+    ) -> pd.DataFrame:
+        """
+        Run the plan over a frame, which is not modified.
+        Args:
+            df (pd.DataFrame): Input frame.
+            chunk_rows (int): Selected rows per chunk when evaluating row filters.
+            progress (Optional[Callable[..., None]]): Called with
+                stage=<operation> per stage.
+            hashes (Optional[Callable[[str], Optional[np.ndarray]]]): Known value
+                hashes of an input column, one per row of df, or None;
+                drop_duplicates hashes other columns itself.
+        Returns:
+            pd.DataFrame: The result, keeping the input's index
+                labels for surviving rows.
+        """
+        stages = self.optimize(df.columns.tolist())
+        run = _PlanRun(df, chunk_rows, hashes)
+        for stage in stages:
+            if progress is not None:
+                progress(stage='+'.join(step.operation for step in stage.steps))
+            if stage.kind == 'filter':
+                run.filter(stage.steps)
+            elif stage.kind == 'dedupe':
+                run.dedupe(stage.steps[0])
+            elif stage.kind == 'project':
+                run.project(stage.steps[0].writes)
+            else:
+                run.apply(stage.steps[0])
+        logger.info(
+            f"Ran clean plan of {len(self.steps)} steps in {len(stages)} stages"
+        )
+        return run.result()
+
+
+class _PlanRun:
+    """
+    Execution state: surviving source positions, live columns and rewritten columns
+    """
+
+    def __init__(self, df: pd.DataFrame, chunk_rows: int,
+                 hashes: Optional[Callable[[str], Optional[np.ndarray]]] = None):
+        self.df = df
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.hashes = hashes
+        self.positions: Optional[np.ndarray] = None  # None while every row survives
+        self.columns = df.columns.tolist()
+        # Rewritten columns, aligned with the current selection
+        self.values: Dict[str, pd.Series] = {}
+
+    @property
+    def rows(self) -> int:
+        return len(self.df) if self.positions is None else len(self.positions)
+
+    def column(
+        self, name: str, start: int = 0, stop: Optional[int] = None
+    ) -> pd.Series:
+        """Values of a column for selected rows [start, stop)"""
+        stop = self.rows if stop is None else stop
+        if name in self.values:
+            return self.values[name].iloc[start:stop]
+        series = self.df[name]
+        if self.positions is None:
+            return series.iloc[start:stop]
+        return series.take(self.positions[start:stop])
+
+    def select(self, keep: np.ndarray) -> None:
+        if keep.all():
+            return
+        self.positions = (
+            np.flatnonzero(keep) if self.positions is None else self.positions[keep]
+        )
+        self.values = {name: series[keep] for name, series in self.values.items()}
+
+    def filter(self, steps: List[Step]) -> None:
+        """Evaluate fused row filters chunk by chunk into one mask"""
+        keep = np.ones(self.rows, dtype=bool)
+        for start in range(0, self.rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, self.rows)
+            chunk_keep = keep[start:stop]
+            for step in steps:
+                if step.operation == 'drop_nulls':
+                    for name in step.reads:
+                        chunk_keep &= self.column(name, start, stop).notna().to_numpy()
+                else:
+                    chunk_keep &= _predicate(
+                        self.column(step.reads[0], start, stop), step.params
+                    )
+        self.select(keep)
+
+    def take(self, name: str, rows: np.ndarray) -> pd.Series:
+        """Values of a column at positions within the current selection"""
+        if name in self.values:
+            return self.values[name].iloc[rows]
+        return self.df[name].iloc[
+            rows if self.positions is None else self.positions[rows]
+        ]
+
+    def column_hashes(self, name: str) -> np.ndarray:
+        if name not in self.values and self.hashes is not None:
+            hashes = self.hashes(name)
+            if hashes is not None:
+                return hashes if self.positions is None else hashes[self.positions]
+        return hash_column(self.column(name))
+
+    def dedupe(self, step: Step) -> None:
+        """Keep the first row of each key, grouping rows by verified row hashes"""
+        hashes = combine_hashes([self.column_hashes(name) for name in step.reads])
+        _, first, _ = group_rows(
+            hashes,
+            step.reads,
+            self.take,
+            lambda: exact_codes(
+                pd.DataFrame({name: self.column(name) for name in step.reads})
+            ),
+        )
+        keep = np.zeros(self.rows, dtype=bool)
+        keep[first] = True
+        self.select(keep)
+
+    def project(self, dropped: List[str]) -> None:
+        self.columns = [c for c in self.columns if c not in dropped]
+        for name in dropped:
+            self.values.pop(name, None)
+
+    def apply(self, step: Step) -> None:
+        for name in step.writes:
+            series = self.column(name)
+            if step.operation == 'fillna':
+                series = _fillna(series, step.params)
+            elif step.operation == 'cast':
+                series = _cast(series, step.params)
+            else:
+                series = _clip(series, step.params)
+            self.values[name] = series
+
+    def result(self) -> pd.DataFrame:
+        index = (
+            self.df.index
+            if self.positions is None
+            else self.df.index.take(self.positions)
+        )
+        # Each kept column is read, or taken at the surviving positions, exactly once
+        return pd.DataFrame(
+            {name: self.column(name) for name in self.columns}, index=index, copy=False
+        )
+
+
+def filter_mask(df: pd.DataFrame, filters: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Rows of df passing every filter, each given as filter
+    step params (column, op, value)
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for params in filters:
+        if not isinstance(params, dict):
+            raise ValidationError(
+                "Each filter must be an object with column, op and value"
+            )
+        _validate('filter', params, df.columns.tolist())
+        keep &= _predicate(df[params['column']], params)
+    return keep
+
+
+def _predicate(series: pd.Series, params: Dict[str, Any]) -> np.ndarray:
+    op, value = params['op'], params.get('value')
+    if op == 'isnull':
+        return series.isna().to_numpy()
+    if op == 'notnull':
+        return series.notna().to_numpy()
+    if op in ('in', 'not_in'):
+        matched = series.isin(value if isinstance(value, list) else [value]).to_numpy()
+        return matched if op == 'in' else ~matched
+    # Unordered categoricals (text columns downcast by chunked ingest) compare
+    # by value, like the object column they came from; each category once
+    categorical = (
+        isinstance(series.dtype, pd.CategoricalDtype) and not series.cat.ordered
+    )
+    target = pd.Series(series.cat.categories) if categorical else series
+    try:
+        if op == 'between':
+            result = target.between(value[0], value[1])
+        else:
+            result = {
+                '==': target.__eq__, '!=': target.__ne__, '<': target.__lt__,
+                '<=': target.__le__, '>': target.__gt__, '>=': target.__ge__
+            }[op](value)
+    except TypeError as e:
+        # e.g. ordering a mixed object column, or text against a number
+        raise ValidationError(
+            f"filter: cannot apply {op} to {series.name} ({series.dtype}): {str(e)}"
+        ) from e
+    # Comparisons with missing values keep the row out, except for !=
+    result = result.fillna(op == '!=').to_numpy(dtype=bool)
+    if categorical:
+        # Code -1 (missing) picks the appended missing-value result
+        return np.append(result, op == '!=')[series.cat.codes.to_numpy()]
+    return result
+
+
+def _fillna(series: pd.Series, params: Dict[str, Any]) -> pd.Series:
+    strategy = params.get('strategy', 'value')
+    if strategy == 'ffill':
+        return series.ffill()
+    if strategy == 'bfill':
+        return series.bfill()
+    if strategy == 'value':
+        value = params['value']
+    elif strategy == 'zero':
+        value = 0
+    elif strategy == 'mode':
+        modes = series.mode(dropna=True)
+        if modes.empty:
+            return series
+        value = modes.iloc[0]
+    else:
+        if not pd.api.types.is_numeric_dtype(series):
+            raise ValidationError(
+                f"fillna: {strategy} needs a numeric column, "
+                f"{series.name} is {series.dtype}"
+            )
+        value = series.mean() if strategy == 'mean' else series.median()
+        if pd.isna(value):
+            return series
+    if (
+        isinstance(series.dtype, pd.CategoricalDtype)
+        and value not in series.cat.categories
+    ):
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def _cast(series: pd.Series, params: Dict[str, Any]) -> pd.Series:
+    dtype, errors = params['dtype'], params.get('errors', 'raise')
+    if dtype in ('int', 'float'):
+        numeric = pd.to_numeric(series, errors=errors)
+        if dtype == 'float':
+            return numeric.astype(np.float64)
+        if numeric.isna().any():
+            raise ValidationError(
+                f"cast: {series.name} has missing values; "
+                "fill or drop them before casting to int"
+            )
+        rounded = numeric.astype(np.int64)
+        if not np.array_equal(rounded.to_numpy(), numeric.to_numpy()):
+            raise ValidationError(f"cast: {series.name} has fractional values")
+        return rounded
+    if dtype == 'str':
+        return series.astype(object).where(series.isna(), series.astype(str))
+    if dtype == 'category':
+        return series.astype('category')
+    return pd.to_datetime(series, errors=errors)
+
+
+def _clip(series: pd.Series, params: Dict[str, Any]) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(series):
+        raise ValidationError(f"clip: {series.name} is not numeric")
+    method = params.get('method', 'bounds')
+    if method == 'bounds':
+        lower, upper = params.get('lower'), params.get('upper')
+    elif method == 'quantile':
+        lower, upper = series.quantile(
+            [params.get('lower', 0.01), params.get('upper', 0.99)]
+        ).tolist()
+    else:
+        q1, q3 = series.quantile([0.25, 0.75]).tolist()
+        factor = params.get('factor', DEFAULT_IQR_FACTOR)
+        lower, upper = q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+    return series.clip(lower=lower, upper=upper)
@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+
+from app.utils.metrics import record_lookup
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow is optional
+    feather = None
+
+logger = logging.getLogger('yugen')
+
+# Bump when the parse options in file_reader change so stale entries are ignored
+CACHE_FORMAT_VERSION = '2'
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+HASH_BLOCK_SIZE = 1024 * 1024
+# Each upload is a new temp path, so memoised digests are bounded, least recent out
+DIGEST_CACHE_SIZE = 1024
+
+
+class ColumnarCache:
+    """Content-addressed cache of parsed uploads stored as Feather (or pickle)"""
+
+    def __init__(self, cache_dir: Optional[Path] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self._cache_dir = Path(cache_dir or Path(tempfile.gettempdir()) / 'yugen_cache')
+        self._max_bytes = max_bytes
+        self._digests: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, cache_dir: Optional[Path] = None,
+                  max_bytes: Optional[int] = None) -> None:
+        if cache_dir:
+            self._cache_dir = Path(cache_dir)
+        if max_bytes is not None:
+            self._max_bytes = max_bytes
+
+    @property
+    def suffix(self) -> str:
+        return '.feather' if feather is not None else '.pkl'
+
+    @staticmethod
+    def hasher(suffix: str):
+        """
+        Incremental hasher producing digest() values for content with this file suffix
+        """
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(CACHE_FORMAT_VERSION.encode())
+        hasher.update(suffix.encode())
+        return hasher
+
+    def remember_digest(self, file_path: Path, digest: str) -> None:
+        """
+        Record a digest computed while the file was written, so it isn't read again
+        """
+        stat = file_path.stat()
+        self._remember((str(file_path), stat.st_size, stat.st_mtime_ns), digest)
+
+    def digest(self, file_path: Path) -> str:
+        """Content hash of a file, memoised on path, size and mtime"""
+        stat = file_path.stat()
+        key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+        if digest is not None:
+            return digest
+
+        hasher = self.hasher(file_path.suffix)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        self._remember(key, digest)
+        return digest
+
+    def _remember(self, key: Tuple[str, int, int], digest: str) -> None:
+        with self._lock:
+            self._digests[key] = digest
+            self._digests.move_to_end(key)
+            while len(self._digests) > DIGEST_CACHE_SIZE:
+                self._digests.popitem(last=False)
+
+    def load(self, file_path: Path,
+             reader: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+        """Return the parsed frame for a file, parsing with reader only on a miss"""
+        cache_path = self._cache_dir / f"{self.digest(file_path)}{self.suffix}"
+        if cache_path.exists():
+            try:
+                df = self._read(cache_path)
+                self.hits += 1
+                record_lookup('columnar', True)
+                os.utime(cache_path)
+                logger.info(f"Loaded {file_path.name} from columnar cache")
+                return df
+            except Exception as e:
+                logger.warning(
+                    f"Discarding unreadable cache entry {cache_path}: {str(e)}"
+                )
+                cache_path.unlink(missing_ok=True)
+
+        self.misses += 1
+        record_lookup('columnar', False)
+        df = reader(file_path)
+        self._write(df, cache_path)
+        return df
+
+    def _read(self, cache_path: Path) -> pd.DataFrame:
+        if feather is not None:
+            table = feather.read_table(cache_path, memory_map=True)
+            return table.to_pandas(split_blocks=True)
+        return pd.read_pickle(cache_path)
+
+    def _write(self, df: pd.DataFrame, cache_path: Path) -> None:
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            if feather is not None:
+                # Uncompressed so later reads can memory-map the file
+                df.to_feather(tmp_path, compression='uncompressed')
+            else:
+                df.to_pickle(tmp_path)
+            tmp_path.replace(cache_path)
+        except Exception as e:
+            # Frames Arrow can't represent (e.g. mixed-type
+            # object columns) stay uncached
+            logger.warning(f"Could not cache parsed file: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        """Delete least recently used entries beyond the size limit"""
+        entries = []
+        for path in self._cache_dir.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+columnar_cache = ColumnarCache()
@@ -1,318 +1,541 @@
+import copy
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
 import numpy as np
-import logging
+import pandas as pd
+
+from app.services.clean_plan import (
+    ROW_FILTERS,
+    CleanPlan,
+    filter_mask,
+    steps_from_options,
+    written_columns,
+)
+from app.services.columnar_cache import columnar_cache
+from app.services.downsampling import (
+    DEFAULT_BINS,
+    DEFAULT_MAX_POINTS,
+    histogram_trace,
+    scatter_trace,
+    trace_to_json,
+)
+from app.services.file_reader import read_file
+from app.services.fingerprints import (
+    FingerprintIndex,
+    combine_hashes,
+    exact_codes,
+    group_rows,
+    hash_column,
+)
+from app.services.ingest import IngestStats
+from app.services.row_browser import (
+    DEFAULT_PAGE_ROWS,
+    MAX_PAGE_ROWS,
+    View,
+    ViewCache,
+    filter_permutation,
+    sort_permutation,
+)
+from app.services.sketches import ProfileSketch
+from app.services.stats_kernel import numeric_profile
 from app.utils.exceptions import DataProcessingError, ValidationError
+from app.utils.metrics import timed
+from app.utils.serialization import column_payload
 
 logger = logging.getLogger('yugen')
 
+# Number of dataset states (e.g. before/after a clean step) whose profiles are kept
+PROFILE_CACHE_STATES = 8
+# Rows per sketch update and rows sampled for correlation in approximate profiling
+APPROXIMATE_CHUNK_ROWS = 500_000
+APPROXIMATE_CORRELATION_ROWS = 100_000
+
 class DataService:
     def __init__(self):
         self._df: Optional[pd.DataFrame] = None
-        self._original_df: Optional[pd.DataFrame] = None
+        # Parsed upload, never modified; _df is derived from it via the operation log
+        self._source_df: Optional[pd.DataFrame] = None
         self._transformation_history: List[Dict[str, Any]] = []
+        # Bit-packed row masks over _source_df, one per history
+        # entry (None if not row-only)
+        self._row_masks: List[Optional[np.ndarray]] = []
+        self._redo_stack: List[Tuple[Dict[str, Any], Optional[np.ndarray]]] = []
+        self._source_memory_usage = 0
+        self._profile_cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._version = 0
+        # Random per data state, unlike the version counter, so workers that restored
+        # the same spill and changed it differently never share a token
+        self._state_token = uuid.uuid4().hex
         self._file_path = None
-        
-    def process_file(self, file_path: Path) -> Dict[str, Any]:
-        """Process uploaded file and return data info"""
+        # Content digest of the uploaded file, for reusing the
+        # parse of identical uploads
+        self._source_digest: Optional[str] = None
+        self._memory_usage = 0
+        self._ingest_stats: Optional[IngestStats] = None
+        # Value hashes of source columns, for duplicate detection
+        self._fingerprints = FingerprintIndex()
+        # (version, source row position of each current row)
+        self._source_positions: Optional[Tuple[int, np.ndarray]] = None
+        # Sort permutations and filtered views for browsing rows
+        self._views = ViewCache()
+
+    def process_file(
+        self,
+        file_path: Path,
+        progress: Optional[Callable[..., None]] = None,
+        engine: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Process uploaded file and return data info, reporting parse
+        progress if given a callback.
+        engine selects the reader (see file_reader.READ_ENGINES); by
+        default it is chosen from the file.
+        The info's 'ingest' entry names the engine used, or
+        'cache' for a columnar cache hit.
+        """
         logger.info(f"Processing file: {file_path}")
         
         try:
-            self._file_path = file_path
             if not file_path.exists():
                 logger.error(f"File not found: {file_path}")
                 raise ValidationError(f"File not found: {file_path}")
 
-            if file_path.suffix == '.csv':
-                logger.info("Reading CSV file")
-                self._df = pd.read_csv(
-                    file_path, 
-                    encoding='utf-8',
-                    na_values=['', 'NULL', 'null', 'None', 'N/A', 'n/a', '#N/A']
-                )
-            elif file_path.suffix in ['.xlsx', '.xls']:
-                logger.info("Reading Excel file")
-                self._df = pd.read_excel(
-                    file_path,
-                    na_values=['', 'NULL', 'null', 'None', 'N/A', 'n/a', '#N/A']
-                )
-            else:
+            if file_path.suffix not in ['.csv', '.xlsx', '.xls']:
                 logger.error(f"Unsupported file type: {file_path.suffix}")
                 raise ValidationError(f"Unsupported file type: {file_path.suffix}")
             
+            stats = IngestStats()
+            started = time.perf_counter()
+            df = columnar_cache.load(
+                file_path,
+                partial(read_file, stats=stats, progress=progress, engine=engine),
+            )
+            if stats.engine is None:
+                stats.engine = 'cache'
+                stats.parse_seconds = time.perf_counter() - started
+            if stats.rows == 0:
+                # Served from the columnar cache, gather the stats in one pass
+                stats.update(df)
+                if progress is not None:
+                    progress(rows_parsed=len(df), chunks_done=0, cached=True)
+            
             # Validate DataFrame
-            if self._df.empty:
+            if df.empty:
                 raise ValidationError("The uploaded file is empty")
                 
-            if len(self._df.columns) == 0:
+            if len(df.columns) == 0:
                 raise ValidationError("No columns found in the file")
-                
-            self._original_df = self._df.copy()
+            digest = columnar_cache.digest(file_path)
+            
+            # Past the last progress checkpoint, so a cancelled or failed
+            # upload leaves the previous data, file and history as they were
+            self._file_path = file_path
+            self._source_df = self._df = df
+            self._ingest_stats = stats
+            self._bump_version()
+            self._fingerprints = FingerprintIndex()
+            self._views.clear()
+            self._source_digest = digest
+            self._transformation_history.clear()
+            self._row_masks.clear()
+            self._redo_stack.clear()
+            self._profile_cache.clear()
+            self._profile_sections()['missing'] = self._get_missing_summary(
+                stats.null_counts
+            )
             logger.info(f"File processed successfully. Shape: {self._df.shape}")
-            logger.info(f"Total null values: {self._df.isnull().sum().sum()}")
+            logger.info(f"Total null values: {stats.total_nulls()}")
             
-            return self._get_data_info()
+            return self._get_ingest_info()
             
         except pd.errors.EmptyDataError:
             logger.error("Empty file detected")
-            raise ValidationError("File is empty")
+            raise ValidationError("File is empty") from None
         except pd.errors.ParserError as e:
             logger.error(f"Parser error: {str(e)}")
-            raise ValidationError(f"Failed to parse file: {str(e)}")
+            raise ValidationError(f"Failed to parse file: {str(e)}") from e
         except UnicodeDecodeError as e:
             logger.error(f"Encoding error: {str(e)}")
-            raise ValidationError("Failed to read file. Please check the file encoding.")
+            raise ValidationError(
+                "Failed to read file. Please check the file encoding."
+            ) from e
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}")
-            raise DataProcessingError(f"Failed to process file: {str(e)}")
+            raise DataProcessingError(f"Failed to process file: {str(e)}") from e
     
-    def _safe_convert_value(self, value):
-        """Convert pandas values to JSON-safe values"""
-        if pd.isna(value):
-            return None
-        elif isinstance(value, np.integer):
-            return int(value)
-        elif isinstance(value, np.floating):
-            return float(value)
-        elif isinstance(value, np.ndarray):
-            return value.tolist()
-        else:
-            return value
-
-    def profiling(self) -> Dict[str, Any]:
+    @timed('profile')
+    def profiling(self, approximate: bool = False) -> Dict[str, Any]:
         """Generate data profile with proper NaN handling"""
         if self._df is None:
             raise ValidationError("No data loaded")
             
-        try:
-            numeric_cols = self._df.select_dtypes(include=[np.number]).columns
-            categorical_cols = self._df.select_dtypes(include=['object', 'category']).columns
+        if approximate:
+            return self._approximate_profiling()
             
-            # Handle correlation matrix with NaN values
-            correlation = {}
-            if len(numeric_cols) > 1:
-                corr_matrix = self._df[numeric_cols].corr()
-                correlation = {}
-                for col in corr_matrix.columns:
-                    correlation[col] = {}
-                    for other_col in corr_matrix.columns:
-                        val = corr_matrix.loc[col, other_col]
-                        if pd.isna(val):
-                            correlation[col][other_col] = None
-                        elif isinstance(val, (int, float, np.integer, np.floating)):
-                            correlation[col][other_col] = float(val)
-                        else:
-                            correlation[col][other_col] = None
+        try:
+            # Sections are cached per dataset state and only computed when missing
+            sections = self._profile_sections()
+            if 'dtypes' not in sections:
+                sections['dtypes'] = self._get_dtype_summary()
+            if 'missing' not in sections:
+                sections['missing'] = self._get_missing_summary(self._df.isnull().sum())
+            if 'numeric_summary' not in sections or 'correlation' not in sections:
+                # Both come out of the same pass over the numeric block
+                sections['numeric_summary'], sections['correlation'] = (
+                    self._get_numeric_profile()
+                )
+            if 'categorical_summary' not in sections:
+                sections['categorical_summary'] = self._get_categorical_summary()
             
             return {
-                'dtypes': {
-                    'numeric': len(numeric_cols),
-                    'categorical': len(categorical_cols),
-                    'details': {k: str(v) for k, v in self._df.dtypes.items()}
-                },
-                'missing': {
-                    'total': int(self._df.isnull().sum().sum()),
-                    'by_column': {col: int(count) for col, count in self._df.isnull().sum().items()},
-                    'percentage': {
-                        col: round(float(count / len(self._df) * 100), 2) if len(self._df) > 0 else 0
-                        for col, count in self._df.isnull().sum().items()
-                    }
-                },
-                'numeric_summary': self._get_numeric_summary(),
-                'categorical_summary': self._get_categorical_summary(),
-                'correlation': correlation
+                'dtypes': sections['dtypes'],
+                'missing': sections['missing'],
+                'numeric_summary': sections['numeric_summary'],
+                'categorical_summary': sections['categorical_summary'],
+                'correlation': sections['correlation']
             }
         except Exception as e:
             logger.error(f"Error generating profile: {str(e)}")
-            raise DataProcessingError(f"Failed to generate profile: {str(e)}")
-
-        if self._df is None:
-            raise ValidationError("No data loaded")
-            
+            raise DataProcessingError(f"Failed to generate profile: {str(e)}") from e
+    
+    def _approximate_profiling(self) -> Dict[str, Any]:
+        """Generate a sketch-based profile with stated error bounds"""
         try:
-            numeric_cols = self._df.select_dtypes(include=['int64', 'float64']).columns
-            categorical_cols = self._df.select_dtypes(include=['object', 'category']).columns
+            sections = self._profile_sections()
+            if 'dtypes' not in sections:
+                sections['dtypes'] = self._get_dtype_summary()
+            if 'missing' not in sections:
+                sections['missing'] = self._get_missing_summary(self._df.isnull().sum())
+            if 'approximate' not in sections:
+                sections['approximate'] = self._get_approximate_summary()
             
+            approximate = sections['approximate']
             return {
-                'dtypes': {
-                    'numeric': len(numeric_cols),
-                    'categorical': len(categorical_cols),
-                    'details': self._df.dtypes.astype(str).to_dict()
-                },
-                'missing': {
-                    'total': int(self._df.isnull().sum().sum()),
-                    'by_column': self._df.isnull().sum().to_dict(),
-                    'percentage': (self._df.isnull().sum() / len(self._df) * 100).round(2).to_dict()
-                },
-                'numeric_summary': self._get_numeric_summary(),
-                'categorical_summary': self._get_categorical_summary(),
-                'correlation': self._df[numeric_cols].corr().to_dict() if len(numeric_cols) > 0 else {}
+                'dtypes': sections['dtypes'],
+                'missing': sections['missing'],
+                'numeric_summary': approximate['numeric_summary'],
+                'categorical_summary': approximate['categorical_summary'],
+                'correlation': approximate['correlation'],
+                'distinct': approximate['distinct'],
+                'error_bounds': approximate['error_bounds'],
+                'approximate': True
             }
         except Exception as e:
-            raise DataProcessingError(f"Failed to generate profile: {str(e)}")
+            logger.error(f"Error generating approximate profile: {str(e)}")
+            raise DataProcessingError(f"Failed to generate profile: {str(e)}") from e
     
-    def get_plot_data(self, plot_type: str, x: str, y: Optional[str] = None) -> Dict[str, Any]:
-        """Get plot data with NaN handling"""
+    def _get_approximate_summary(self) -> Dict[str, Any]:
+        """
+        Summarise the current frame with mergeable sketches and a sampled correlation
+        """
+        sketch = None
+        if not self._transformation_history and self._ingest_stats is not None:
+            sketch = self._ingest_stats.sketch
+            if sketch is not None and not sketch.is_consistent():
+                sketch = None
+        if sketch is None:
+            sketch = ProfileSketch()
+            for start in range(0, len(self._df), APPROXIMATE_CHUNK_ROWS):
+                sketch.update(self._df.iloc[start:start + APPROXIMATE_CHUNK_ROWS])
+        
+        numeric_cols = self._df.select_dtypes(include=[np.number]).columns
+        categorical_cols = self._df.select_dtypes(
+            include=['object', 'category']
+        ).columns
+        summary = sketch.summarize(numeric_cols, categorical_cols)
+        
+        sample = self._df[numeric_cols]
+        if len(sample) > APPROXIMATE_CORRELATION_ROWS:
+            sample = sample.sample(APPROXIMATE_CORRELATION_ROWS, random_state=0)
+        _, summary['correlation'] = numeric_profile(sample)
+        summary['error_bounds']['correlation_sample_rows'] = len(sample)
+        return summary
+    
+    def _get_dtype_summary(self) -> Dict[str, Any]:
+        """Count numeric and categorical columns"""
+        numeric_cols = self._df.select_dtypes(include=[np.number]).columns
+        categorical_cols = self._df.select_dtypes(
+            include=['object', 'category']
+        ).columns
+        return {
+            'numeric': len(numeric_cols),
+            'categorical': len(categorical_cols),
+            'details': {k: str(v) for k, v in self._df.dtypes.items()}
+        }
+    
+    def _get_missing_summary(self, null_counts: pd.Series) -> Dict[str, Any]:
+        """Build the missing section from per-column null counts"""
+        n_rows = len(self._df)
+        return {
+            'total': int(null_counts.sum()),
+            'by_column': {col: int(count) for col, count in null_counts.items()},
+            'percentage': {
+                col: round(float(count / n_rows * 100), 2) if n_rows > 0 else 0
+                for col, count in null_counts.items()
+            }
+        }
+    
+    def _state_key(self) -> str:
+        """Identify the current frame by the operations applied to the source"""
+        return json.dumps(self._transformation_history, sort_keys=True, default=str)
+    
+    def _profile_sections(self) -> Dict[str, Any]:
+        """Cached profile sections for the current state"""
+        key = self._state_key()
+        sections = self._profile_cache.get(key)
+        if sections is None:
+            sections = self._profile_cache[key] = {}
+            while len(self._profile_cache) > PROFILE_CACHE_STATES:
+                self._profile_cache.popitem(last=False)
+        else:
+            self._profile_cache.move_to_end(key)
+        return sections
+
+    def _carry_profile(
+        self,
+        previous_sections: Dict[str, Any],
+        previous_df: pd.DataFrame,
+        steps: List[Dict[str, Any]],
+    ) -> None:
+        """Seed the new state's profile with what row filters leave unchanged"""
+        if not all(step['operation'] in ROW_FILTERS for step in steps):
+            return
+        sections = self._profile_sections()
+        for key in ('dtypes', 'numeric_columns'):
+            if key in previous_sections:
+                sections.setdefault(key, previous_sections[key])
+        if 'missing' in previous_sections and 'missing' not in sections:
+            previous_counts = pd.Series(
+                previous_sections['missing']['by_column'], dtype=np.int64
+            )
+            if any(
+                step['operation'] == 'drop_nulls' and not step['params'].get('columns')
+                for step in steps
+            ):
+                null_counts = previous_counts * 0
+            else:
+                # Only the removed rows need scanning
+                removed = previous_df.index.difference(self._df.index)
+                null_counts = previous_counts - previous_df.loc[removed].isnull().sum()
+            sections['missing'] = self._get_missing_summary(null_counts)
+    
+    @timed('visualize')
+    def get_plot_data(self, plot_type: str, x: str, y: Optional[str] = None,
+                      bins: int = DEFAULT_BINS, max_points: int = DEFAULT_MAX_POINTS,
+                      strategy: str = 'sample', raw: bool = False) -> Dict[str, Any]:
+        """
+        Get plot data with NaN handling, aggregated so its size
+        is independent of row count.
+        With raw=True the trace keeps its NumPy arrays instead of JSON-ready lists.
+        """
         if self._df is None:
             raise ValidationError("No data loaded")
             
         try:
             if plot_type == 'histogram':
-                # Remove NaN values for plotting
-                x_data = self._df[x].dropna().tolist()
-                data = {
-                    'x': x_data,
-                    'type': 'histogram'
-                }
+                # Remove NaN values and bin on the server
+                data = histogram_trace(self._df[x], bins=bins)
             elif plot_type == 'scatter':
                 # Remove rows where either x or y is NaN
-                clean_df = self._df[[x, y]].dropna()
-                data = {
-                    'x': clean_df[x].tolist(),
-                    'y': clean_df[y].tolist(),
-                    'mode': 'markers',
-                    'type': 'scatter'
-                }
+                valid = self._df[x].notna() & self._df[y].notna()
+                data = scatter_trace(
+                    self._df[x][valid], self._df[y][valid],
+                    max_points=max_points, strategy=strategy, bins=bins
+                )
             else:
                 raise ValidationError(f"Unsupported plot type: {plot_type}")
-            return {'data': [data]}
+            return {'data': [data if raw else trace_to_json(data)]}
         except Exception as e:
             logger.error(f"Error generating plot data: {str(e)}")
-            raise DataProcessingError(f"Failed to generate plot data: {str(e)}")
+            raise DataProcessingError(f"Failed to generate plot data: {str(e)}") from e
     
-    def clean_data(self, options: Dict[str, bool]) -> Dict[str, Any]:
-        """Clean data based on provided options"""
+    @timed('clean')
+    def clean_data(
+        self, options: Dict[str, Any], progress: Optional[Callable[..., None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Clean data based on provided options.
+        The drop_nulls and drop_duplicates flags and the 'steps' list
+        (fillna, filter, cast, drop_columns, clip; see clean_plan) run as one
+        optimized plan over the current frame.
+        Each step is logged separately, so undo reverts one step at a time.
+        """
         if self._df is None:
             raise ValidationError("No data loaded")
             
         try:
             logger.info(f"Cleaning data with options: {options}")
             
-            if options.get('drop_nulls'):
-                original_shape = self._df.shape
-                self._df = self._df.dropna()
-                logger.info(f"Dropped nulls: {original_shape} -> {self._df.shape}")
-                self._add_transformation('drop_nulls')
-                
-            if options.get('drop_duplicates'):
+            steps = steps_from_options(options)
+            if steps:
                 original_shape = self._df.shape
-                self._df = self._df.drop_duplicates()
-                logger.info(f"Dropped duplicates: {original_shape} -> {self._df.shape}")
-                self._add_transformation('drop_duplicates')
+                self._transform(steps, progress=progress)
+                operations = [step['operation'] for step in steps]
+                logger.info(
+                    f"Cleaned with {operations}: {original_shape} -> {self._df.shape}"
+                )
                 
             logger.info("Data cleaned successfully")
             
-            # Return cleaned data info with the cleaned DataFrame
-            result = self._get_data_info()
-            result['data'] = self._df  # Add the cleaned DataFrame
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error cleaning data: {str(e)}")
-            raise DataProcessingError(f"Failed to clean data: {str(e)}")
-        """Clean data based on provided options"""
-        if self._df is None:
-            raise ValidationError("No data loaded")
-            
-        try:
-            logger.info(f"Cleaning data with options: {options}")
-            if options.get('drop_nulls'):
-                self._df = self._df.dropna()
-                self._add_transformation('drop_nulls')
-                
-            if options.get('drop_duplicates'):
-                self._df = self._df.drop_duplicates()
-                self._add_transformation('drop_duplicates')
-                
-            logger.info("Data cleaned successfully")
+            # The cleaned frame is only written out when exported
             return self._get_data_info()
             
+        except ValidationError:
+            # Invalid steps and values are the client's to fix
+            raise
         except Exception as e:
             logger.error(f"Error cleaning data: {str(e)}")
-            raise DataProcessingError(f"Failed to clean data: {str(e)}")
+            raise DataProcessingError(f"Failed to clean data: {str(e)}") from e
     
     def reset_data(self) -> Dict[str, Any]:
         """Reset data to original state"""
-        if self._original_df is None:
+        if self._source_df is None:
             raise ValidationError("No original data available")
             
         try:
             logger.info("Resetting data to original state")
-            self._df = self._original_df.copy()
+            self._df = self._source_df
             self._transformation_history.clear()
+            self._row_masks.clear()
+            self._redo_stack.clear()
+            self._bump_version()
             return self._get_data_info()
             
         except Exception as e:
             logger.error(f"Error resetting data: {str(e)}")
-            raise DataProcessingError(f"Failed to reset data: {str(e)}")
+            raise DataProcessingError(f"Failed to reset data: {str(e)}") from e
+    
+    def undo(self) -> Dict[str, Any]:
+        """Revert the most recent transformation"""
+        if self._source_df is None:
+            raise ValidationError("No data loaded")
+        if not self._transformation_history:
+            raise ValidationError("Nothing to undo")
+            
+        try:
+            entry = self._transformation_history.pop()
+            self._redo_stack.append((entry, self._row_masks.pop()))
+            self._df = self._rebuild()
+            self._bump_version()
+            logger.info(f"Undid {entry['operation']}: now {self._df.shape}")
+            return self._get_data_info()
+            
+        except Exception as e:
+            logger.error(f"Error undoing transformation: {str(e)}")
+            raise DataProcessingError(f"Failed to undo transformation: {str(e)}") from e
+    
+    def redo(self) -> Dict[str, Any]:
+        """Re-apply the most recently undone transformation"""
+        if self._source_df is None:
+            raise ValidationError("No data loaded")
+        if not self._redo_stack:
+            raise ValidationError("Nothing to redo")
+            
+        try:
+            entry, mask = self._redo_stack.pop()
+            self._transformation_history.append(entry)
+            self._row_masks.append(mask)
+            self._df = self._rebuild()
+            self._bump_version()
+            logger.info(f"Redid {entry['operation']}: now {self._df.shape}")
+            return self._get_data_info()
+            
+        except Exception as e:
+            logger.error(f"Error redoing transformation: {str(e)}")
+            raise DataProcessingError(f"Failed to redo transformation: {str(e)}") from e
+    
+    def _rebuild(self) -> pd.DataFrame:
+        """Derive the current frame from the source frame and the operation log"""
+        if not self._transformation_history:
+            return self._source_df
+        mask = self._row_masks[-1]
+        if mask is not None:
+            return self._source_df[
+                np.unpackbits(mask, count=len(self._source_df)).view(bool)
+            ]
+        # The whole log is replayed as one plan, so it costs one pass
+        # rather than one copy per step
+        return CleanPlan(self._transformation_history).execute(
+            self._source_df,
+            hashes=lambda name: self._fingerprints.column(self._source_df, name),
+        )
+    
+    def _row_mask(self) -> Optional[np.ndarray]:
+        """Pack which source rows survive in _df, if the log so far only drops rows"""
+        if not all(e['operation'] in ROW_FILTERS for e in self._transformation_history):
+            return None
+        if not self._df.columns.equals(self._source_df.columns):
+            return None
+        mask = np.zeros(len(self._source_df), dtype=bool)
+        positions = self._source_df.index.get_indexer(self._df.index)
+        if (positions < 0).any():
+            return None
+        mask[positions] = True
+        return np.packbits(mask)
     
     def _get_data_info(self) -> Dict[str, Any]:
         """Get data information with proper NaN handling"""
         if self._df is None:
             raise ValidationError("No data loaded")
         
-        # Handle preview data with NaN values
-        preview_df = self._df.head(10).copy()
-        preview_records = []
+        # Column-oriented preview, converted a column at a time
+        preview = column_payload(self.get_preview())
         
-        for _, row in preview_df.iterrows():
-            record = {}
-            for col in preview_df.columns:
-                record[col] = self._safe_convert_value(row[col])
-            preview_records.append(record)
+        self._memory_usage = int(self._df.memory_usage(deep=True).sum())
+        if self._df is self._source_df:
+            self._source_memory_usage = self._memory_usage
         
-        # Handle missing data counts
-        missing_counts = {}
-        for col in self._df.columns:
-            count = int(self._df[col].isnull().sum())
-            missing_counts[col] = count
+        # Handle missing data counts, shared with the cached profile
+        sections = self._profile_sections()
+        if 'missing' not in sections:
+            sections['missing'] = self._get_missing_summary(self._df.isnull().sum())
+        missing_counts = sections['missing']['by_column']
             
         return {
             'shape': tuple(map(int, self._df.shape)),
             'columns': self._df.columns.tolist(),
-            'memory_usage': int(self._df.memory_usage(deep=True).sum()),
+            'memory_usage': self._memory_usage,
             'dtypes': {k: str(v) for k, v in self._df.dtypes.items()},
             'transformations': self._transformation_history.copy(),
-            'preview': preview_records,
+            'preview': preview,
             'missing': missing_counts
         }
-    
-    def _get_numeric_summary(self) -> Dict[str, Dict[str, float]]:
-        """Get summary statistics for numeric columns with NaN handling"""
+
+    def _get_numeric_profile(
+        self,
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Get summary statistics and correlation for numeric columns with NaN handling
+        """
         if self._df is None:
-            return {}
+            return {}, {}
             
         numeric_cols = self._df.select_dtypes(include=[np.number]).columns
-        summary = {}
-        
-        for col in numeric_cols:
-            stats = self._df[col].describe()
-            summary[col] = {
-                'count': int(stats['count']) if not pd.isna(stats['count']) else 0,
-                'mean': float(stats['mean']) if not pd.isna(stats['mean']) else None,
-                'std': float(stats['std']) if not pd.isna(stats['std']) else None,
-                'min': float(stats['min']) if not pd.isna(stats['min']) else None,
-                'max': float(stats['max']) if not pd.isna(stats['max']) else None,
-                '25%': float(stats['25%']) if not pd.isna(stats['25%']) else None,
-                '50%': float(stats['50%']) if not pd.isna(stats['50%']) else None,
-                '75%': float(stats['75%']) if not pd.isna(stats['75%']) else None
-            }
-        
-        return summary
+        return numeric_profile(self._df[numeric_cols])
     
     def _get_categorical_summary(self) -> Dict[str, Dict[str, int]]:
         """Get summary statistics for categorical columns with NaN handling"""
         if self._df is None:
             return {}
-            
-        categorical_cols = self._df.select_dtypes(include=['object', 'category']).columns
+
+        categorical_cols = self._df.select_dtypes(
+            include=['object', 'category']
+        ).columns
         summary = {}
         
         for col in categorical_cols:
             value_counts = self._df[col].value_counts(dropna=False)
             summary[col] = {
-                str(k) if k is not None and not (isinstance(k, float) and pd.isna(k)) else 'null': int(v) 
+                str(k)
+                if k is not None and not (isinstance(k, float) and pd.isna(k))
+                else 'null': int(v)
                 for k, v in value_counts.items()
             }
         
@@ -321,18 +544,339 @@ class DataService:
         """Get summary statistics for categorical columns"""
         if self._df is None:
             return {}
-        categorical_cols = self._df.select_dtypes(include=['object', 'category']).columns
+        categorical_cols = self._df.select_dtypes(
+            include=['object', 'category']
+        ).columns
         return {
             col: self._df[col].value_counts().to_dict()
             for col in categorical_cols
         }
-    
-    def _add_transformation(self, operation: str, **params) -> None:
+
+    def _transform(
+        self,
+        steps: List[Dict[str, Any]],
+        progress: Optional[Callable[..., None]] = None,
+    ) -> None:
+        """Run steps on the current frame as one plan and log them"""
+        previous_df, previous_sections = self._df, self._profile_sections()
+        self._df = CleanPlan(steps).execute(
+            self._df, progress=progress, hashes=self._row_hashes
+        )
+        for i, step in enumerate(steps):
+            # Only the final state is materialized; undoing into an
+            # earlier one replays the log
+            self._add_transformation(
+                step['operation'], step['params'], mask=i == len(steps) - 1
+            )
+        self._carry_profile(previous_sections, previous_df, steps)
+
+    def _add_transformation(
+        self, operation: str, params: Dict[str, Any], mask: bool = True
+    ) -> None:
         """Add transformation to history"""
         self._transformation_history.append({
             'operation': operation,
-            'params': params
+            'params': dict(params)
         })
+        self._row_masks.append(self._row_mask() if mask else None)
+        self._redo_stack.clear()
+        self._bump_version()
+        
+    def get_data(self) -> pd.DataFrame:
+        """Current frame; callers must treat it as read-only"""
+        if self._df is None:
+            raise ValidationError("No data loaded")
+        return self._df
+        
+    def adopt_source(self, other: 'DataService') -> Dict[str, Any]:
+        """
+        Start from the parsed upload of another dataset with the
+        same file, skipping the parse.
+        The source frame is shared, as it is never modified; the
+        operation log starts empty.
+        Args:
+            other (DataService): A service whose source has the wanted digest.
+        Returns:
+            Dict[str, Any]: The data info, as returned by process_file.
+        """
+        if other._source_df is None:
+            raise ValidationError("No original data available")
+        # Profile sections already computed for the unmodified upload carry over
+        base_sections = dict(other._profile_cache.get(json.dumps([]), {}))
+        
+        self._source_df = self._df = other._source_df
+        self._file_path = other._file_path
+        self._source_digest = other._source_digest
+        # Each dataset has its own lock, so nothing mutable is shared: the frame is
+        # read-only, the stats are copied and the hash arrays are frozen
+        self._ingest_stats = copy.deepcopy(other._ingest_stats)
+        self._fingerprints = other._fingerprints.copy()
+        self._views.clear()
+        self._transformation_history.clear()
+        self._row_masks.clear()
+        self._redo_stack.clear()
+        self._profile_cache.clear()
+        self._profile_sections().update(base_sections)
+        self._bump_version()
+        logger.info(
+            f"Reused parsed upload {self._source_digest}. Shape: {self._df.shape}"
+        )
+        return self._get_ingest_info(engine='reused', parse_seconds=0.0)
+        
+    def _get_ingest_info(self, **overrides) -> Dict[str, Any]:
+        """Data info plus how the upload was parsed"""
+        info = self._get_data_info()
+        info['ingest'] = {
+            'engine': self._ingest_stats.engine,
+            'parse_seconds': self._ingest_stats.parse_seconds,
+            **overrides
+        }
+        return info
+        
+    def get_source_digest(self) -> Optional[str]:
+        return self._source_digest
+        
+    def get_numeric_columns(self) -> List[str]:
+        """
+        Numeric column names of the current frame, cached with the profile sections
+        """
+        if self._df is None:
+            raise ValidationError("No data loaded")
+        sections = self._profile_sections()
+        if 'numeric_columns' not in sections:
+            sections['numeric_columns'] = self._df.select_dtypes(
+                include=[np.number]
+            ).columns.tolist()
+        return sections['numeric_columns']
+        
+    def _row_hashes(self, name: str) -> Optional[np.ndarray]:
+        """
+        Value hashes of a current column, one per current row, taken from the source's
+        fingerprint index. None if the operation log changed the column's values.
+        """
+        if name not in self._source_df.columns:
+            return None
+        if self._transformation_history and name in written_columns(
+                self._transformation_history, self._source_df.columns.tolist()):
+            return None
+        hashes = self._fingerprints.column(self._source_df, name)
+        if self._df is self._source_df:
+            return hashes
+        if self._source_positions is None or self._source_positions[0] != self._version:
+            self._source_positions = (
+                self._version,
+                self._source_df.index.get_indexer(self._df.index),
+            )
+        return hashes[self._source_positions[1]]
+
+    def duplicate_report(
+        self, columns: Optional[List[str]] = None, limit: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Count duplicate rows of the current frame without building a deduplicated copy.
+        Rows are grouped by 64-bit row hashes, verified against the values.
+        Args:
+            columns (Optional[List[str]]): Key columns; all columns by default.
+            limit (int): Number of most repeated keys to return.
+        Returns:
+            Dict[str, Any]: Row, duplicate and group counts, and the most
+                repeated keys with their counts.
+        """
+        if self._df is None:
+            raise ValidationError("No data loaded")
+        columns = list(columns or self._df.columns)
+        unknown = [c for c in columns if c not in self._df.columns]
+        if unknown:
+            raise ValidationError(f"Unknown columns: {unknown}")
+        
+        hashes = []
+        for name in columns:
+            column_hashes = self._row_hashes(name)
+            hashes.append(
+                column_hashes
+                if column_hashes is not None
+                else hash_column(self._df[name])
+            )
+        codes, first, collisions = group_rows(
+            combine_hashes(hashes), columns,
+            lambda name, rows: self._df[name].iloc[rows],
+            lambda: exact_codes(self._df[columns])
+        )
+        counts = np.bincount(codes, minlength=len(first))
+        repeated = np.flatnonzero(counts > 1)
+        top = repeated[
+            np.argsort(-counts[repeated], kind='stable')[: max(int(limit), 0)]
+        ]
+        keys = self._df[columns].iloc[first[top]]
+        key_values = column_payload(keys)
+        return {
+            'rows': len(self._df),
+            'columns': columns,
+            'distinct_rows': len(first),
+            'duplicate_rows': len(self._df) - len(first),
+            'duplicate_groups': len(repeated),
+            'top_duplicates': [
+                {
+                    'key': {col: key_values[col][i] for col in columns},
+                    'count': int(counts[group]),
+                    'first_row': keys.index[i]
+                }
+                for i, group in enumerate(top)
+            ],
+            'hash_collisions': collisions
+        }
+
+    def get_rows(
+        self,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_ROWS,
+        sort: Optional[str] = None,
+        descending: bool = False,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        after: Optional[Any] = None,
+        columns: Optional[List[str]] = None,
+        raw: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        One page of the current frame, optionally filtered and sorted.
+        The filtered, sorted row order is cached per dataset state, so
+        later pages only read and serialize their own rows. With raw=True
+        'data' is the page as a DataFrame.
+        Args:
+            offset (int): Rows of the view to skip.
+            limit (int): Page size, at most MAX_PAGE_ROWS.
+            sort (Optional[str]): Column to sort by; missing values sort last.
+            descending (bool): Sort in descending order.
+            filters (Optional[List[Dict[str, Any]]]): Filter step params
+                (column, op, value), all applied.
+            after (Optional[Any]): Row label of the last row seen; the page
+                starts after it, overriding offset.
+            columns (Optional[List[str]]): Columns to return; all by default.
+        Returns:
+            Dict[str, Any]: The page with its row labels, the view's row count
+                and the cursor for the next page.
+        """
+        if self._df is None:
+            raise ValidationError("No data loaded")
+        if not 0 < limit <= MAX_PAGE_ROWS:
+            raise ValidationError(f"limit must be between 1 and {MAX_PAGE_ROWS}")
+        if offset < 0:
+            raise ValidationError("offset must not be negative")
+        if sort is not None and sort not in self._df.columns:
+            raise ValidationError(f"Unknown sort column: {sort}")
+        columns = list(columns or self._df.columns)
+        unknown = [c for c in columns if c not in self._df.columns]
+        if unknown:
+            raise ValidationError(f"Unknown columns: {unknown}")
+        filters = list(filters or [])
+
+        view_key = (
+            self._state_key(),
+            json.dumps(filters, sort_keys=True, default=str),
+            sort,
+            descending,
+        )
+        view = self._views.view(
+            view_key, lambda: self._build_view(filters, sort, descending)
+        )
+        if after is not None:
+            position = self._df.index.get_indexer([after])[0]
+            rank = view.rank(position) if position >= 0 else None
+            if rank is None:
+                raise ValidationError(f"Row {after} is not in this view")
+            offset = rank + 1
+        
+        positions = view.page(offset, limit)
+        # Taken column by column, so only the page's rows are copied
+        page = pd.DataFrame({col: self._df[col].take(positions) for col in columns})
+        has_more = offset + len(positions) < len(view)
+        return {
+            'total_rows': len(view),
+            'offset': offset,
+            'limit': limit,
+            'sort': sort,
+            'order': 'desc' if descending else 'asc',
+            'filters': filters,
+            'columns': columns,
+            'index': page.index.tolist(),
+            'data': page if raw else column_payload(page),
+            'next_after': page.index[-1] if has_more and len(page) else None
+        }
+
+    def _build_view(
+        self, filters: List[Dict[str, Any]], sort: Optional[str], descending: bool
+    ) -> View:
+        mask = filter_mask(self._df, filters) if filters else None
+        if sort is None:
+            positions = None if mask is None else np.flatnonzero(mask)
+        else:
+            permutation = self._sort_permutation(sort, descending)
+            positions = permutation if mask is None else permutation[mask[permutation]]
+        return View(positions, len(self._df))
+        
+    def _sort_permutation(self, column: str, descending: bool) -> np.ndarray:
+        """Sort order of the current rows by a column, cached per dataset state"""
+        def build() -> np.ndarray:
+            mask = self._row_masks[-1] if self._row_masks else None
+            if mask is not None:
+                # Rows were only removed, so the source's order is
+                # filtered instead of sorting again
+                source = self._views.sort(
+                    (json.dumps([]), column, descending),
+                    lambda: sort_permutation(self._source_df[column], descending)
+                )
+                return filter_permutation(
+                    source, np.unpackbits(mask, count=len(self._source_df)).view(bool)
+                )
+            return sort_permutation(self._df[column], descending)
+        return self._views.sort((self._state_key(), column, descending), build)
+        
+    def get_preview(self, rows: int = 10) -> pd.DataFrame:
+        """First rows of the current frame"""
+        if self._df is None:
+            raise ValidationError("No data loaded")
+        return self._df.head(rows)
+        
+    def memory_usage(self) -> int:
+        """Deep memory usage of the current and source frames as last measured"""
+        if self._df is None:
+            return 0
+        if self._df is self._source_df:
+            return self._memory_usage + self._fingerprints.nbytes + self._views.nbytes
+        return (
+            self._memory_usage
+            + self._source_memory_usage
+            + self._fingerprints.nbytes
+            + self._views.nbytes
+        )
+        
+    def get_version(self) -> int:
+        """Counter bumped whenever the current frame changes"""
+        return self._version
+        
+    def get_state_token(self) -> str:
+        """
+        Random token replaced whenever the current frame
+        changes, unique across processes
+        """
+        return self._state_token
+        
+    def _bump_version(self) -> None:
+        self._version += 1
+        self._state_token = uuid.uuid4().hex
         
     def get_file_path(self):
-        return self._file_path
\ No newline at end of file
+        return self._file_path
+        
+    def get_source_file(self) -> Optional[Path]:
+        """
+        Upload file holding exactly the current data, or None
+        once the data was transformed
+        """
+        if (
+            self._transformation_history
+            or self._file_path is None
+            or not Path(self._file_path).exists()
+        ):
+            return None
+        return Path(self._file_path)
\ No newline at end of file
@@ -0,0 +1,285 @@
+import logging
+import pickle
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.services.data_service import DataService
+from app.services.model_service import ModelService
+from app.utils.exceptions import DataProcessingError, ValidationError
+
+logger = logging.getLogger('yugen')
+
+DEFAULT_MEMORY_BUDGET = 4 * 1024 ** 3
+# Datasets not checked out for this long are removed from memory and disk
+DEFAULT_DATASET_TTL = 24 * 3600
+# Ids arrive in the session cookie and name spill files, so only
+# ids create() makes are accepted
+DATASET_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def valid_dataset_id(dataset_id) -> bool:
+    return (
+        isinstance(dataset_id, str)
+        and DATASET_ID_PATTERN.fullmatch(dataset_id) is not None
+    )
+
+
+class DatasetEntry:
+    """A single dataset with its own services and lock"""
+
+    def __init__(self, dataset_id: str):
+        self.dataset_id = dataset_id
+        self.lock = threading.RLock()
+        self.data_service: Optional[DataService] = DataService()
+        self.model_service: Optional[ModelService] = ModelService()
+        self.memory_usage = 0
+        self.spilled = False
+        self.removed = False
+        self.last_used = time.time()
+        # Data state token as of the last checkout, readable
+        # without the lock or a restore
+        self.state_token: Optional[str] = None
+
+    def measure(self) -> int:
+        """Refresh the in-memory footprint of the dataset"""
+        if self.spilled:
+            self.memory_usage = 0
+        else:
+            self.memory_usage = (
+                self.data_service.memory_usage() + self.model_service.memory_usage()
+            )
+            self.state_token = self.data_service.get_state_token()
+        return self.memory_usage
+
+
+class DatasetRegistry:
+    """Datasets keyed by id with LRU eviction to disk under a memory budget"""
+
+    def __init__(
+        self,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        spill_dir: Optional[Path] = None,
+        ttl: Optional[int] = DEFAULT_DATASET_TTL,
+    ):
+        self._memory_budget = memory_budget
+        self._ttl = ttl
+        self._spill_dir = Path(spill_dir or Path(tempfile.gettempdir()) / 'yugen_spill')
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: 'OrderedDict[str, DatasetEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._removal_listeners: List[Callable[[str], None]] = []
+
+    def create(self) -> str:
+        """Register an empty dataset and return its id"""
+        self.expire()
+        dataset_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[dataset_id] = DatasetEntry(dataset_id)
+        logger.info(f"Registered dataset {dataset_id}")
+        return dataset_id
+
+    def exists(self, dataset_id: Optional[str]) -> bool:
+        if not valid_dataset_id(dataset_id):
+            return False
+        with self._lock:
+            if dataset_id in self._entries:
+                return True
+        return self._spill_path(dataset_id).exists()
+
+    @contextmanager
+    def checkout(self, dataset_id: str) -> Iterator[DatasetEntry]:
+        """Lock a dataset for the duration of a request, restoring it if spilled"""
+        entry = self._get_entry(dataset_id)
+        with entry.lock:
+            if entry.removed:
+                # Expired between the lookup and the lock
+                raise ValidationError("No data loaded")
+            entry.last_used = time.time()
+            if entry.spilled:
+                self._restore(entry)
+            try:
+                yield entry
+            finally:
+                entry.measure()
+                entry.last_used = time.time()
+        self._enforce_budget()
+
+    def on_remove(self, listener: Callable[[str], None]) -> None:
+        """
+        Call listener(dataset_id) whenever a dataset is removed,
+        to drop what belongs to it
+        """
+        self._removal_listeners.append(listener)
+
+    def remove(self, dataset_id: str) -> None:
+        """Drop a dataset from memory and disk"""
+        if not valid_dataset_id(dataset_id):
+            raise ValidationError("No data loaded")
+        with self._lock:
+            entry = self._entries.pop(dataset_id, None)
+        if entry is not None:
+            entry.removed = True
+        self._spill_path(dataset_id).unlink(missing_ok=True)
+        for listener in self._removal_listeners:
+            try:
+                listener(dataset_id)
+            except Exception as e:
+                logger.error(f"Error cleaning up after dataset {dataset_id}: {str(e)}")
+        logger.info(f"Removed dataset {dataset_id}")
+
+    def expire(self) -> List[str]:
+        """
+        Remove datasets idle for longer than the TTL, with their spill files.
+        Spill files of datasets this process never loaded expire by modification time.
+        Returns:
+            List[str]: Ids of the removed datasets.
+        """
+        if self._ttl is None:
+            return []
+        cutoff = time.time() - self._ttl
+        with self._lock:
+            idle = [e for e in self._entries.values() if e.last_used < cutoff]
+        removed = []
+        for entry in idle:
+            # A dataset in use by a request is not idle
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.last_used < cutoff:
+                    self.remove(entry.dataset_id)
+                    removed.append(entry.dataset_id)
+            finally:
+                entry.lock.release()
+        for path in self._spill_dir.glob('*.pkl'):
+            dataset_id = path.stem
+            with self._lock:
+                if dataset_id in self._entries:
+                    continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    self.remove(dataset_id)
+                    removed.append(dataset_id)
+            except (FileNotFoundError, ValidationError):
+                continue
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'datasets': len(entries),
+            'resident': sum(1 for e in entries if not e.spilled),
+            'memory_usage': sum(e.memory_usage for e in entries),
+            'memory_budget': self._memory_budget
+        }
+
+    def find_by_digest(self, digest: str) -> Optional[str]:
+        """Id of a resident dataset whose upload had this content digest"""
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in reversed(entries):
+            data_service = entry.data_service
+            if (
+                not entry.spilled
+                and data_service is not None
+                and data_service.get_source_digest() == digest
+            ):
+                return entry.dataset_id
+        return None
+
+    def state_token(self, dataset_id: Optional[str]) -> Optional[str]:
+        """
+        Data state token of a dataset as of its last checkout, without restoring it.
+        None if this process hasn't checked the dataset out yet.
+        """
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            return entry.state_token if entry is not None else None
+
+    def largest_memory_usage(self) -> int:
+        """Last measured memory usage of the largest resident dataset"""
+        with self._lock:
+            return max(
+                (e.memory_usage for e in self._entries.values() if not e.spilled),
+                default=0,
+            )
+
+    def _get_entry(self, dataset_id: str) -> DatasetEntry:
+        if not valid_dataset_id(dataset_id):
+            raise ValidationError("No data loaded")
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                if not self._spill_path(dataset_id).exists():
+                    raise ValidationError("No data loaded")
+                # Spilled by another worker process, restore lazily on checkout
+                entry = DatasetEntry(dataset_id)
+                entry.data_service = None
+                entry.model_service = None
+                entry.spilled = True
+                self._entries[dataset_id] = entry
+            self._entries.move_to_end(dataset_id)
+            return entry
+
+    def _spill_path(self, dataset_id: str) -> Path:
+        return self._spill_dir / f"{dataset_id}.pkl"
+
+    def _spill(self, entry: DatasetEntry) -> None:
+        path = self._spill_path(entry.dataset_id)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((entry.data_service, entry.model_service), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+        logger.info(f"Spilled dataset {entry.dataset_id} ({entry.memory_usage} bytes)")
+        entry.data_service = None
+        entry.model_service = None
+        entry.spilled = True
+        entry.memory_usage = 0
+
+    def _restore(self, entry: DatasetEntry) -> None:
+        path = self._spill_path(entry.dataset_id)
+        try:
+            with open(path, 'rb') as f:
+                entry.data_service, entry.model_service = pickle.load(f)
+            # Keeps the file from expiring on other workers while this one uses it
+            path.touch()
+        except FileNotFoundError:
+            raise ValidationError("No data loaded") from None
+        except Exception as e:
+            logger.error(f"Error restoring dataset {entry.dataset_id}: {str(e)}")
+            raise DataProcessingError(f"Failed to restore dataset: {str(e)}") from e
+        entry.spilled = False
+        entry.measure()
+        logger.info(f"Restored dataset {entry.dataset_id} from disk")
+
+    def _enforce_budget(self) -> None:
+        """Spill least recently used datasets until resident memory fits the budget"""
+        with self._lock:
+            candidates = [e for e in self._entries.values() if not e.spilled]
+        resident = sum(e.memory_usage for e in candidates)
+        # Keep the most recently used dataset resident even if it
+        # alone exceeds the budget
+        for entry in candidates[:-1]:
+            if resident <= self._memory_budget:
+                break
+            # Never spill a dataset that is in use by another request
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.spilled or entry.memory_usage == 0:
+                    continue
+                size = entry.memory_usage
+                self._spill(entry)
+                resident -= size
+            except Exception as e:
+                logger.error(f"Error spilling dataset {entry.dataset_id}: {str(e)}")
+            finally:
+                entry.lock.release()
@@ -0,0 +1,139 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINS = 50
+MAX_BINS = 1000
+DEFAULT_MAX_POINTS = 10_000
+MAX_POINTS_LIMIT = 200_000
+# Grid used to stratify scatter samples so sparse regions and outliers survive
+SAMPLE_GRID = 64
+
+
+def _as_numeric(series: pd.Series):
+    """
+    Float view of a numeric or datetime series, with a function mapping values back
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = (
+            series.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+        )
+        return values, lambda v: v.astype(np.int64).astype('datetime64[ns]')
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(
+        series.dtype
+    ):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan), lambda v: v
+    return None, None
+
+
+def trace_to_json(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the NumPy arrays of a trace into JSON-ready lists"""
+    converted = {}
+    for key, value in trace.items():
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind == 'M':
+                value = np.datetime_as_string(value, unit='s')
+            value = value.tolist()
+        converted[key] = value
+    return converted
+
+
+def histogram_trace(series: pd.Series, bins: int = DEFAULT_BINS) -> Dict[str, Any]:
+    """Pre-binned histogram as a bar trace whose size depends only on bins"""
+    series = series.dropna()
+    values, convert = _as_numeric(series)
+    if values is None:
+        counts = series.value_counts().head(bins)
+        return {
+            'x': counts.index.astype(str).to_numpy(dtype=object),
+            'y': counts.to_numpy(),
+            'type': 'bar'
+        }
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {'x': np.empty(0), 'y': np.empty(0, dtype=np.int64), 'type': 'bar'}
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        'x': convert((edges[:-1] + edges[1:]) / 2),
+        'y': counts,
+        'width': np.diff(edges),
+        'type': 'bar',
+        'binned': True
+    }
+
+
+def _stratified_sample(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Row positions spread evenly over occupied grid cells"""
+    def cell(values):
+        low, high = values.min(), values.max()
+        span = high - low if high > low else 1.0
+        return np.minimum(
+            ((values - low) / span * SAMPLE_GRID).astype(np.int64), SAMPLE_GRID - 1
+        )
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(x))
+    cells = (cell(x) * SAMPLE_GRID + cell(y))[order]
+    rank = pd.Series(cells).groupby(cells).cumcount().to_numpy()
+    occupied = len(np.unique(cells))
+    per_cell = max(1, max_points // occupied)
+    # Fill each cell up to per_cell points, then top up with the next-ranked points
+    keep = np.flatnonzero(rank < per_cell)
+    if len(keep) < max_points:
+        extra = np.flatnonzero(rank >= per_cell)
+        extra = extra[np.argsort(rank[extra], kind='stable')][:max_points - len(keep)]
+        keep = np.concatenate([keep, extra])
+    return np.sort(order[keep[:max_points]])
+
+
+def scatter_trace(x: pd.Series, y: pd.Series, max_points: int = DEFAULT_MAX_POINTS,
+                  strategy: str = 'sample', bins: int = DEFAULT_BINS) -> Dict[str, Any]:
+    """Scatter trace capped at max_points, or a density heatmap"""
+    x_values, x_convert = _as_numeric(x)
+    y_values, y_convert = _as_numeric(y)
+    numeric = x_values is not None and y_values is not None
+    if numeric:
+        finite = np.isfinite(x_values) & np.isfinite(y_values)
+        x_values, y_values = x_values[finite], y_values[finite]
+        x, y = x[finite], y[finite]
+
+    if len(x) <= max_points:
+        return {
+            'x': x_convert(x_values) if numeric else x.to_numpy(dtype=object),
+            'y': y_convert(y_values) if numeric else y.to_numpy(dtype=object),
+            'mode': 'markers',
+            'type': 'scatter'
+        }
+
+    if numeric and strategy == 'density':
+        counts, x_edges, y_edges = np.histogram2d(x_values, y_values, bins=bins)
+        return {
+            'x': x_convert((x_edges[:-1] + x_edges[1:]) / 2),
+            'y': y_convert((y_edges[:-1] + y_edges[1:]) / 2),
+            # Plotly heatmaps index z by row (y) then column (x)
+            'z': counts.T.astype(np.int64),
+            'type': 'heatmap',
+            'colorscale': 'Greys',
+            'binned': True
+        }
+
+    if numeric:
+        positions = _stratified_sample(x_values, y_values, max_points)
+        x_out, y_out = x_convert(x_values[positions]), y_convert(y_values[positions])
+    else:
+        positions = np.sort(
+            np.random.default_rng(0).choice(len(x), max_points, replace=False)
+        )
+        x_out, y_out = (
+            x.to_numpy(dtype=object)[positions],
+            y.to_numpy(dtype=object)[positions],
+        )
+    return {
+        'x': x_out,
+        'y': y_out,
+        'mode': 'markers',
+        'type': 'scatter',
+        'sampled': True,
+        'total_points': int(len(x))
+    }
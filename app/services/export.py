@@ -0,0 +1,121 @@
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from app.utils.metrics import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+    pq = None
+
+logger = logging.getLogger('yugen')
+
+DEFAULT_EXPORT_TTL = 3600
+EXPORT_CHUNK_ROWS = 100_000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """Yield a frame as CSV text, one slice of rows at a time"""
+    yield df.head(0).to_csv(index=False)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False)
+
+
+class ExportManager:
+    """Materialises exports into a temp directory and deletes them after a TTL"""
+
+    def __init__(self, directory: Optional[Path] = None, ttl: int = DEFAULT_EXPORT_TTL):
+        self._directory = Path(
+            directory or Path(tempfile.gettempdir()) / 'yugen_exports'
+        )
+        self._ttl = ttl
+
+    def configure(
+        self, directory: Optional[Path] = None, ttl: Optional[int] = None
+    ) -> None:
+        if directory:
+            self._directory = Path(directory)
+        if ttl is not None:
+            self._ttl = ttl
+
+    @timed('export')
+    def materialize(self, df: pd.DataFrame, name: str, fmt: str) -> Path:
+        """
+        Write a frame to an export file, reusing one already
+        written under the same name.
+        Args:
+            df (pd.DataFrame): Frame to export.
+            name (str): Stable name for this frame, e.g. dataset id and state token.
+            fmt (str): 'parquet' or 'xlsx'.
+        Returns:
+            Path: The export file.
+        """
+        self.cleanup()
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._directory / f"{name}.{fmt}"
+        if path.exists():
+            path.touch()
+            return path
+
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        try:
+            if fmt == 'parquet':
+                self._write_parquet(df, tmp_path)
+            elif fmt == 'xlsx':
+                df.to_excel(tmp_path, index=False)
+            else:
+                raise ValueError(f"Unsupported export format: {fmt}")
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        logger.info(f"Exported {df.shape} to {path}")
+        return path
+
+    def _write_parquet(self, df: pd.DataFrame, path: Path) -> None:
+        if pq is None:
+            raise ValueError("Parquet export requires pyarrow")
+        # Inferred from the whole frame: a slice can miss a column's type,
+        # e.g. if it is all null there
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(path, schema) as writer:
+            # One row group per slice so the whole frame is never converted at once
+            for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+                writer.write_table(
+                    pa.Table.from_pandas(
+                        df.iloc[start : start + EXPORT_CHUNK_ROWS],
+                        schema=schema,
+                        preserve_index=False,
+                    )
+                )
+
+    def cleanup(self, max_age: Optional[float] = None) -> int:
+        """Delete exports not used for longer than the TTL"""
+        if not self._directory.exists():
+            return 0
+        cutoff = time.time() - (self._ttl if max_age is None else max_age)
+        removed = 0
+        for path in self._directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            logger.info(f"Removed {removed} expired exports")
+        return removed
+
+
+export_manager = ExportManager()
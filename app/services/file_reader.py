@@ -0,0 +1,386 @@
+import importlib.util
+import io
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from joblib import Parallel, delayed
+
+from app.services.ingest import (
+    DEFAULT_CHUNKSIZE,
+    IngestStats,
+    combine_chunks,
+    downcast_chunk,
+    read_csv_chunked,
+)
+from app.services.sketches import ProfileSketch
+from app.utils.exceptions import ValidationError
+from app.utils.metrics import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = pa_csv = None
+
+logger = logging.getLogger('yugen')
+
+NA_VALUES = ['', 'NULL', 'null', 'None', 'N/A', 'n/a', '#N/A']
+# pandas' default NA strings, which na_values adds to; pyarrow needs the full list
+PANDAS_NA_VALUES = [
+    '',
+    '#N/A',
+    '#N/A N/A',
+    '#NA',
+    '-1.#IND',
+    '-1.#QNAN',
+    '-NaN',
+    '-nan',
+    '1.#IND',
+    '1.#QNAN',
+    '<NA>',
+    'N/A',
+    'NA',
+    'NULL',
+    'NaN',
+    'None',
+    'n/a',
+    'nan',
+    'null',
+]
+# CSVs larger than this are streamed in chunks and downcast
+STREAMING_THRESHOLD = 64 * 1024 ** 2
+# Smaller CSVs go to the pandas parser, as starting threads outweighs the gain
+PYARROW_MIN_BYTES = 1024 ** 2
+ARROW_BLOCK_SIZE = 16 * 1024 ** 2
+# Byte range parsed by one worker of the parallel engine
+PARALLEL_RANGE_BYTES = 32 * 1024 ** 2
+
+READ_ENGINES: Dict[str, Tuple[str, ...]] = {
+    '.csv': ('pandas', 'pyarrow', 'parallel'),
+    '.xlsx': ('pandas', 'calamine'),
+    '.xls': ('pandas', 'calamine')
+}
+ENGINE_NAMES = ('pandas', 'pyarrow', 'parallel', 'calamine')
+
+
+def engine_available(engine: str) -> bool:
+    if engine == 'pyarrow':
+        return pa_csv is not None
+    if engine == 'parallel':
+        return (os.cpu_count() or 1) > 1
+    if engine == 'calamine':
+        return importlib.util.find_spec('python_calamine') is not None
+    return engine == 'pandas'
+
+
+def select_engine(file_path: Path, engine: Optional[str] = None) -> str:
+    """
+    Pick the reader for a file.
+    Args:
+        file_path (Path): CSV or Excel file.
+        engine (Optional[str]): Requested engine; by default chosen
+            from the file type and size.
+    Returns:
+        str: One of READ_ENGINES for the file type.
+    """
+    engines = READ_ENGINES.get(file_path.suffix)
+    if engines is None:
+        raise ValidationError(f"Unsupported file type: {file_path.suffix}")
+    if engine is not None:
+        if engine not in engines:
+            raise ValidationError(
+                f"Engine {engine} can't read {file_path.suffix} files. "
+                f"Use one of: {', '.join(engines)}"
+            )
+        if not engine_available(engine):
+            raise ValidationError(f"Engine {engine} is not available")
+        return engine
+    if file_path.suffix != '.csv':
+        return 'calamine' if engine_available('calamine') else 'pandas'
+    size = file_path.stat().st_size
+    if size >= PYARROW_MIN_BYTES and engine_available('pyarrow'):
+        return 'pyarrow'
+    if size > STREAMING_THRESHOLD and engine_available('parallel'):
+        return 'parallel'
+    return 'pandas'
+
+
+@timed('parse')
+def read_file(
+    file_path: Path,
+    stats: Optional[IngestStats] = None,
+    progress: Optional[Callable[..., None]] = None,
+    engine: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Parse an uploaded CSV or Excel file, collecting ingest stats if requested.
+    The engine and parse time are recorded on stats. A pyarrow parse that pandas would
+    read differently (ragged rows, mixed types, bad encoding) is retried with pandas.
+    """
+    engine = select_engine(file_path, engine)
+    started = time.perf_counter()
+    streaming = file_path.stat().st_size > STREAMING_THRESHOLD
+    if (
+        streaming
+        and file_path.suffix == '.csv'
+        and stats is not None
+        and stats.sketch is None
+    ):
+        # Large inputs get approximate-profile sketches built during the read
+        stats.sketch = ProfileSketch()
+
+    chunks = None
+    if engine == 'pyarrow':
+        try:
+            chunks = _read_csv_arrow(file_path, streaming, progress)
+        except pa.ArrowInvalid as e:
+            logger.warning(
+                f"pyarrow could not parse {file_path.name}, using pandas: {str(e)}"
+            )
+            engine = 'pandas'
+    elif engine == 'parallel':
+        chunks = _read_csv_parallel(file_path, progress)
+
+    # The chunked pandas reader folds its chunks into stats as it goes
+    collected = False
+    if chunks is not None:
+        if stats is not None:
+            for chunk in chunks:
+                stats.update(chunk)
+            collected = True
+        if not chunks:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        df = combine_chunks(chunks)
+    elif file_path.suffix == '.csv':
+        if streaming:
+            logger.info("Reading CSV file in chunks")
+            df = read_csv_chunked(
+                file_path,
+                stats=stats,
+                progress=progress,
+                encoding='utf-8',
+                na_values=NA_VALUES
+            )
+            collected = True
+        else:
+            logger.info("Reading CSV file")
+            df = pd.read_csv(
+                file_path,
+                encoding='utf-8',
+                na_values=NA_VALUES
+            )
+    else:
+        logger.info("Reading Excel file")
+        df = pd.read_excel(
+            file_path,
+            engine='calamine' if engine == 'calamine' else None,
+            na_values=NA_VALUES
+        )
+        # Excel can't be streamed by pandas, but the sheet still gets downcast
+        if streaming:
+            df = downcast_chunk(df)
+
+    if stats is not None:
+        if not collected:
+            stats.update(df)
+        stats.engine = engine
+        stats.parse_seconds = time.perf_counter() - started
+    if progress is not None and chunks is None:
+        progress(rows_parsed=len(df), chunks_done=1)
+    logger.info(
+        f"Parsed {file_path.name} with {engine} in {time.perf_counter() - started:.2f}s"
+    )
+    return df
+
+
+def _arrow_frame(table) -> pd.DataFrame:
+    # Columns without a single value are float NaN in pandas, not None
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table.to_pandas()
+
+
+def _read_csv_arrow(
+    file_path: Path, streaming: bool, progress: Optional[Callable[..., None]] = None
+) -> List[pd.DataFrame]:
+    """
+    Parse a CSV with pyarrow's multithreaded reader, matching what pandas would return.
+    Large files are read as a stream of record batches, downcast a chunk at a time.
+    """
+    logger.info("Reading CSV file with pyarrow")
+    # pandas' header handling (duplicate and blank names) is kept by
+    # naming the columns up front
+    read_options = pa_csv.ReadOptions(
+        column_names=read_columns(file_path), skip_rows=1, block_size=ARROW_BLOCK_SIZE
+    )
+    convert_options = pa_csv.ConvertOptions(
+        null_values=sorted(set(PANDAS_NA_VALUES) | set(NA_VALUES)),
+        strings_can_be_null=True,
+    )
+    # pandas leaves dates as strings, so columns pyarrow would parse
+    # as timestamps are read as text
+    with pa_csv.open_csv(
+        file_path, read_options=read_options, convert_options=convert_options
+    ) as reader:
+        temporal = {
+            f.name: pa.string() for f in reader.schema if pa.types.is_temporal(f.type)
+        }
+    convert_options.column_types = temporal
+
+    if not streaming:
+        table = pa_csv.read_csv(
+            file_path, read_options=read_options, convert_options=convert_options
+        )
+        if any(pa.types.is_temporal(field.type) for field in table.schema):
+            raise pa.ArrowInvalid("Dates found after the first block")
+        chunks = [_arrow_frame(table)]
+        if progress is not None:
+            progress(rows_parsed=len(chunks[0]), chunks_done=1)
+        return chunks
+
+    chunks = []
+    rows = 0
+    batches = []
+    batch_rows = 0
+    with pa_csv.open_csv(
+        file_path, read_options=read_options, convert_options=convert_options
+    ) as reader:
+        for batch in reader:
+            batches.append(batch)
+            batch_rows += batch.num_rows
+            if batch_rows < DEFAULT_CHUNKSIZE:
+                continue
+            chunks.append(downcast_chunk(_arrow_frame(pa.Table.from_batches(batches))))
+            rows += batch_rows
+            batches, batch_rows = [], 0
+            if progress is not None:
+                progress(rows_parsed=rows, chunks_done=len(chunks))
+    if batches:
+        chunks.append(downcast_chunk(_arrow_frame(pa.Table.from_batches(batches))))
+        if progress is not None:
+            progress(rows_parsed=rows + batch_rows, chunks_done=len(chunks))
+    return chunks
+
+
+def split_ranges(
+    file_path: Path, range_bytes: int = PARALLEL_RANGE_BYTES
+) -> List[Tuple[int, int]]:
+    """
+    Split a CSV's data rows into byte ranges of about range_bytes.
+    Ranges end at a newline with an even number of quotes before
+    it, so no quoted field is cut.
+    """
+    size = file_path.stat().st_size
+    with open(file_path, 'rb') as f:
+        def next_row_end(start: int, offset: int) -> int:
+            # First newline at or after offset that isn't inside a
+            # quoted field begun after start
+            f.seek(start)
+            quotes = f.read(offset - start).count(b'"')
+            f.seek(offset)
+            position = offset
+            for block in iter(lambda: f.read(1024 ** 2), b''):
+                index = 0
+                while True:
+                    newline = block.find(b'\n', index)
+                    if newline == -1:
+                        quotes += block.count(b'"', index)
+                        break
+                    quotes += block.count(b'"', index, newline)
+                    if quotes % 2 == 0:
+                        return position + newline + 1
+                    index = newline + 1
+                position += len(block)
+            return size
+
+        ranges = []
+        start = next_row_end(0, 0)
+        while start < size:
+            end = next_row_end(start, min(start + range_bytes, size))
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _read_range(
+    file_path: Path, start: int, end: int, columns: List[str]
+) -> pd.DataFrame:
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    chunk = pd.read_csv(
+        io.BytesIO(data),
+        header=None,
+        names=columns,
+        encoding='utf-8',
+        na_values=NA_VALUES,
+    )
+    return downcast_chunk(chunk)
+
+
+def _read_csv_parallel(
+    file_path: Path, progress: Optional[Callable[..., None]] = None
+) -> List[pd.DataFrame]:
+    """
+    Parse byte ranges of a CSV in worker processes, as the chunked
+    reader would parse its chunks
+    """
+    columns = read_columns(file_path)
+    ranges = split_ranges(file_path)
+    logger.info(f"Reading CSV file in {len(ranges)} ranges across processes")
+    chunks = []
+    rows = 0
+    parallel = Parallel(
+        n_jobs=min(len(ranges), os.cpu_count() or 1) or 1, return_as='generator'
+    )
+    for chunk in parallel(
+        delayed(_read_range)(file_path, start, end, columns) for start, end in ranges
+    ):
+        chunks.append(chunk)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows_parsed=rows, chunks_done=len(chunks))
+    return chunks
+
+
+def read_columns(file_path: Path) -> List[str]:
+    """Column names of an upload, read from its header only"""
+    if file_path.suffix == '.csv':
+        return pd.read_csv(file_path, nrows=0, encoding='utf-8').columns.tolist()
+    if file_path.suffix in ['.xlsx', '.xls']:
+        return pd.read_excel(file_path, nrows=0).columns.tolist()
+    raise ValidationError(f"Unsupported file type: {file_path.suffix}")
+
+
+def iter_file_chunks(
+    file_path: Path, columns: List[str], chunksize: int
+) -> Callable[[], Iterator[pd.DataFrame]]:
+    """
+    Chunk source reading only the given columns of an upload, a chunk at a time.
+    Args:
+        file_path (Path): CSV or Excel file.
+        columns (List[str]): Columns to read.
+        chunksize (int): Rows per chunk.
+    Returns:
+        Callable[[], Iterator[pd.DataFrame]]: Returns a fresh
+            chunk iterator on every call.
+    """
+    if file_path.suffix not in ['.csv', '.xlsx', '.xls']:
+        raise ValidationError(f"Unsupported file type: {file_path.suffix}")
+
+    def iterate():
+        if file_path.suffix == '.csv':
+            with pd.read_csv(file_path, usecols=columns, chunksize=chunksize,
+                             encoding='utf-8', na_values=NA_VALUES) as reader:
+                yield from reader
+        else:
+            # Excel can't be streamed, so the selected columns are read once and sliced
+            df = pd.read_excel(file_path, usecols=columns, na_values=NA_VALUES)
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+    return iterate
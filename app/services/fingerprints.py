@@ -0,0 +1,134 @@
+import logging
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('yugen')
+
+# Multiplier schedule for mixing column hashes into a row
+# hash, as in CPython's tuple hash
+_HASH_START = np.uint64(0x345678)
+_HASH_MULTIPLIER = 1000003
+
+# take(column, rows) -> values of that column at the given row positions
+Take = Callable[[str, np.ndarray], pd.Series]
+
+
+def hash_column(series: pd.Series) -> np.ndarray:
+    """
+    Vectorized 64-bit hash of each value, equal for values pandas treats as duplicates
+    """
+    if series.dtype.kind == 'f':
+        # -0.0 and 0.0 are duplicates but have different bits
+        series = series + 0.0
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+def combine_hashes(arrays: List[np.ndarray]) -> np.ndarray:
+    """Order-sensitive row hash from per-column hashes"""
+    if len(arrays) == 1:
+        return arrays[0]
+    with np.errstate(over='ignore'):
+        result = np.full(len(arrays[0]), _HASH_START, dtype=np.uint64)
+        multiplier = np.uint64(_HASH_MULTIPLIER)
+        for i, array in enumerate(arrays):
+            result = (result ^ array) * multiplier
+            multiplier += np.uint64(82520 + 2 * (len(arrays) - i))
+    return result
+
+
+def first_rows(codes: np.ndarray) -> np.ndarray:
+    """Position of the first row of each code, for codes numbered by first appearance"""
+    if not len(codes):
+        return np.empty(0, dtype=np.intp)
+    is_first = np.empty(len(codes), dtype=bool)
+    is_first[0] = True
+    # A code's first row is the one where it exceeds every earlier code
+    is_first[1:] = codes[1:] > np.maximum.accumulate(codes)[:-1]
+    return np.flatnonzero(is_first)
+
+
+def _same_values(a: pd.Series, b: pd.Series) -> np.ndarray:
+    a, b = a.to_numpy(), b.to_numpy()
+    both_missing = pd.isna(a) & pd.isna(b)
+    with np.errstate(invalid='ignore'):
+        return np.asarray(a == b, dtype=bool) | both_missing
+
+
+def group_rows(hashes: np.ndarray, columns: List[str], take: Take,
+               exact: Callable[[], np.ndarray]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Number rows by the first appearance of their key, from row hashes.
+    Every row that shares a hash with an earlier row is compared with that row's values;
+    if any pair differs (a hash collision), the codes are recomputed exactly.
+    Args:
+        hashes (np.ndarray): Row hashes over the key columns.
+        columns (List[str]): Key columns.
+        take (Take): Reads key values at row positions, for verification.
+        exact (Callable[[], np.ndarray]): Exact codes, used only after a collision.
+    Returns:
+        Tuple[np.ndarray, np.ndarray, int]: Codes per row, first row per
+            code and the number of collisions.
+    """
+    codes = pd.factorize(hashes)[0]
+    first = first_rows(codes)
+    repeated = np.ones(len(codes), dtype=bool)
+    repeated[first] = False
+    rows = np.flatnonzero(repeated)
+    collisions = 0
+    if len(rows):
+        references = first[codes[rows]]
+        same = np.ones(len(rows), dtype=bool)
+        for name in columns:
+            same &= _same_values(take(name, rows), take(name, references))
+        collisions = int((~same).sum())
+    if collisions:
+        logger.warning(
+            f"{collisions} row hash collisions on {columns}, grouping exactly"
+        )
+        codes = exact()
+        first = first_rows(codes)
+    return codes, first, collisions
+
+
+def exact_codes(frame: pd.DataFrame) -> np.ndarray:
+    """Codes numbering rows by the first appearance of their values"""
+    return (
+        frame.groupby(list(frame.columns), dropna=False, sort=False, observed=True)
+        .ngroup()
+        .to_numpy()
+    )
+
+
+class FingerprintIndex:
+    """
+    Per-column value hashes of a dataset's source frame, computed
+    once per column on first use
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, np.ndarray] = {}
+
+    def column(self, df: pd.DataFrame, name: str) -> np.ndarray:
+        hashes = self._hashes.get(name)
+        if hashes is None:
+            hashes = hash_column(df[name])
+            # Shared by copies of the index, so never written in place
+            hashes.flags.writeable = False
+            self._hashes[name] = hashes
+        return hashes
+
+    def copy(self) -> 'FingerprintIndex':
+        """An index sharing the hashes computed so far, filling its own from then on"""
+        index = FingerprintIndex()
+        index._hashes = dict(self._hashes)
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        return sum(hashes.nbytes for hashes in self._hashes.values())
+
+    def __getstate__(self):
+        # Recomputed on demand rather than spilled to disk with the dataset
+        return {'_hashes': {}}
@@ -0,0 +1,258 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, SGDRegressor
+
+from app.services.sketches import TDigest
+
+SOLVERS = ('ols', 'sgd')
+DEFAULT_TRAIN_CHUNKSIZE = 100_000
+DEFAULT_EPOCHS = 5
+# Resolution of the hash-based holdout assignment
+HOLDOUT_BUCKETS = 10_000
+
+ChunkSource = Callable[[], Iterator[pd.DataFrame]]
+
+
+def frame_chunks(df: pd.DataFrame, columns: List[str], chunksize: int) -> ChunkSource:
+    """Chunk source over slices of an in-memory frame"""
+    def iterate():
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize][columns]
+    return iterate
+
+
+def holdout_mask(start: int, rows: int, test_size: float) -> np.ndarray:
+    """
+    Deterministic holdout assignment by global row position, identical on every pass
+    """
+    positions = np.arange(start, start + rows, dtype=np.uint64)
+    buckets = pd.util.hash_array(positions) % np.uint64(HOLDOUT_BUCKETS)
+    return buckets < np.uint64(round(test_size * HOLDOUT_BUCKETS))
+
+
+class RunningMoments:
+    """
+    Per-column count, mean and sum of squared deviations,
+    merged chunk by chunk, NaN-aware
+    """
+
+    def __init__(self, columns: int):
+        self.count = np.zeros(columns)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+
+    def update(self, values: np.ndarray) -> 'RunningMoments':
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        if not count.any():
+            return self
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(present, values, 0.0).sum(axis=0) / count
+            m2 = np.where(present, values - mean, 0.0)
+            m2 = np.einsum('ij,ij->j', m2, m2)
+            mean = np.nan_to_num(mean)
+            total = self.count + count
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = np.where(
+                total > 0,
+                self.m2 + m2 + delta * delta * self.count * count / total,
+                0.0,
+            )
+        self.count = total
+        return self
+
+    @property
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / self.count)
+        return np.where(std > 0, std, 1.0)
+
+
+class NormalEquations:
+    """Exact least squares from accumulated XᵀX and Xᵀy over mean-centred features"""
+
+    def __init__(self, center: np.ndarray):
+        size = len(center) + 1
+        self._center = center
+        self._xtx = np.zeros((size, size))
+        self._xty = np.zeros(size)
+
+    def update(self, X: np.ndarray, y: np.ndarray) -> 'NormalEquations':
+        # Centring keeps XᵀX well conditioned; the intercept column absorbs the shift
+        design = np.empty((len(X), X.shape[1] + 1))
+        design[:, 0] = 1.0
+        np.subtract(X, self._center, out=design[:, 1:])
+        self._xtx += design.T @ design
+        self._xty += design.T @ y
+        return self
+
+    def solve(self):
+        solution = np.linalg.lstsq(self._xtx, self._xty, rcond=None)[0]
+        coef = solution[1:]
+        return coef, float(solution[0] - coef @ self._center)
+
+
+class StreamingMetrics:
+    """
+    Regression metrics and median-threshold precision/recall
+    accumulated over holdout chunks
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.count = 0
+        self._moments = RunningMoments(1)
+        self._squared_error = 0.0
+        self._absolute_error = 0.0
+        self._true_positive = 0
+        self._predicted_positive = 0
+        self._actual_positive = 0
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray) -> 'StreamingMetrics':
+        errors = y_true - y_pred
+        self.count += len(y_true)
+        self._moments.update(y_true[:, None])
+        self._squared_error += float(errors @ errors)
+        self._absolute_error += float(np.abs(errors).sum())
+        actual = y_true > self.threshold
+        predicted = y_pred > self.threshold
+        self._true_positive += int(np.count_nonzero(actual & predicted))
+        self._predicted_positive += int(np.count_nonzero(predicted))
+        self._actual_positive += int(np.count_nonzero(actual))
+        return self
+
+    def result(self) -> Dict[str, float]:
+        total = float(self._moments.m2[0])
+        return {
+            'r2_score': 1 - self._squared_error / total if total > 0 else float('nan'),
+            'rmse': float(np.sqrt(self._squared_error / self.count)),
+            'mae': self._absolute_error / self.count,
+            'precision': self._true_positive / self._predicted_positive
+            if self._predicted_positive
+            else 0.0,
+            'recall': self._true_positive / self._actual_positive
+            if self._actual_positive
+            else 0.0,
+        }
+
+
+def linear_model(coef: np.ndarray, intercept: float, feature_columns: List[str],
+                 solver: str = 'ols'):
+    """Fitted sklearn estimator with the given raw-scale coefficients"""
+    model = LinearRegression() if solver == 'ols' else SGDRegressor()
+    model.coef_ = np.asarray(coef, dtype=np.float64)
+    model.intercept_ = intercept if solver == 'ols' else np.array([intercept])
+    model.n_features_in_ = len(feature_columns)
+    model.feature_names_in_ = np.asarray(feature_columns, dtype=object)
+    return model
+
+
+def train_streaming(
+    chunks: ChunkSource,
+    feature_columns: List[str],
+    target_column: str,
+    test_size: float = 0.2,
+    solver: str = 'ols',
+    epochs: int = DEFAULT_EPOCHS,
+    progress: Optional[Callable[..., None]] = None,
+) -> Dict[str, Any]:
+    """
+    Fit a linear model in passes over chunks, holding memory to one chunk at a time.
+    The first pass collects imputation means, scaling moments
+    and the holdout target median;
+    the next passes fit (one for 'ols', epochs for 'sgd'); the last
+    evaluates on the holdout rows.
+    Args:
+        chunks (ChunkSource): Callable returning a fresh
+            iterator of chunks for every pass.
+        feature_columns (List[str]): Feature columns.
+        target_column (str): Target column; rows without a target are skipped.
+        test_size (float): Share of rows held out for evaluation.
+        solver (str): 'ols' for exact normal equations, 'sgd'
+            for SGDRegressor.partial_fit.
+        epochs (int): Passes over the training rows for 'sgd'.
+        progress (Optional[Callable]): Receives the stage, pass and chunks done.
+    Returns:
+        Dict[str, Any]: 'model', 'imputation_means', holdout
+            'metrics', 'samples' and 'passes'.
+    """
+    n_features = len(feature_columns)
+
+    def passes(stage: str, holdout: bool, number: int):
+        """Imputable (X, y) of the training or holdout rows of each chunk"""
+        start = 0
+        for i, chunk in enumerate(chunks()):
+            rows = len(chunk)
+            X = chunk[feature_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            y = chunk[target_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            keep = ~np.isnan(y) & (holdout_mask(start, rows, test_size) == holdout)
+            start += rows
+            if progress is not None:
+                progress(stage=stage, passes_done=number, chunks_done=i + 1)
+            if keep.any():
+                yield X[keep], y[keep]
+
+    def impute(X):
+        return np.where(np.isnan(X), features.mean, X)
+
+    # Pass 1: imputation means and scaling moments over training
+    # rows, median over holdout rows
+    features = RunningMoments(n_features)
+    target = RunningMoments(1)
+    holdout_digest = TDigest()
+    start = 0
+    for i, chunk in enumerate(chunks()):
+        rows = len(chunk)
+        X = chunk[feature_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        y = chunk[target_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        in_holdout = holdout_mask(start, rows, test_size)
+        start += rows
+        train = ~np.isnan(y) & ~in_holdout
+        features.update(X[train])
+        target.update(y[train][:, None])
+        holdout_digest.update(y[in_holdout])
+        if progress is not None:
+            progress(stage='scanning', passes_done=0, chunks_done=i + 1)
+    if not target.count[0]:
+        raise ValueError("No training rows with a target value")
+    if not holdout_digest.count:
+        raise ValueError("No holdout rows; increase test_size or the number of rows")
+
+    if solver == 'ols':
+        equations = NormalEquations(features.mean)
+        for X, y in passes('fitting', False, 1):
+            equations.update(impute(X), y)
+        coef, intercept = equations.solve()
+        fit_passes = 1
+    else:
+        scale, y_mean, y_scale = (
+            features.std,
+            float(target.mean[0]),
+            float(target.std[0]),
+        )
+        sgd = SGDRegressor(random_state=0)
+        for epoch in range(epochs):
+            for X, y in passes('fitting', False, epoch + 1):
+                sgd.partial_fit(
+                    (impute(X) - features.mean) / scale, (y - y_mean) / y_scale
+                )
+        # Undo the standardisation so the model predicts on raw features
+        coef = sgd.coef_ * y_scale / scale
+        intercept = float(y_mean + y_scale * sgd.intercept_[0] - coef @ features.mean)
+        fit_passes = epochs
+    model = linear_model(coef, intercept, feature_columns, solver)
+
+    metrics = StreamingMetrics(float(holdout_digest.quantiles([0.5])[0]))
+    for X, y in passes('evaluating', True, fit_passes + 1):
+        metrics.update(y, impute(X) @ coef + intercept)
+
+    return {
+        'model': model,
+        'imputation_means': features.mean,
+        'metrics': metrics.result(),
+        'samples': {'train': int(target.count[0]), 'test': metrics.count},
+        'passes': fit_passes + 2
+    }
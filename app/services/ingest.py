@@ -0,0 +1,218 @@
+import logging
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from app.services.sketches import ProfileSketch
+
+logger = logging.getLogger('yugen')
+
+DEFAULT_CHUNKSIZE = 250_000
+# Strings with fewer distinct values than this fraction of rows become category
+CATEGORY_RATIO = 0.5
+
+_INT32 = np.iinfo(np.int32)
+
+
+def downcast_chunk(
+    chunk: pd.DataFrame, category_ratio: float = CATEGORY_RATIO
+) -> pd.DataFrame:
+    """Shrink a chunk's dtypes without losing information"""
+    columns = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        kind = series.dtype.kind
+        if kind == 'i':
+            if (
+                len(series)
+                and series.min() >= _INT32.min
+                and series.max() <= _INT32.max
+            ):
+                series = series.astype(np.int32)
+        elif kind == 'f' and series.dtype != np.float32:
+            values = series.to_numpy()
+            narrowed = values.astype(np.float32)
+            # Only when every value round-trips exactly, so stats are unchanged
+            if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+                series = pd.Series(narrowed, index=series.index, name=col)
+        elif kind == 'O':
+            n_unique = series.nunique(dropna=True)
+            if len(series) and n_unique < len(series) * category_ratio:
+                series = series.astype('category')
+        columns[col] = series
+    return pd.DataFrame(columns, index=chunk.index)
+
+
+def combine_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate downcast chunks column by column, unioning categories"""
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk.pop(col) for chunk in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            # Sorted like the categories astype('category') gives a single chunk
+            columns[col] = pd.Series(
+                union_categoricals(parts, sort_categories=True), name=col
+            )
+        else:
+            parts = [
+                p.astype(object) if isinstance(p.dtype, pd.CategoricalDtype) else p
+                for p in parts
+            ]
+            columns[col] = pd.concat(parts, ignore_index=True)
+        del parts
+    return pd.DataFrame(columns)
+
+
+class IngestStats:
+    """Row count, null counts and moments accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.null_counts: Optional[pd.Series] = None
+        self._numeric: Optional[pd.DataFrame] = None
+        self._non_numeric: set = set()
+        # Optional approximate-profile sketches, filled alongside the exact stats
+        self.sketch: Optional[ProfileSketch] = None
+        # Reader engine and parse time; None when the frame came from the columnar cache
+        self.engine: Optional[str] = None
+        self.parse_seconds: Optional[float] = None
+
+    def update(self, chunk: pd.DataFrame) -> 'IngestStats':
+        """Fold one chunk into the running statistics"""
+        self.rows += len(chunk)
+        self.chunks += 1
+        nulls = chunk.isna().sum()
+        self.null_counts = (
+            nulls
+            if self.null_counts is None
+            else self.null_counts.add(nulls, fill_value=0)
+        )
+
+        numeric = chunk.select_dtypes(include=[np.number])
+        self._non_numeric.update(
+            col for col in chunk.columns if col not in numeric.columns
+        )
+        if numeric.shape[1]:
+            values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                mean = np.nanmean(values, axis=0)
+                part = pd.DataFrame(
+                    {
+                        'count': (~np.isnan(values)).sum(axis=0).astype(np.float64),
+                        'mean': np.nan_to_num(mean),
+                        'm2': np.nansum((values - mean) ** 2, axis=0),
+                        'min': np.min(
+                            values, axis=0, initial=np.inf, where=~np.isnan(values)
+                        ),
+                        'max': np.max(
+                            values, axis=0, initial=-np.inf, where=~np.isnan(values)
+                        ),
+                    },
+                    index=numeric.columns,
+                )
+            self._numeric = (
+                part
+                if self._numeric is None
+                else self._merge_moments(self._numeric, part)
+            )
+        if self.sketch is not None:
+            self.sketch.update(chunk)
+        return self
+
+    def merge(self, other: 'IngestStats') -> 'IngestStats':
+        """Combine statistics gathered over disjoint sets of rows"""
+        self.rows += other.rows
+        self.chunks += other.chunks
+        if other.null_counts is not None:
+            self.null_counts = (
+                other.null_counts.copy() if self.null_counts is None
+                else self.null_counts.add(other.null_counts, fill_value=0)
+            )
+        self._non_numeric |= other._non_numeric
+        if other._numeric is not None:
+            self._numeric = (
+                other._numeric.copy() if self._numeric is None
+                else self._merge_moments(self._numeric, other._numeric)
+            )
+        if other.sketch is not None:
+            self.sketch = (
+                other.sketch if self.sketch is None else self.sketch.merge(other.sketch)
+            )
+        return self
+
+    @staticmethod
+    def _merge_moments(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+        """Chan et al. parallel update of count, mean and M2"""
+        index = a.index.union(b.index, sort=False)
+        fill = {'count': 0.0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf}
+        a = a.reindex(index).fillna(fill)
+        b = b.reindex(index).fillna(fill)
+        n = a['count'] + b['count']
+        safe_n = n.where(n > 0, 1.0)
+        delta = b['mean'] - a['mean']
+        return pd.DataFrame({
+            'count': n,
+            'mean': a['mean'] + delta * b['count'] / safe_n,
+            'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / safe_n,
+            'min': np.minimum(a['min'], b['min']),
+            'max': np.maximum(a['max'], b['max'])
+        }, index=index)
+
+    def total_nulls(self) -> int:
+        return int(self.null_counts.sum()) if self.null_counts is not None else 0
+
+    def missing_by_column(self) -> Dict[str, int]:
+        if self.null_counts is None:
+            return {}
+        return {col: int(count) for col, count in self.null_counts.items()}
+
+    def numeric_summary(self) -> Dict[str, Dict[str, Any]]:
+        """count/mean/std/min/max for columns that were numeric in every chunk"""
+        if self._numeric is None:
+            return {}
+        stats = self._numeric.drop(index=list(self._non_numeric), errors='ignore')
+        summary = {}
+        for col, row in stats.iterrows():
+            count = int(row['count'])
+            summary[col] = {
+                'count': count,
+                'mean': float(row['mean']) if count else None,
+                'std': float(np.sqrt(row['m2'] / (count - 1))) if count > 1 else None,
+                'min': float(row['min']) if count else None,
+                'max': float(row['max']) if count else None
+            }
+        return summary
+
+
+def read_csv_chunked(
+    file_path: Path,
+    stats: Optional[IngestStats] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    progress: Optional[Callable[..., None]] = None,
+    **read_kwargs,
+) -> pd.DataFrame:
+    """Stream a CSV in chunks, downcasting each chunk before it is kept"""
+    chunks = []
+    rows = 0
+    with pd.read_csv(file_path, chunksize=chunksize, **read_kwargs) as reader:
+        for chunk in reader:
+            chunk = downcast_chunk(chunk)
+            if stats is not None:
+                stats.update(chunk)
+            chunks.append(chunk)
+            rows += len(chunk)
+            logger.info(f"Read chunk {len(chunks)} ({len(chunk)} rows)")
+            if progress is not None:
+                progress(rows_parsed=rows, chunks_done=len(chunks))
+    if not chunks:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    return combine_chunks(chunks)
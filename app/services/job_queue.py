@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.exceptions import ValidationError
+
+logger = logging.getLogger('yugen')
+
+DEFAULT_JOB_TTL = 3600
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobCancelled(BaseException):
+    """
+    Raised at a progress checkpoint; BaseException so service
+    error handling lets it through
+    """
+
+
+class Job:
+    """A unit of background work with progress, result and cooperative cancellation"""
+
+    def __init__(self, kind: str, owner: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        self._cancel_requested = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def report(self, **progress) -> None:
+        """Record progress; raises JobCancelled once cancellation was requested"""
+        self.progress.update(progress)
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == SUCCEEDED:
+            data['result'] = self.result
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobBackend(ABC):
+    """Where jobs run; subclass to plug in another executor"""
+
+    @abstractmethod
+    def submit(self, fn: Callable[[], None]) -> Future:
+        """Start fn() and return a future that completes when it returns"""
+
+    def shutdown(self) -> None:  # noqa: B027 - optional hook, most backends hold nothing
+        """Release the backend's workers; nothing to do by default"""
+
+
+class ThreadPoolBackend(JobBackend):
+    """In-process thread pool, sharing the dataset registry with request threads"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='yugen-job'
+        )
+
+    def submit(self, fn: Callable[[], None]) -> Future:
+        return self._executor.submit(fn)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class JobQueue:
+    """Tracks jobs submitted to a backend and forgets finished ones after a TTL"""
+
+    def __init__(
+        self, backend: Optional[JobBackend] = None, ttl: int = DEFAULT_JOB_TTL
+    ):
+        self._backend = backend or ThreadPoolBackend()
+        self._ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args,
+               owner: Optional[str] = None, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs) and return its job immediately"""
+        self._prune()
+        job = Job(kind, owner=owner)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._backend.submit(lambda: self._run(job, fn, args, kwargs))
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (job.owner is not None and job.owner != owner):
+            raise ValidationError(f"Job not found: {job_id}")
+        return job
+
+    def cancel(self, job_id: str, owner: Optional[str] = None) -> Job:
+        """
+        Cancel a queued job outright, or ask a running one to
+        stop at its next checkpoint
+        """
+        job = self.get(job_id, owner)
+        if job.status in FINISHED:
+            return job
+        job._cancel_requested.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        logger.info(f"Cancellation requested for job {job.id}")
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        """Number of tracked jobs per status"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {status: 0 for status in (QUEUED, RUNNING) + tuple(sorted(FINISHED))}
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+    def shutdown(self) -> None:
+        self._backend.shutdown()
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs) -> None:
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            self._finish(job, SUCCEEDED)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        logger.info(f"Job {job.id} {status}")
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in FINISHED and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,266 @@
+import json
+import logging
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from app.utils.exceptions import DataProcessingError, ValidationError
+from app.utils.metrics import timed
+
+logger = logging.getLogger('yugen')
+
+# create_app keeps models under the app's instance folder instead
+DEFAULT_MODEL_DIR = Path(tempfile.gettempdir()) / 'yugen_models'
+DEFAULT_MODEL_CACHE_SIZE = 16
+# Models not used for this long are deleted; they are also deleted with their dataset
+DEFAULT_MODEL_TTL = 7 * 24 * 3600
+# Upper bound on rows scored in one vectorised predict call
+MAX_BATCH_ROWS = 1_000_000
+
+
+class PredictionBatcher:
+    """
+    Scores concurrent requests for one model together.
+    The first caller scores its rows; requests arriving meanwhile queue
+    up and are scored by it in one vectorised predict call once it is
+    done, so batches grow with the load.
+    """
+
+    def __init__(
+        self, model, feature_means: np.ndarray, max_rows: int = MAX_BATCH_ROWS
+    ):
+        self._model = model
+        self._feature_means = feature_means
+        self._max_rows = max_rows
+        self._pending: List[Tuple[np.ndarray, Future]] = []
+        self._scoring = False
+        self._lock = threading.Lock()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((X, future))
+            lead = not self._scoring
+            self._scoring = True
+        if lead:
+            while True:
+                with self._lock:
+                    batch = self._take_batch()
+                    if not batch:
+                        self._scoring = False
+                        break
+                self._score(batch)
+        return future.result()
+
+    def _take_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        rows = 0
+        for i, (X, _) in enumerate(self._pending):
+            rows += len(X)
+            if rows > self._max_rows and i:
+                batch, self._pending = self._pending[:i], self._pending[i:]
+                return batch
+        batch, self._pending = self._pending, []
+        return batch
+
+    @timed('predict')
+    def _score(self, batch: List[Tuple[np.ndarray, Future]]) -> None:
+        try:
+            X = (
+                batch[0][0]
+                if len(batch) == 1
+                else np.concatenate([X for X, _ in batch])
+            )
+            X = np.where(np.isnan(X), self._feature_means, X)
+            predictions = np.asarray(self._model.predict(X), dtype=np.float64)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(
+                    DataProcessingError(f"Failed to make predictions: {str(e)}")
+                )
+            return
+        offsets = np.cumsum([len(X) for X, _ in batch])[:-1]
+        for (_, future), part in zip(
+            batch, np.split(predictions, offsets), strict=True
+        ):
+            future.set_result(part)
+
+
+class ModelRegistry:
+    """
+    Trained models persisted with joblib and their metadata,
+    loaded lazily into an LRU cache
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        cache_size: int = DEFAULT_MODEL_CACHE_SIZE,
+        ttl: Optional[int] = DEFAULT_MODEL_TTL,
+    ):
+        self._directory = Path(directory or DEFAULT_MODEL_DIR)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._cache_size = cache_size
+        self._ttl = ttl
+        self._loaded: 'OrderedDict[str, PredictionBatcher]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        for path in self._directory.glob('*.json'):
+            try:
+                metadata = json.loads(path.read_text())
+                self._metadata[metadata['id']] = metadata
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable model metadata {path}: {str(e)}")
+        self._prune()
+
+    def register(
+        self,
+        model,
+        results: Dict[str, Any],
+        imputation_means: Dict[str, float],
+        owner: Optional[str] = None,
+    ) -> str:
+        """
+        Persist a trained model as a new version.
+        Args:
+            model: Fitted estimator with a predict method.
+            results (Dict[str, Any]): Training results, stored as metadata.
+            imputation_means (Dict[str, float]): Per-feature values
+                used to fill missing inputs.
+            owner (Optional[str]): Dataset the model was trained
+                on; versions count per owner.
+        Returns:
+            str: The model id.
+        """
+        self._prune()
+        model_id = uuid.uuid4().hex
+        with self._lock:
+            version = 1 + sum(
+                1 for m in self._metadata.values() if m.get('owner') == owner
+            )
+        metadata = {
+            'id': model_id,
+            'version': version,
+            'owner': owner,
+            'created_at': time.time(),
+            'model_type': results.get('model_type'),
+            'feature_columns': list(results['feature_columns']),
+            'target_column': results.get('target_column'),
+            'imputation_means': imputation_means,
+            'results': dict(results)
+        }
+        model_path = self._directory / f"{model_id}.joblib"
+        tmp_path = model_path.with_suffix('.tmp')
+        joblib.dump(model, tmp_path)
+        tmp_path.replace(model_path)
+        # Metadata is written last, so a listed model always has its artifact
+        (self._directory / f"{model_id}.json").write_text(
+            json.dumps(metadata, default=str)
+        )
+        with self._lock:
+            self._metadata[model_id] = metadata
+        logger.info(f"Registered model {model_id} (version {version})")
+        return model_id
+
+    def get_metadata(
+        self, model_id: str, owner: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Metadata of a model trained on the owner's dataset"""
+        metadata = self._metadata.get(model_id)
+        if metadata is None or metadata.get('owner') != owner:
+            raise ValidationError(f"Model not found: {model_id}")
+        return metadata
+
+    def list(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Metadata of the owner's models, newest first, without the full training results
+        """
+        with self._lock:
+            models = [m for m in self._metadata.values() if m.get('owner') == owner]
+        models.sort(key=lambda m: m['created_at'], reverse=True)
+        return [{k: v for k, v in m.items() if k != 'results'} for m in models]
+
+    def predict(self, model_id: str, X: np.ndarray) -> np.ndarray:
+        """Score rows ordered as the model's feature_columns, NaN for missing values"""
+        batcher = self._batcher(model_id)
+        # The metadata file's modification time is the model's last use, for retention
+        (self._directory / f"{model_id}.json").touch()
+        return batcher.predict(X)
+
+    def remove_owner(self, owner: str) -> int:
+        """Delete every model trained on a dataset, e.g. when the dataset is removed"""
+        with self._lock:
+            model_ids = [
+                m['id'] for m in self._metadata.values() if m.get('owner') == owner
+            ]
+        for model_id in model_ids:
+            self._delete(model_id)
+        if model_ids:
+            logger.info(f"Removed {len(model_ids)} models of dataset {owner}")
+        return len(model_ids)
+
+    def _delete(self, model_id: str) -> None:
+        with self._lock:
+            self._metadata.pop(model_id, None)
+            self._loaded.pop(model_id, None)
+        for suffix in ('.json', '.joblib'):
+            (self._directory / f"{model_id}{suffix}").unlink(missing_ok=True)
+
+    def _prune(self) -> None:
+        """Delete models not used for longer than the TTL"""
+        if self._ttl is None:
+            return
+        cutoff = time.time() - self._ttl
+        with self._lock:
+            model_ids = list(self._metadata)
+        expired = []
+        for model_id in model_ids:
+            try:
+                if (self._directory / f"{model_id}.json").stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                pass
+            self._delete(model_id)
+            expired.append(model_id)
+        if expired:
+            logger.info(f"Removed {len(expired)} expired models")
+
+    def _batcher(self, model_id: str) -> PredictionBatcher:
+        with self._lock:
+            batcher = self._loaded.get(model_id)
+            if batcher is not None:
+                self._loaded.move_to_end(model_id)
+                return batcher
+        metadata = self._metadata.get(model_id)
+        if metadata is None:
+            raise ValidationError(f"Model not found: {model_id}")
+        try:
+            model = joblib.load(self._directory / f"{model_id}.joblib")
+        except FileNotFoundError:
+            # Deleted with its dataset by another worker
+            raise ValidationError(f"Model not found: {model_id}") from None
+        # Inputs are ordered by feature_columns, so sklearn's name check is redundant
+        if hasattr(model, 'feature_names_in_'):
+            del model.feature_names_in_
+        means = np.array(
+            [
+                metadata['imputation_means'].get(col, np.nan)
+                for col in metadata['feature_columns']
+            ],
+            dtype=np.float64,
+        )
+        with self._lock:
+            batcher = self._loaded.get(model_id)
+            if batcher is None:
+                batcher = self._loaded[model_id] = PredictionBatcher(model, means)
+                while len(self._loaded) > self._cache_size:
+                    self._loaded.popitem(last=False)
+                logger.info(f"Loaded model {model_id}")
+            return batcher
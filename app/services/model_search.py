@@ -0,0 +1,151 @@
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import loguniform, uniform
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+
+from app.utils.exceptions import ValidationError
+
+SEARCH_METHODS = ('grid', 'random')
+DEFAULT_FOLDS = 5
+MAX_FOLDS = 20
+DEFAULT_N_ITER = 10
+DEFAULT_N_JOBS = -1
+# Arrays above this size are memory-mapped into workers instead of pickled per task
+MEMMAP_THRESHOLD = '1M'
+
+# name -> (estimator class, grid for grid search, distributions for random search)
+ESTIMATORS: Dict[str, Tuple[type, Dict[str, list], Dict[str, Any]]] = {
+    'LinearRegression': (LinearRegression, {}, {}),
+    'Ridge': (
+        Ridge,
+        {'alpha': [0.01, 0.1, 1.0, 10.0, 100.0]},
+        {'alpha': loguniform(1e-3, 1e3)}
+    ),
+    'Lasso': (
+        Lasso,
+        {'alpha': [0.001, 0.01, 0.1, 1.0, 10.0]},
+        {'alpha': loguniform(1e-4, 1e2)}
+    ),
+    'ElasticNet': (
+        ElasticNet,
+        {'alpha': [0.001, 0.01, 0.1, 1.0], 'l1_ratio': [0.2, 0.5, 0.8]},
+        {'alpha': loguniform(1e-4, 1e2), 'l1_ratio': uniform(0.05, 0.9)}
+    )
+}
+
+
+def build_estimator(name: str, params: Dict[str, Any]):
+    estimator_class = ESTIMATORS[name][0]
+    if estimator_class in (Lasso, ElasticNet):
+        params = {'max_iter': 5000, **params}
+    return estimator_class(**params)
+
+
+def candidates(estimators: List[str], method: str = 'grid',
+               n_iter: int = DEFAULT_N_ITER) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Enumerate (estimator name, parameters) pairs to evaluate.
+    Args:
+        estimators (List[str]): Names from ESTIMATORS.
+        method (str): 'grid' for every grid point, 'random' for
+            n_iter samples per estimator.
+        n_iter (int): Samples per estimator for random search.
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: The candidates in a stable order.
+    """
+    if method not in SEARCH_METHODS:
+        raise ValidationError(f"Unsupported search method: {method}")
+    unknown = [name for name in estimators if name not in ESTIMATORS]
+    if unknown:
+        raise ValidationError(f"Unsupported estimators: {', '.join(unknown)}")
+    result = []
+    for name in estimators:
+        _, grid, distributions = ESTIMATORS[name]
+        if method == 'grid' or not distributions:
+            params = ParameterGrid(grid)
+        else:
+            params = ParameterSampler(distributions, n_iter=n_iter, random_state=0)
+        result.extend((name, {k: float(v) for k, v in p.items()}) for p in params)
+    return result
+
+
+def _fit_fold(name: str, params: Dict[str, Any], X: np.ndarray, y: np.ndarray,
+              train_index: np.ndarray, test_index: np.ndarray) -> Dict[str, float]:
+    """
+    Fit one candidate on one fold; X and y arrive memory-mapped in worker processes
+    """
+    model = build_estimator(name, params)
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = model.predict(X[test_index])
+    score_time = time.perf_counter() - start
+    y_true = y[test_index]
+    return {
+        'r2_score': float(r2_score(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'fit_time': fit_time,
+        'score_time': score_time
+    }
+
+
+def cross_validate(
+    X: np.ndarray,
+    y: np.ndarray,
+    search: List[Tuple[str, Dict[str, Any]]],
+    folds: int = DEFAULT_FOLDS,
+    n_jobs: Optional[int] = DEFAULT_N_JOBS,
+    progress: Optional[Callable[..., None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    K-fold cross-validate every candidate, running (candidate, fold) tasks in parallel.
+    Args:
+        X (np.ndarray): Contiguous feature matrix.
+        y (np.ndarray): Target vector.
+        search (List[Tuple[str, Dict[str, Any]]]): Candidates from candidates().
+        folds (int): Number of folds.
+        n_jobs (Optional[int]): Worker processes, -1 for all cores.
+        progress (Optional[Callable]): Called with
+            tasks_done/tasks_total as tasks finish.
+    Returns:
+        List[Dict[str, Any]]: Per-candidate fold metrics, their
+            means and standard deviations.
+    """
+    if not 2 <= folds <= min(MAX_FOLDS, len(y)):
+        raise ValidationError(
+            f"Number of folds must be between 2 and {min(MAX_FOLDS, len(y))}"
+        )
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X))
+    tasks: Iterator = (
+        delayed(_fit_fold)(name, params, X, y, train_index, test_index)
+        for name, params in search for train_index, test_index in splits
+    )
+    total = len(search) * folds
+    parallel = Parallel(
+        n_jobs=n_jobs, max_nbytes=MEMMAP_THRESHOLD, mmap_mode='r', return_as='generator'
+    )
+    scores = []
+    for fold_scores in parallel(tasks):
+        scores.append(fold_scores)
+        if progress is not None:
+            progress(
+                stage='cross_validating', tasks_done=len(scores), tasks_total=total
+            )
+
+    results = []
+    for i, (name, params) in enumerate(search):
+        fold_scores = scores[i * folds:(i + 1) * folds]
+        summary = {'model_type': name, 'params': params, 'folds': fold_scores}
+        for key in ('r2_score', 'rmse', 'mae', 'fit_time', 'score_time'):
+            values = np.array([s[key] for s in fold_scores])
+            summary[f'mean_{key}'] = float(values.mean())
+            summary[f'std_{key}'] = float(values.std())
+        results.append(summary)
+    return results
@@ -1,68 +1,117 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
 import logging
-from sklearn.model_selection import train_test_split
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import (
-    r2_score, mean_squared_error, mean_absolute_error,
-    precision_score, recall_score
+    mean_absolute_error,
+    mean_squared_error,
+    precision_score,
+    r2_score,
+    recall_score,
 )
-from app.utils.exceptions import ValidationError, DataProcessingError
+from sklearn.model_selection import train_test_split
+
+from app.services.file_reader import iter_file_chunks, read_columns
+from app.services.incremental import (
+    DEFAULT_EPOCHS,
+    DEFAULT_TRAIN_CHUNKSIZE,
+    SOLVERS,
+    frame_chunks,
+    train_streaming,
+)
+from app.services.model_search import (
+    DEFAULT_FOLDS,
+    DEFAULT_N_ITER,
+    DEFAULT_N_JOBS,
+    ESTIMATORS,
+    build_estimator,
+    candidates,
+    cross_validate,
+)
+from app.utils.exceptions import DataProcessingError, ValidationError
+from app.utils.metrics import record_lookup, timed
 
 logger = logging.getLogger('yugen')
 
+# Fits kept per data version and training parameters, so
+# repeated requests skip the refit
+FIT_CACHE_SIZE = 8
+# Imputed feature matrices kept per data version, feature
+# selection, target and precision
+FEATURE_CACHE_SIZE = 4
+PRECISIONS = {'float64': np.float64, 'float32': np.float32}
+
 class ModelService:
     def __init__(self):
         self._df = None
+        # DataService version of the shared frame in _df
+        self._data_version = None
         self._model = None
+        # Per-feature values used to fill missing inputs of the current model
+        self._imputation_means = {}
         self._train_results = {}
-        
-    def load_data(self, file_path: Path) -> None:
-        """Load data from file"""
-        try:
-            if not file_path.exists():
-                raise ValidationError(f"File not found: {file_path}")
-                
-            if file_path.suffix == '.csv':
-                self._df = pd.read_csv(file_path)
-            elif file_path.suffix == '.xlsx':
-                self._df = pd.read_excel(file_path)
-            else:
-                raise ValidationError(f"Unsupported file type: {file_path.suffix}")
-                
-            logger.info(f"Data loaded successfully from {file_path}")
-        except Exception as e:
-            logger.error(f"Error loading data: {str(e)}")
-            raise DataProcessingError(f"Failed to load data: {str(e)}")
+        self._fit_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._feature_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._memory_usage = 0
+
+    def attach(self, df: pd.DataFrame, version: int) -> None:
+        """
+        Share the current frame of a DataService instead of reading the file again.
+        Args:
+            df (pd.DataFrame): The frame, treated as read-only.
+            version (int): The DataService version of that frame.
+        """
+        if self._df is df and self._data_version == version:
+            return
+        self._df = df
+        self._data_version = version
+        self._fit_cache.clear()
+        self._feature_cache.clear()
+        # The frame is owned, and measured, by the DataService
+        self._memory_usage = 0
+
+    def memory_usage(self) -> int:
+        """Deep memory usage of the loaded frame, plus cached feature matrices"""
+        if self._df is None:
+            return 0
+        cached = sum(X.nbytes + y.nbytes for X, y, _ in self._feature_cache.values())
+        return self._memory_usage + cached
     
-    def train_linear_regression(self, feature_columns, target_column, test_size=0.2):
-        """Train a linear regression model"""
+    @timed('fit')
+    def train_linear_regression(
+        self,
+        feature_columns,
+        target_column,
+        test_size=0.2,
+        progress=None,
+        precision='float64',
+    ):
+        """
+        Train a linear regression model, reporting stages to an
+        optional progress callback.
+        precision='float32' halves the feature matrix at some cost in accuracy.
+        """
         try:
-            if self._df is None:
-                raise ValidationError("No data loaded")
-                
-            if not target_column:
-                raise ValidationError("Target column must be specified")
-                
-            if not feature_columns or len(feature_columns) == 0:
-                raise ValidationError("At least one feature column must be selected")
-                
-            # Validate columns exist in dataframe
-            all_columns = feature_columns + [target_column]
-            for col in all_columns:
-                if col not in self._df.columns:
-                    raise ValidationError(f"Column not found in dataset: {col}")
-            
-            # Create feature matrix and target vector
-            X = self._df[feature_columns]
-            y = self._df[target_column]
+            self._validate_columns(feature_columns, target_column)
+
+            # The shared frame is unchanged since an identical fit, so reuse it
+            fit_key = (
+                self._data_version,
+                tuple(feature_columns),
+                target_column,
+                float(test_size),
+                precision,
+            )
+            if self._reuse_fit(fit_key):
+                return self._train_results
+
+            X, y = self._feature_matrix(feature_columns, target_column, precision)
             
-            # Handle missing values
-            X = X.fillna(X.mean())
-            mask = ~y.isna()
-            X = X[mask]
-            y = y[mask]
+            if progress is not None:
+                progress(stage='splitting')
             
             # Split the data
             X_train, X_test, y_train, y_test = train_test_split(
@@ -70,49 +119,366 @@ class ModelService:
             )
             
             # Train the model
+            if progress is not None:
+                progress(stage='fitting')
             self._model = LinearRegression()
             self._model.fit(X_train, y_train)
             
-            # Make predictions
-            y_pred = self._model.predict(X_test)
-            
-            # Calculate metrics
-            r2 = r2_score(y_test, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-            mae = mean_absolute_error(y_test, y_pred)
-            
-            # For binary classification metrics (approximating with median threshold)
-            y_test_binary = y_test > y_test.median()
-            y_pred_binary = y_pred > y_test.median()
-            precision = precision_score(y_test_binary, y_pred_binary)
-            recall = recall_score(y_test_binary, y_pred_binary)
-            
-            # Get feature importance
-            feature_importance = dict(zip(feature_columns, self._model.coef_))
+            if progress is not None:
+                progress(stage='evaluating')
+            self._train_results = self._evaluate(
+                'LinearRegression',
+                feature_columns,
+                target_column,
+                X_test,
+                y_test,
+                len(X_train),
+            )
+            self._remember_fit(fit_key)
+
+            logger.info(
+                "Model trained successfully. "
+                f"R² Score: {self._train_results['r2_score']:.4f}"
+            )
+            return self._train_results
             
-            # Store results
+        except Exception as e:
+            logger.error(f"Error training model: {str(e)}")
+            raise DataProcessingError(f"Failed to train model: {str(e)}") from e
+
+    @timed('fit')
+    def search_models(
+        self,
+        feature_columns,
+        target_column,
+        test_size=0.2,
+        estimators=None,
+        method='grid',
+        folds=DEFAULT_FOLDS,
+        n_iter=DEFAULT_N_ITER,
+        n_jobs=DEFAULT_N_JOBS,
+        progress=None,
+        precision='float64',
+    ):
+        """
+        Pick an estimator and its parameters by k-fold
+        cross-validation, then refit and evaluate it.
+        Args:
+            feature_columns (List[str]): Feature columns.
+            target_column (str): Target column.
+            test_size (float): Share of rows held out from the
+                search for the final evaluation.
+            estimators (Optional[List[str]]): Names from
+                ESTIMATORS; all of them by default.
+            method (str): 'grid' or 'random' search.
+            folds (int): Number of cross-validation folds.
+            n_iter (int): Parameter samples per estimator for random search.
+            n_jobs (Optional[int]): Worker processes, -1 for all cores.
+            progress (Optional[Callable]): Receives the stage and completed fold fits.
+            precision (str): 'float64' or 'float32' for the feature matrix.
+        Returns:
+            Dict[str, Any]: Holdout metrics of the best candidate,
+                plus per-candidate, per-fold
+            metrics and timings under 'cv'.
+        """
+        try:
+            self._validate_columns(feature_columns, target_column)
+            estimators = list(estimators or ESTIMATORS)
+            folds, n_iter = int(folds), int(n_iter)
+            search = candidates(estimators, method, n_iter)
+
+            fit_key = (
+                self._data_version,
+                tuple(feature_columns),
+                target_column,
+                float(test_size),
+                tuple(estimators),
+                method,
+                folds,
+                n_iter,
+                precision,
+            )
+            if self._reuse_fit(fit_key):
+                return self._train_results
+
+            X, y = self._feature_matrix(feature_columns, target_column, precision)
+            if progress is not None:
+                progress(stage='splitting')
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42
+            )
+
+            # The contiguous training split is memory-mapped into the workers
+            # rather than pickled per task
+            started = time.perf_counter()
+            cv_results = cross_validate(
+                X_train, y_train, search, folds=folds, n_jobs=n_jobs, progress=progress
+            )
+            search_seconds = time.perf_counter() - started
+            best_index = int(np.nanargmax([c['mean_r2_score'] for c in cv_results]))
+            best = cv_results[best_index]
+
+            if progress is not None:
+                progress(stage='fitting')
+            started = time.perf_counter()
+            self._model = build_estimator(best['model_type'], best['params'])
+            self._model.fit(X_train, y_train)
+            refit_seconds = time.perf_counter() - started
+
+            if progress is not None:
+                progress(stage='evaluating')
+            self._train_results = self._evaluate(
+                best['model_type'],
+                feature_columns,
+                target_column,
+                X_test,
+                y_test,
+                len(X_train),
+            )
+            self._train_results['params'] = best['params']
+            self._train_results['cv'] = {
+                'method': method,
+                'folds': folds,
+                'best_index': best_index,
+                'candidates': cv_results
+            }
+            self._train_results['timings'] = {
+                'search_seconds': search_seconds,
+                'refit_seconds': refit_seconds
+            }
+            self._remember_fit(fit_key)
+
+            logger.info(
+                f"Model search over {len(search)} candidates chose "
+                f"{best['model_type']} {best['params']}"
+            )
+            return self._train_results
+
+        except Exception as e:
+            logger.error(f"Error searching models: {str(e)}")
+            raise DataProcessingError(f"Failed to train model: {str(e)}") from e
+
+    @timed('fit')
+    def train_incremental(
+        self,
+        feature_columns,
+        target_column,
+        test_size=0.2,
+        solver='ols',
+        chunksize=DEFAULT_TRAIN_CHUNKSIZE,
+        epochs=DEFAULT_EPOCHS,
+        file_path=None,
+        progress=None,
+    ):
+        """
+        Train a linear model in passes over row chunks, so working
+        memory is bounded by the chunk size.
+        Args:
+            feature_columns (List[str]): Feature columns.
+            target_column (str): Target column.
+            test_size (float): Share of rows held out, by a hash of the
+                row position, for evaluation.
+            solver (str): 'ols' for exact least squares via XᵀX/Xᵀy, 'sgd'
+                for SGDRegressor.partial_fit.
+            chunksize (int): Rows per chunk.
+            epochs (int): Passes over the training rows for 'sgd'.
+            file_path (Optional[Path]): Stream this CSV/Excel file instead of the
+                attached frame, for datasets that don't fit in memory.
+            progress (Optional[Callable]): Receives the stage, pass and chunks done.
+        Returns:
+            Dict[str, Any]: The training results, with the holdout
+                metrics computed while streaming.
+        """
+        try:
+            if solver not in SOLVERS:
+                raise ValidationError(f"Unsupported solver: {solver}")
+            chunksize, epochs = int(chunksize), int(epochs)
+            if chunksize < 1 or epochs < 1:
+                raise ValidationError("chunksize and epochs must be positive")
+            if file_path is not None:
+                self._validate_columns(feature_columns, target_column,
+                                       columns=read_columns(file_path))
+                chunks = iter_file_chunks(
+                    file_path, feature_columns + [target_column], chunksize
+                )
+            else:
+                self._validate_columns(feature_columns, target_column)
+                chunks = frame_chunks(
+                    self._df, feature_columns + [target_column], chunksize
+                )
+
+            fit_key = (
+                self._data_version,
+                tuple(feature_columns),
+                target_column,
+                float(test_size),
+                'incremental',
+                solver,
+                chunksize,
+                epochs,
+            )
+            if file_path is None and self._reuse_fit(fit_key):
+                return self._train_results
+
+            fitted = train_streaming(
+                chunks, feature_columns, target_column, float(test_size),
+                solver=solver, epochs=epochs, progress=progress
+            )
+            self._model = fitted['model']
+            self._imputation_means = dict(
+                zip(feature_columns, fitted['imputation_means'].tolist(), strict=True)
+            )
             self._train_results = {
-                'model_type': 'LinearRegression',
+                'model_type': type(self._model).__name__,
                 'feature_columns': feature_columns,
                 'target_column': target_column,
-                'r2_score': float(r2),
-                'rmse': float(rmse),
-                'mae': float(mae),
-                'precision': float(precision),
-                'recall': float(recall),
-                'feature_importance': {k: float(v) for k, v in feature_importance.items()},
-                'samples': {
-                    'train': len(X_train),
-                    'test': len(X_test)
-                }
+                **fitted['metrics'],
+                'feature_importance': {
+                    k: float(v)
+                    for k, v in zip(feature_columns, self._model.coef_, strict=True)
+                },
+                'samples': fitted['samples'],
+                'streaming': {
+                    'solver': solver,
+                    'chunksize': chunksize,
+                    'passes': fitted['passes'],
+                },
             }
-            
-            logger.info(f"Model trained successfully. R² Score: {r2:.4f}")
+            if file_path is None:
+                self._remember_fit(fit_key)
+
+            logger.info(
+                f"Model trained incrementally ({solver}). "
+                f"R² Score: {self._train_results['r2_score']:.4f}"
+            )
             return self._train_results
-            
+
         except Exception as e:
-            logger.error(f"Error training model: {str(e)}")
-            raise DataProcessingError(f"Failed to train model: {str(e)}")
+            logger.error(f"Error training model incrementally: {str(e)}")
+            raise DataProcessingError(f"Failed to train model: {str(e)}") from e
+
+    def _validate_columns(self, feature_columns, target_column, columns=None) -> None:
+        if columns is None:
+            if self._df is None:
+                raise ValidationError("No data loaded")
+            columns = self._df.columns
+
+        if not target_column:
+            raise ValidationError("Target column must be specified")
+            
+        if not feature_columns or len(feature_columns) == 0:
+            raise ValidationError("At least one feature column must be selected")
+            
+        # Validate columns exist in dataframe
+        all_columns = feature_columns + [target_column]
+        for col in all_columns:
+            if col not in columns:
+                raise ValidationError(f"Column not found in dataset: {col}")
+
+    def _feature_matrix(self, feature_columns, target_column, precision='float64'):
+        """
+        Mean-imputed, C-contiguous feature matrix and float64
+        target of the rows with a target.
+        Matrices of the shared frame are cached per data version, so
+        repeated fits on the same selection (e.g. changing test_size or the
+        estimator) skip the extraction.
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Read-only X and y.
+        """
+        if precision not in PRECISIONS:
+            raise ValidationError(f"Unsupported precision: {precision}")
+        key = (self._data_version, tuple(feature_columns), target_column, precision)
+        if self._data_version is not None:
+            record_lookup('feature_matrix', key in self._feature_cache)
+        if self._data_version is not None and key in self._feature_cache:
+            self._feature_cache.move_to_end(key)
+            X, y, self._imputation_means = self._feature_cache[key]
+            return X, y
+
+        y = self._df[target_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        keep = ~np.isnan(y)
+        y = y[keep]
+        X = np.empty((len(y), len(feature_columns)), dtype=PRECISIONS[precision])
+        means = {}
+        for j, col in enumerate(feature_columns):
+            values = self._df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            # Means over all rows, as before rows without a target are dropped
+            missing = np.isnan(values)
+            mean = float(values[~missing].mean()) if not missing.all() else float('nan')
+            means[col] = mean
+            values = values[keep]
+            values[missing[keep]] = mean
+            X[:, j] = values
+        X.flags.writeable = False
+        y.flags.writeable = False
+        self._imputation_means = means
+
+        if self._data_version is not None:
+            self._feature_cache[key] = (X, y, means)
+            while len(self._feature_cache) > FEATURE_CACHE_SIZE:
+                self._feature_cache.popitem(last=False)
+        return X, y
+
+    def _evaluate(
+        self, model_type, feature_columns, target_column, X_test, y_test, train_samples
+    ):
+        """Holdout metrics and coefficients of the fitted model"""
+        y_pred = self._model.predict(X_test)
+        
+        # Calculate metrics
+        r2 = r2_score(y_test, y_pred)
+        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+        mae = mean_absolute_error(y_test, y_pred)
+        
+        # For binary classification metrics (approximating with median threshold)
+        y_test_binary = y_test > np.median(y_test)
+        y_pred_binary = y_pred > np.median(y_test)
+        precision = precision_score(y_test_binary, y_pred_binary)
+        recall = recall_score(y_test_binary, y_pred_binary)
+        
+        # Get feature importance
+        feature_importance = dict(zip(feature_columns, self._model.coef_, strict=True))
+        
+        return {
+            'model_type': model_type,
+            'feature_columns': feature_columns,
+            'target_column': target_column,
+            'r2_score': float(r2),
+            'rmse': float(rmse),
+            'mae': float(mae),
+            'precision': float(precision),
+            'recall': float(recall),
+            'feature_importance': {k: float(v) for k, v in feature_importance.items()},
+            'samples': {
+                'train': train_samples,
+                'test': len(X_test)
+            }
+        }
+
+    def _reuse_fit(self, fit_key) -> bool:
+        """Restore a cached fit of the current shared frame"""
+        if self._data_version is None:
+            return False
+        record_lookup('fit', fit_key in self._fit_cache)
+        if fit_key not in self._fit_cache:
+            return False
+        self._fit_cache.move_to_end(fit_key)
+        self._model, self._imputation_means, self._train_results = self._fit_cache[
+            fit_key
+        ]
+        logger.info(f"Reusing model fitted on data version {self._data_version}")
+        return True
+
+    def _remember_fit(self, fit_key) -> None:
+        if self._data_version is None:
+            return
+        self._fit_cache[fit_key] = (
+            self._model,
+            self._imputation_means,
+            self._train_results,
+        )
+        while len(self._fit_cache) > FIT_CACHE_SIZE:
+            self._fit_cache.popitem(last=False)
     
     def predict(self, data):
         """Make predictions using the trained model"""
@@ -124,8 +490,14 @@ class ModelService:
             return predictions
         except Exception as e:
             logger.error(f"Error making predictions: {str(e)}")
-            raise DataProcessingError(f"Failed to make predictions: {str(e)}")
+            raise DataProcessingError(f"Failed to make predictions: {str(e)}") from e
     
+    def get_model(self):
+        """The current model and the per-feature means that fill its missing inputs"""
+        if self._model is None:
+            raise ValidationError("No model trained")
+        return self._model, self._imputation_means
+
     def get_training_results(self):
         """Get the results from the last training session"""
         if not self._train_results:
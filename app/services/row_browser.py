@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_ROWS = 100
+MAX_PAGE_ROWS = 5000
+# Sort permutations and filtered views kept per dataset
+SORT_CACHE_SIZE = 4
+VIEW_CACHE_SIZE = 4
+
+
+def sort_permutation(series: pd.Series, descending: bool = False) -> np.ndarray:
+    """
+    Row positions in sorted order; stable, with missing values last in either direction
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype) and not series.cat.ordered:
+        # Categoricals sort by code, so put the codes in value order first
+        series = series.cat.reorder_categories(series.cat.categories.sort_values())
+    ordered = series.reset_index(drop=True).sort_values(
+        ascending=not descending, kind='stable', na_position='last'
+    )
+    return ordered.index.to_numpy(dtype=np.intp)
+
+
+def filter_permutation(permutation: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Sort order of the rows a mask keeps, from the sort order of all rows.
+    Args:
+        permutation (np.ndarray): Sorted positions of the unfiltered rows.
+        mask (np.ndarray): Rows kept.
+    Returns:
+        np.ndarray: Sorted positions among the kept rows, in
+            O(n) rather than a new sort.
+    """
+    new_positions = np.cumsum(mask) - 1
+    return new_positions[permutation[mask[permutation]]]
+
+
+class View:
+    """Positions of the current rows a browse request selects, in display order"""
+
+    def __init__(self, positions: Optional[np.ndarray], frame_rows: int):
+        # None when the view is every row in frame order
+        self.positions = positions
+        self.frame_rows = frame_rows
+        self.rows = frame_rows if positions is None else len(positions)
+        self._ranks: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def page(self, offset: int, limit: int) -> np.ndarray:
+        if self.positions is None:
+            return np.arange(
+                min(offset, self.rows), min(offset + limit, self.rows), dtype=np.intp
+            )
+        return self.positions[offset:offset + limit]
+
+    def rank(self, position: int) -> Optional[int]:
+        """Display offset of a frame row, or None if the view doesn't include it"""
+        if self.positions is None:
+            return position
+        if self._ranks is None:
+            # Built once per view, on the first keyset request
+            self._ranks = np.full(self.frame_rows, -1, dtype=np.intp)
+            self._ranks[self.positions] = np.arange(len(self.positions), dtype=np.intp)
+        rank = self._ranks[position]
+        return int(rank) if rank >= 0 else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.positions, self._ranks) if a is not None)
+
+
+class ViewCache:
+    """Small LRU caches of sort permutations and views, keyed by dataset state"""
+
+    def __init__(self):
+        self._sorts: 'OrderedDict[Hashable, np.ndarray]' = OrderedDict()
+        self._views: 'OrderedDict[Hashable, View]' = OrderedDict()
+
+    @staticmethod
+    def _get(
+        cache: OrderedDict, key: Hashable, build: Callable[[], Any], size: int
+    ) -> Any:
+        value = cache.get(key)
+        if value is None:
+            value = cache[key] = build()
+            while len(cache) > size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return value
+
+    def sort(self, key: Hashable, build: Callable[[], np.ndarray]) -> np.ndarray:
+        return self._get(self._sorts, key, build, SORT_CACHE_SIZE)
+
+    def view(self, key: Hashable, build: Callable[[], View]) -> View:
+        return self._get(self._views, key, build, VIEW_CACHE_SIZE)
+
+    def clear(self) -> None:
+        self._sorts.clear()
+        self._views.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(p.nbytes for p in self._sorts.values())
+                + sum(v.nbytes for v in self._views.values()))
@@ -0,0 +1,284 @@
+import math
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 14
+TDIGEST_COMPRESSION = 400
+TOP_K = 50
+
+
+def hash_values(series: pd.Series) -> np.ndarray:
+    """64-bit hashes of the non-null values of a series"""
+    return pd.util.hash_pandas_object(series.dropna(), index=False).to_numpy()
+
+
+class HyperLogLog:
+    """Distinct-count sketch, relative standard error 1.04 / sqrt(2 ** precision)"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self._registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self._registers))
+
+    def update(self, hashes: np.ndarray) -> 'HyperLogLog':
+        if not len(hashes):
+            return self
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # Bit length via the float exponent, exact because rest < 2 ** 53
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self._registers, index, rank)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        np.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def estimate(self) -> int:
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self._registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self._registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class TDigest:
+    """Mergeable quantile sketch using the arcsine scale function"""
+
+    def __init__(self, compression: int = TDIGEST_COMPRESSION):
+        self.compression = compression
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self._weights.sum())
+
+    @property
+    def rank_error(self) -> float:
+        """Worst-case rank error (at the median), shrinking towards the tails"""
+        return math.pi / self.compression
+
+    def update(self, values: np.ndarray) -> 'TDigest':
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(
+            np.concatenate([self._means, values]),
+            np.concatenate([self._weights, np.ones(len(values))])
+        )
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        if not len(other._means):
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(
+            np.concatenate([self._means, other._means]),
+            np.concatenate([self._weights, other._weights])
+        )
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        # Centroids falling into the same unit of k-space are merged
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+        self._weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / self._weights
+
+    def quantiles(self, qs: Iterable[float]) -> np.ndarray:
+        qs = np.asarray(list(qs), dtype=np.float64)
+        if not len(self._means):
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(self._weights)
+        total = cumulative[-1]
+        positions = np.concatenate([[0.0], cumulative - self._weights / 2, [total]])
+        values = np.concatenate([[self.min], self._means, [self.max]])
+        return np.interp(qs * total, positions, values)
+
+
+class FrequentItems:
+    """Mergeable Misra-Gries summary; counts undershoot by at most max_error"""
+
+    def __init__(self, capacity: int = TOP_K):
+        self.capacity = capacity
+        self.total = 0
+        self.max_error = 0
+        self._counts = pd.Series(dtype=np.int64)
+
+    def update(self, series: pd.Series) -> 'FrequentItems':
+        counts = series.value_counts(dropna=False)
+        self.total += len(series)
+        self._absorb(counts[counts > 0], 0)
+        return self
+
+    def merge(self, other: 'FrequentItems') -> 'FrequentItems':
+        self.total += other.total
+        self._absorb(other._counts, other.max_error)
+        return self
+
+    def _absorb(self, counts: pd.Series, error: int) -> None:
+        if isinstance(counts.index, pd.CategoricalIndex):
+            counts.index = counts.index.astype(object)
+        combined = self._counts.add(counts, fill_value=0).astype(np.int64)
+        self.max_error += error
+        if len(combined) > self.capacity:
+            combined = combined.sort_values(ascending=False, kind='stable')
+            cut = int(combined.iloc[self.capacity])
+            combined = combined.iloc[:self.capacity] - cut
+            combined = combined[combined > 0]
+            self.max_error += cut
+        self._counts = combined
+
+    def top(self) -> Dict[str, int]:
+        counts = self._counts.sort_values(ascending=False, kind='stable')
+        return {
+            str(k) if not pd.isna(k) else 'null': int(v)
+            for k, v in counts.items()
+        }
+
+
+class ColumnSketch:
+    """Sketches and exact moments for one column, updated chunk by chunk"""
+
+    def __init__(self):
+        self.distinct = HyperLogLog()
+        self.digest: Optional[TDigest] = None
+        self.frequent: Optional[FrequentItems] = None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, series: pd.Series) -> None:
+        self.distinct.update(hash_values(series))
+        if pd.api.types.is_numeric_dtype(
+            series.dtype
+        ) and not pd.api.types.is_bool_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if self.digest is None:
+                self.digest = TDigest()
+            self.digest.update(values)
+            if len(values):
+                self._merge_moments(len(values), float(values.mean()),
+                                    float(((values - values.mean()) ** 2).sum()))
+        elif series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+            if self.frequent is None:
+                self.frequent = FrequentItems()
+            self.frequent.update(series)
+
+    def merge(self, other: 'ColumnSketch') -> None:
+        self.distinct.merge(other.distinct)
+        if other.digest is not None:
+            self.digest = (
+                other.digest if self.digest is None else self.digest.merge(other.digest)
+            )
+        if other.frequent is not None:
+            self.frequent = (
+                other.frequent
+                if self.frequent is None
+                else self.frequent.merge(other.frequent)
+            )
+        if other.count:
+            self._merge_moments(other.count, other.mean, other.m2)
+
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def numeric_summary(self) -> Dict[str, Any]:
+        quartiles = self.digest.quantiles([0.25, 0.5, 0.75])
+        has_values = self.count > 0
+        return {
+            'count': self.count,
+            'mean': self.mean if has_values else None,
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None,
+            'min': self.digest.min if has_values else None,
+            'max': self.digest.max if has_values else None,
+            '25%': float(quartiles[0]) if has_values else None,
+            '50%': float(quartiles[1]) if has_values else None,
+            '75%': float(quartiles[2]) if has_values else None
+        }
+
+
+class ProfileSketch:
+    """Per-column sketches for a dataset, mergeable across chunks or workers"""
+
+    def __init__(self):
+        self.rows = 0
+        self._columns: Dict[str, ColumnSketch] = {}
+
+    def update(self, chunk: pd.DataFrame) -> 'ProfileSketch':
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            self._columns.setdefault(col, ColumnSketch()).update(chunk[col])
+        return self
+
+    def merge(self, other: 'ProfileSketch') -> 'ProfileSketch':
+        self.rows += other.rows
+        for col, sketch in other._columns.items():
+            if col in self._columns:
+                self._columns[col].merge(sketch)
+            else:
+                self._columns[col] = sketch
+        return self
+
+    def is_consistent(self) -> bool:
+        """False if a column was numeric in some chunks and text in others"""
+        return not any(
+            s.digest is not None and s.frequent is not None
+            for s in self._columns.values()
+        )
+
+    def summarize(
+        self, numeric_cols: Iterable[str], categorical_cols: Iterable[str]
+    ) -> Dict[str, Any]:
+        numeric_summary = {
+            col: self._columns[col].numeric_summary()
+            for col in numeric_cols if self._columns[col].digest is not None
+        }
+        categorical_summary = {
+            col: self._columns[col].frequent.top()
+            for col in categorical_cols if self._columns[col].frequent is not None
+        }
+        any_sketch = next(iter(self._columns.values()), ColumnSketch())
+        return {
+            'numeric_summary': numeric_summary,
+            'categorical_summary': categorical_summary,
+            'distinct': {
+                col: s.distinct.estimate() for col, s in self._columns.items()
+            },
+            'error_bounds': {
+                'distinct_relative_std': any_sketch.distinct.relative_error,
+                'quantile_rank_error': math.pi / TDIGEST_COMPRESSION,
+                'top_k': TOP_K,
+                'top_k_count_error': {
+                    col: self._columns[col].frequent.max_error
+                    for col in categorical_summary
+                },
+            },
+        }
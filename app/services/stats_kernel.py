@@ -0,0 +1,105 @@
+import warnings
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.serialization import to_json_list
+
+QUANTILES = (0.25, 0.5, 0.75)
+QUANTILE_LABELS = ('25%', '50%', '75%')
+
+
+def describe_columns(values: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Column statistics for a 2-D float array in one pass over the data.
+    Args:
+        values (np.ndarray): Rows by columns, NaN for missing values.
+    Returns:
+        Tuple[Dict[str, np.ndarray], np.ndarray]: Per-column
+            count/mean/std/min/max/quantiles, and the mean-centred data with
+            missing values set to 0.
+    """
+    missing = np.isnan(values)
+    count = values.shape[0] - missing.sum(axis=0)
+    with warnings.catch_warnings():
+        # All-NaN columns legitimately produce NaN statistics
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        total = np.where(missing, 0.0, values).sum(axis=0)
+        mean = total / count
+        centered = np.where(missing, 0.0, values - mean)
+        m2 = np.einsum('ij,ij->j', centered, centered)
+        std = np.sqrt(m2 / (count - 1))
+        std[count < 2] = np.nan
+        minimum = np.min(values, axis=0, initial=np.inf, where=~missing)
+        maximum = np.max(values, axis=0, initial=-np.inf, where=~missing)
+        quantiles = np.nanquantile(values, QUANTILES, axis=0) if len(values) else \
+            np.full((len(QUANTILES), values.shape[1]), np.nan)
+
+    empty = count == 0
+    minimum[empty] = np.nan
+    maximum[empty] = np.nan
+    stats = {
+        'count': count,
+        'mean': mean,
+        'std': std,
+        'min': minimum,
+        'max': maximum
+    }
+    for label, row in zip(QUANTILE_LABELS, quantiles, strict=True):
+        stats[label] = row
+    return stats, centered
+
+
+def correlate_centered(
+    centered: np.ndarray, missing: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Pearson correlation with pairwise-complete observations from centred data"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        cross = centered.T @ centered
+        if missing is None or not missing.any():
+            var = np.diag(cross)
+            corr = cross / np.sqrt(np.outer(var, var))
+        else:
+            # Restrict every pair to the rows where both columns are present
+            present = (~missing).astype(np.float64)
+            n = present.T @ present
+            sums = centered.T @ present
+            squares = (centered * centered).T @ present
+            cov = cross - sums * sums.T / n
+            var_i = squares - sums * sums / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+            corr[n < 1] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def numeric_profile(
+    df: pd.DataFrame, with_correlation: bool = True
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Numeric summary and correlation dictionaries for a frame of numeric columns"""
+    columns = df.columns.tolist()
+    if not columns:
+        return {}, {}
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    stats, centered = describe_columns(values)
+
+    converted = {'count': stats['count'].tolist()}
+    for key in ('mean', 'std', 'min', 'max') + QUANTILE_LABELS:
+        converted[key] = to_json_list(stats[key])
+    keys = list(converted)
+    summary = {
+        col: dict(zip(keys, row, strict=True))
+        for col, row in zip(
+            columns, zip(*(converted[k] for k in keys), strict=True), strict=True
+        )
+    }
+
+    correlation = {}
+    if with_correlation and len(columns) > 1:
+        matrix = correlate_centered(centered, np.isnan(values))
+        correlation = {
+            col: dict(zip(columns, row, strict=True))
+            for col, row in zip(columns, to_json_list(matrix), strict=True)
+        }
+    return summary, correlation
@@ -0,0 +1,44 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from app.services.columnar_cache import columnar_cache
+
+logger = logging.getLogger('yugen')
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def receive_upload(stream: BinaryIO, suffix: str, directory: Optional[Path] = None,
+                   chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[Path, str]:
+    """
+    Copy an upload to a temporary file chunk by chunk, hashing it on the way.
+    Args:
+        stream (BinaryIO): The request body or multipart file stream.
+        suffix (str): File extension, part of the digest.
+        directory (Optional[Path]): Where to write; the system
+            temp directory by default.
+        chunk_size (int): Bytes read per chunk.
+    Returns:
+        Tuple[Path, str]: The file and its columnar cache
+            digest, already memoised for it.
+    """
+    hasher = columnar_cache.hasher(suffix)
+    fd, name = tempfile.mkstemp(suffix=suffix, dir=directory)
+    path = Path(name)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    digest = hasher.hexdigest()
+    columnar_cache.remember_digest(path, digest)
+    logger.info(f"Received upload of {size} bytes ({digest})")
+    return path, digest
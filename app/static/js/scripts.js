@@ -115,6 +115,12 @@ function updateProfile(data) {
     createCorrelationMatrix(data.correlation);
 }
 
+// Preview is column-oriented: {column: [values]}
+function previewRowIndices(preview) {
+    const firstColumn = Object.values(preview)[0] || [];
+    return firstColumn.map((_, i) => i);
+}
+
 function updateDataInfo(data) {
     if (!data) {
         console.error('No data provided to updateDataInfo');
@@ -229,9 +235,9 @@ function updateDataInfo(data) {
                     <tr>${data.columns.map(col => `<th>${col}</th>`).join('')}</tr>
                 </thead>
                 <tbody>
-                    ${data.preview.map(row => 
+                    ${previewRowIndices(data.preview).map(i => 
                         `<tr>${data.columns.map(col => {
-                            const value = row[col];
+                            const value = data.preview[col][i];
                             const displayValue = value !== null && value !== undefined ? value : '<span style="color: #999;">null</span>';
                             return `<td>${displayValue}</td>`;
                         }).join('')}</tr>`
@@ -488,17 +494,15 @@ async function createVisualization() {
     }
     
     try {
-        const response = await fetch('/data/visualize', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                type: plotType.value,
-                x: columnX.value,
-                y: plotType.value === 'scatter' && columnY ? columnY.value : null
-            })
+        // GET lets the browser revalidate a repeated plot with its ETag instead of recomputing it
+        const params = new URLSearchParams({
+            type: plotType.value,
+            x: columnX.value
         });
+        if (plotType.value === 'scatter' && columnY) {
+            params.set('y', columnY.value);
+        }
+        const response = await fetch(`/data/visualize?${params}`);
 
         const result = await response.json();
         
@@ -0,0 +1,115 @@
+from typing import Any, Dict, Mapping, Union
+
+import numpy as np
+import pandas as pd
+from flask import Request, Response, current_app
+
+from app.utils.exceptions import ValidationError
+from app.utils.metrics import timed
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+# Schema metadata key carrying the non-columnar part of a payload as JSON
+METADATA_KEY = b'yugen'
+
+
+def wants_arrow(request: Request) -> bool:
+    """True if the client prefers an Arrow IPC stream over JSON"""
+    if pa is None:
+        return False
+    best = request.accept_mimetypes.best_match(
+        ['application/json', ARROW_STREAM_MIMETYPE]
+    )
+    return best == ARROW_STREAM_MIMETYPE
+
+
+def _table_from_frame(df: pd.DataFrame) -> 'pa.Table':
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns are sent as text
+        objects = df.select_dtypes(include=['object']).columns
+        return pa.Table.from_pandas(
+            df.astype({col: str for col in objects}), preserve_index=False
+        )
+
+
+@timed('serialize_arrow')
+def arrow_response(columns: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+                   metadata: Dict[str, Any]) -> Response:
+    """
+    Build an Arrow IPC stream response.
+    Args:
+        columns: Column data, as a DataFrame or equal-length 1-D arrays.
+        metadata: Remaining payload, embedded as JSON in the schema metadata.
+    Returns:
+        Response: The stream with the Arrow media type.
+    """
+    if isinstance(columns, pd.DataFrame):
+        table = _table_from_frame(columns)
+    else:
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    table = table.replace_schema_metadata({
+        METADATA_KEY: current_app.json.dumps(metadata).encode('utf-8')
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return current_app.response_class(
+        sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM_MIMETYPE
+    )
+
+
+def trace_response(trace: Dict[str, Any]) -> Response:
+    """Arrow stream for a plot trace whose arrays are still NumPy"""
+    if trace.get('type') == 'heatmap':
+        # Long format: one row per grid cell
+        xs, ys = np.meshgrid(trace['x'], trace['y'])
+        columns = {'x': xs.ravel(), 'y': ys.ravel(), 'z': trace['z'].ravel()}
+    else:
+        columns = {
+            key: value for key, value in trace.items()
+            if isinstance(value, np.ndarray) and value.ndim == 1
+        }
+    metadata = {
+        key: value for key, value in trace.items() if not isinstance(value, np.ndarray)
+    }
+    return arrow_response(columns, {'trace': metadata})
+
+
+def profile_response(profile: Dict[str, Any]) -> Response:
+    """
+    Arrow stream of the numeric summary, one row per column, with the rest as metadata
+    """
+    summary = profile.get('numeric_summary', {})
+    names = list(summary)
+    stats = list(next(iter(summary.values()), {}))
+    columns = {'column': np.array(names, dtype=object)}
+    for stat in stats:
+        columns[stat] = np.array(
+            [summary[name][stat] for name in names],
+            dtype=np.int64 if stat == 'count' else np.float64
+        )
+    metadata = {
+        key: value for key, value in profile.items() if key != 'numeric_summary'
+    }
+    return arrow_response(columns, metadata)
+
+
+def is_arrow_request(request: Request) -> bool:
+    """True if the request body is an Arrow IPC stream"""
+    return request.mimetype == ARROW_STREAM_MIMETYPE
+
+
+def read_arrow_frame(body: bytes) -> pd.DataFrame:
+    """Decode an Arrow IPC stream request body"""
+    if pa is None:
+        raise ValidationError("Arrow input requires pyarrow")
+    try:
+        return pa.ipc.open_stream(body).read_all().to_pandas()
+    except pa.ArrowInvalid as e:
+        raise ValidationError(f"Invalid Arrow stream: {str(e)}") from e
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import json
+from typing import Optional
+
+from flask import Flask, Response, current_app, request
+
+from app.utils.metrics import STAGE_SECONDS
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is an optional speed-up
+    zstandard = None
+
+# Bump when response payload formats change, so clients don't keep stale bodies
+ETAG_VERSION = '1'
+# Browsers keep the body but revalidate each time, which costs a
+# 304 while the data is unchanged
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Accept picks JSON or Arrow, Accept-Encoding the compression; both change the body
+VARY = ('Accept', 'Accept-Encoding')
+
+
+def configure(app: Flask) -> None:
+    app.config.setdefault('HTTP_CACHE_CONTROL', DEFAULT_CACHE_CONTROL)
+    app.config.setdefault('HTTP_COMPRESS_MIN_BYTES', DEFAULT_COMPRESS_MIN_BYTES)
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong entity tag for a response fully determined by parts
+    (dataset id, version, parameters)
+    """
+    payload = json.dumps([ETAG_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _matches(etag: str) -> bool:
+    if request.if_none_match.star_tag:
+        return True
+    # Compressed bodies carry the encoding in their tag, as their bytes differ
+    return any(
+        candidate.split('-', 1)[0] == etag for candidate in request.if_none_match
+    )
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    """A 304 response if a GET or HEAD request already holds this representation"""
+    if etag is None or request.method not in ('GET', 'HEAD') or not _matches(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config['HTTP_CACHE_CONTROL']
+    response.vary.update(VARY)
+    return response
+
+
+def cacheable(response: Response, etag: str) -> Response:
+    """
+    Tag a successful response, add caching hints and compress its body if large enough
+    """
+    if response.status_code != 200:
+        return response
+    response.vary.update(VARY)
+    encoding = compress(response)
+    response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+    response.headers['Cache-Control'] = current_app.config['HTTP_CACHE_CONTROL']
+    return response
+
+
+def compress(response: Response) -> Optional[str]:
+    """
+    Compress the body with zstd or gzip, whichever the client accepts (zstd preferred).
+    Returns:
+        Optional[str]: The content coding used, or None if the body was left as is.
+    """
+    if (
+        response.is_streamed
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return None
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < current_app.config['HTTP_COMPRESS_MIN_BYTES']:
+        return None
+    accepted = request.accept_encodings
+    if zstandard is not None and accepted['zstd'] > 0:
+        encoding = 'zstd'
+    elif accepted['gzip'] > 0:
+        encoding = 'gzip'
+    else:
+        return None
+    with STAGE_SECONDS.time(stage='compress'):
+        if encoding == 'zstd':
+            body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        else:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return encoding
@@ -1,15 +1,47 @@
 import json
+
 import numpy as np
 import pandas as pd
 from flask.json.provider import JSONProvider
 
+from app.utils.metrics import STAGE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+)
+
 class CustomJSONProvider(JSONProvider):
     def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
         return json.dumps(obj, default=self.default, **kwargs)
 
+    def dumps_bytes(self, obj) -> bytes:
+        """Serialize straight to bytes, using orjson when it is installed"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+            except TypeError:
+                # e.g. integers beyond 64 bits, which the stdlib encoder handles
+                pass
+        return json.dumps(obj, default=self.default).encode('utf-8')
+
     def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
         return json.loads(s, **kwargs)
 
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with STAGE_SECONDS.time(stage='serialize_json'):
+            body = self.dumps_bytes(obj)
+        return self._app.response_class(body, mimetype='application/json')
+
     @staticmethod
     def default(obj):
         if isinstance(obj, np.integer):
@@ -24,4 +56,4 @@ class CustomJSONProvider(JSONProvider):
             return None
         elif hasattr(obj, 'isoformat'):  # datetime objects
             return obj.isoformat()
-        raise TypeError(f'Object of type {type(obj)} is not JSON serializable')
\ No newline at end of file
+        raise TypeError(f'Object of type {type(obj)} is not JSON serializable')
@@ -1,6 +1,7 @@
 import logging
 from pathlib import Path
 
+
 def setup_logging():
     log_dir = Path('logs')
     log_dir.mkdir(exist_ok=True)
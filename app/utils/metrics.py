@@ -0,0 +1,276 @@
+import bisect
+import cProfile
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+logger = logging.getLogger('yugen')
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def render_family(
+    name: str, kind: str, help_text: str, samples: Iterable[Sample]
+) -> List[str]:
+    """Prometheus text exposition lines for one metric family"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    lines.extend(
+        f'{name}{_format_labels(labels)} {float(value)!r}' for labels, value in samples
+    )
+    return lines
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return render_family(self.name, 'counter', self.help_text, (
+            (dict(zip(self.labels, key, strict=True)), value) for key, value in values
+        ))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label key -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[label]) for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            ]
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for key, counts, total in values:
+            labels = dict(zip(self.labels, key, strict=True))
+            cumulative = 0
+            for bound, count in zip(
+                self.buckets + (float('inf'),), counts, strict=True
+            ):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels({**labels, 'le': le})
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {total!r}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metric families, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._families: List = []
+
+    def counter(
+        self, name: str, help_text: str, labels: Tuple[str, ...] = ()
+    ) -> Counter:
+        family = Counter(name, help_text, labels)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        family = Histogram(name, help_text, labels, buckets)
+        self._families.append(family)
+        return family
+
+    def render(self, extra: Iterable[str] = ()) -> str:
+        lines = []
+        for family in self._families:
+            lines.extend(family.render())
+        lines.extend(extra)
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    'yugen_request_seconds',
+    'Time to produce a response, by endpoint',
+    ('endpoint', 'method', 'status'),
+)
+REQUEST_BYTES = metrics.counter(
+    'yugen_request_bytes_total',
+    'Request and response body bytes, by endpoint',
+    ('endpoint', 'direction'),
+)
+STAGE_SECONDS = metrics.histogram(
+    'yugen_stage_seconds',
+    'Time spent in a processing stage (parse, profile, fit, serialize, ...)',
+    ('stage',),
+)
+CACHE_LOOKUPS = metrics.counter(
+    'yugen_cache_lookups_total',
+    'Cache lookups by cache and result (hit or miss)',
+    ('cache', 'result'),
+)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator recording the duration of every call under a stage name"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+# cProfile can only profile one request at a time
+_profiler_lock = threading.Lock()
+
+
+def _endpoint_label() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _profiling_requested() -> bool:
+    return (request.headers.get('X-Profile', '').lower() in ('1', 'true')
+            or request.args.get('profile', 'false').lower() == 'true')
+
+
+def instrument(app: Flask) -> None:
+    """
+    Time every request and count its body bytes.
+    With PROFILER_ENABLED set, requests carrying 'X-Profile: 1' or
+    '?profile=true' are run under cProfile; the stats are written to PROFILE_DIR
+    and named in the X-Profile-File header.
+    """
+    app.config.setdefault('PROFILER_ENABLED', False)
+    app.config.setdefault('PROFILE_DIR', Path(app.instance_path) / 'profiles')
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        if app.config['PROFILER_ENABLED'] and _profiling_requested():
+            if _profiler_lock.acquire(blocking=False):
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+            else:
+                g.profiler_busy = True
+
+    @app.after_request
+    def record_request(response):
+        profiler: Optional[cProfile.Profile] = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+            directory = Path(app.config['PROFILE_DIR'])
+            directory.mkdir(parents=True, exist_ok=True)
+            endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+            name = f"{endpoint}_{int(time.time())}_{uuid.uuid4().hex[:8]}.prof"
+            profiler.dump_stats(directory / name)
+            response.headers['X-Profile-File'] = name
+            logger.info(f"Wrote request profile {directory / name}")
+        elif g.pop('profiler_busy', False):
+            response.headers['X-Profile-File'] = 'busy'
+
+        endpoint = _endpoint_label()
+        started = g.pop('request_started', None)
+        if started is not None:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                endpoint=endpoint, method=request.method, status=response.status_code
+            )
+        REQUEST_BYTES.inc(
+            request.content_length or 0, endpoint=endpoint, direction='in'
+        )
+        if not response.is_streamed and response.content_length is not None:
+            REQUEST_BYTES.inc(
+                response.content_length, endpoint=endpoint, direction='out'
+            )
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request is skipped when a request fails, so the
+        # profiler is released here
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def to_json_list(values: np.ndarray) -> List[Optional[float]]:
+    """Convert a float array to Python floats with NaN mapped to None"""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+def column_values(series: pd.Series) -> List[Any]:
+    """JSON-safe list of a column's values, converted a whole array at a time"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = column_values(pd.Series(dtype.categories))
+        lookup = np.array(categories + [None], dtype=object)
+        # Code -1 (missing) picks the trailing None
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if isinstance(dtype, np.dtype):
+        if dtype.kind == 'f':
+            return to_json_list(series.to_numpy())
+        if dtype.kind in 'iub':
+            return series.to_numpy().tolist()
+        if dtype.kind == 'M':
+            formatted = series.dt.strftime('%Y-%m-%dT%H:%M:%S').to_numpy(dtype=object)
+            formatted[series.isna().to_numpy()] = None
+            return formatted.tolist()
+        if dtype.kind == 'm':
+            return to_json_list(series.dt.total_seconds().to_numpy())
+    values = series.to_numpy(dtype=object, na_value=None)
+    values[pd.isna(values)] = None
+    return values.tolist()
+
+
+def column_payload(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    """Column-oriented {column: values} payload for a frame"""
+    return {col: column_values(df[col]) for col in df.columns}
@@ -0,0 +1,256 @@
+import io
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from app.services.columnar_cache import columnar_cache
+from app.services.data_service import DataService
+from app.services.model_service import ModelService
+
+
+class Context:
+    """Shared inputs for the cases of one benchmark process"""
+
+    def __init__(self, csv_path: Path, workdir: Path):
+        self.csv_path = Path(csv_path)
+        self.workdir = Path(workdir)
+        self._app = None
+        self._csv_bytes = None
+        self.numeric_columns = None
+
+    @property
+    def app(self):
+        if self._app is None:
+            from app import create_app
+            self._app = create_app()
+        return self._app
+
+    def cold_cache(self) -> None:
+        """
+        Point the columnar cache at an empty directory so the next load parses the file
+        """
+        columnar_cache.configure(cache_dir=self.workdir / 'cache' / uuid.uuid4().hex)
+
+    def loaded_service(self) -> DataService:
+        service = DataService()
+        service.process_file(self.csv_path)
+        if self.numeric_columns is None:
+            self.numeric_columns = [
+                c for c in service.get_numeric_columns() if c.startswith('num_')
+            ]
+        return service
+
+    def upload_body(self) -> Dict[str, Any]:
+        if self._csv_bytes is None:
+            self._csv_bytes = self.csv_path.read_bytes()
+        return {'file': (io.BytesIO(self._csv_bytes), 'data.csv')}
+
+    def uploaded_client(self):
+        """Test client whose session holds a freshly uploaded dataset"""
+        client = self.app.test_client()
+        response = client.post('/data/upload', data=self.upload_body())
+        if response.status_code != 200:
+            raise RuntimeError(f"Upload failed: {response.get_data(as_text=True)}")
+        if self.numeric_columns is None:
+            numeric = client.get('/modeling').get_json()['numeric_columns']
+            self.numeric_columns = [c for c in numeric if c.startswith('num_')]
+        return client
+
+    def training_request(self) -> Dict[str, Any]:
+        return {
+            'feature_columns': self.numeric_columns,
+            'target_column': 'target',
+            'test_size': 0.2,
+        }
+
+
+@dataclass
+class Case:
+    """
+    setup(context) builds untimed state; run(context, state) is the timed operation
+    """
+    setup: Callable[[Context], Any]
+    run: Callable[[Context, Any], Any]
+    description: str
+
+
+def _cold(ctx: Context) -> None:
+    ctx.cold_cache()
+
+
+def _warm(ctx: Context) -> None:
+    ctx.loaded_service()
+
+
+def _service(ctx: Context) -> DataService:
+    return ctx.loaded_service()
+
+
+def _trained_model(ctx: Context) -> ModelService:
+    service = ctx.loaded_service()
+    model = ModelService()
+    model.attach(service.get_data(), service.get_version())
+    return model
+
+
+def _cold_upload(ctx: Context):
+    ctx.cold_cache()
+    return ctx.app.test_client()
+
+
+def _browsing_client(ctx: Context):
+    client = ctx.uploaded_client()
+    # The first page builds the sort permutation; the timed request reuses it
+    client.get(f'/data/rows?limit=100&sort={ctx.numeric_columns[0]}')
+    return client
+
+
+def _revalidating_client(ctx: Context):
+    client = ctx.uploaded_client()
+    etag = client.get('/data/profile').headers['ETag']
+    return client, etag
+
+
+def _numeric_pair(ctx: Context):
+    return ctx.numeric_columns[0], ctx.numeric_columns[1]
+
+
+CASES: Dict[str, Case] = {
+    'service.process_file': Case(
+        _cold,
+        lambda ctx, _: DataService().process_file(ctx.csv_path),
+        'Parse the CSV (columnar cache empty)',
+    ),
+    'service.process_file_pandas': Case(
+        _cold,
+        lambda ctx, _: DataService().process_file(ctx.csv_path, engine='pandas'),
+        'Parse the CSV with the single-threaded pandas engine (columnar cache empty)',
+    ),
+    'service.process_file_cached': Case(
+        _warm,
+        lambda ctx, _: DataService().process_file(ctx.csv_path),
+        'Load the CSV from the columnar cache',
+    ),
+    'service.profiling': Case(
+        _service,
+        lambda ctx, service: service.profiling(),
+        'Exact profile of a freshly loaded dataset',
+    ),
+    'service.profiling_approximate': Case(
+        _service,
+        lambda ctx, service: service.profiling(approximate=True),
+        'Sketch-based profile of a freshly loaded dataset',
+    ),
+    'service.histogram': Case(
+        _service,
+        lambda ctx, service: service.get_plot_data(
+            'histogram', ctx.numeric_columns[0], None
+        ),
+        'Binned histogram of one numeric column',
+    ),
+    'service.scatter': Case(
+        _service,
+        lambda ctx, service: service.get_plot_data('scatter', *_numeric_pair(ctx)),
+        'Downsampled scatter of two numeric columns',
+    ),
+    'service.clean_data': Case(
+        _service,
+        lambda ctx, service: service.clean_data(
+            {'drop_nulls': True, 'drop_duplicates': True}
+        ),
+        'Drop nulls and duplicates',
+    ),
+    'service.clean_plan': Case(
+        _service,
+        lambda ctx, service: service.clean_data(
+            {
+                'steps': [
+                    {
+                        'operation': 'filter',
+                        'params': {
+                            'column': ctx.numeric_columns[0],
+                            'op': '>',
+                            'value': 0,
+                        },
+                    },
+                    {
+                        'operation': 'fillna',
+                        'params': {
+                            'columns': ctx.numeric_columns[1:3],
+                            'strategy': 'median',
+                        },
+                    },
+                    {
+                        'operation': 'clip',
+                        'params': {
+                            'columns': ctx.numeric_columns[1:3],
+                            'method': 'iqr',
+                        },
+                    },
+                    {
+                        'operation': 'drop_nulls',
+                        'params': {'columns': ctx.numeric_columns[3:]},
+                    },
+                    {'operation': 'drop_columns', 'params': {'columns': ['cat_2']}},
+                ]
+            }
+        ),
+        'Five-step clean plan: filter, fill, clip, drop nulls and a column',
+    ),
+    'service.train_linear_regression': Case(
+        _trained_model,
+        lambda ctx, model: model.train_linear_regression(
+            ctx.numeric_columns, 'target', 0.2
+        ),
+        'Linear regression on the numeric columns (no cached fit or feature matrix)',
+    ),
+    'endpoint.upload': Case(
+        _cold_upload,
+        lambda ctx, client: client.post('/data/upload', data=ctx.upload_body()),
+        'POST /data/upload (columnar cache empty)',
+    ),
+    'endpoint.profile': Case(
+        lambda ctx: ctx.uploaded_client(),
+        lambda ctx, client: client.get('/data/profile'),
+        'GET /data/profile',
+    ),
+    'endpoint.profile_not_modified': Case(
+        _revalidating_client,
+        lambda ctx, state: state[0].get(
+            '/data/profile', headers={'If-None-Match': state[1]}
+        ),
+        'GET /data/profile revalidated with a matching ETag (304)',
+    ),
+    'endpoint.visualize': Case(
+        lambda ctx: ctx.uploaded_client(),
+        lambda ctx, client: client.post(
+            '/data/visualize',
+            json={
+                'type': 'scatter',
+                'x': ctx.numeric_columns[0],
+                'y': ctx.numeric_columns[1],
+            },
+        ),
+        'POST /data/visualize (scatter)',
+    ),
+    'endpoint.clean': Case(
+        lambda ctx: ctx.uploaded_client(),
+        lambda ctx, client: client.post(
+            '/data/clean', json={'drop_nulls': True, 'drop_duplicates': True}
+        ),
+        'POST /data/clean',
+    ),
+    'endpoint.rows_page': Case(
+        _browsing_client,
+        lambda ctx, client: client.get(
+            f'/data/rows?offset=5000&limit=100&sort={ctx.numeric_columns[0]}'
+        ),
+        'GET /data/rows, a later page of a sorted view',
+    ),
+    'endpoint.modeling': Case(
+        lambda ctx: ctx.uploaded_client(),
+        lambda ctx, client: client.post('/modeling', json=ctx.training_request()),
+        'POST /modeling (linear regression)',
+    ),
+}
@@ -0,0 +1,258 @@
+"""
+Benchmark the ingest, profile, visualize, clean and train paths on synthetic data.
+
+Each case runs in its own Python process, so peak RSS is per case. Times
+are the median of --repeat runs; peak allocations come from one extra
+traced run. Nothing is downloaded.
+
+    python -m benchmarks.run                  # run every case, compare to the baseline
+    python -m benchmarks.run --rows 1000000 --cases service.profiling endpoint.profile
+    python -m benchmarks.run --save-baseline  # store these results as the new baseline
+    python -m benchmarks.run --check          # exit 1 if any case regressed
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+DEFAULT_DATA_DIR = Path(tempfile.gettempdir()) / 'yugen_bench'
+# Metrics compared with the baseline, as (key, label)
+COMPARED = (
+    ('median_seconds', 'time'),
+    ('peak_rss_mb', 'rss'),
+    ('response_bytes', 'bytes'),
+)
+
+
+def response_bytes(ctx, result: Any) -> int:
+    """
+    Size of what a client receives: the response body, or the JSON of a service result
+    """
+    if hasattr(result, 'get_data'):
+        return len(result.get_data())
+    return len(ctx.app.json.dumps(result).encode('utf-8'))
+
+
+def run_case(name: str, csv_path: Path, workdir: Path, repeat: int) -> Dict[str, Any]:
+    """Time one case in this process"""
+    from benchmarks.cases import CASES, Context
+    logging.getLogger('yugen').setLevel(logging.WARNING)
+    case = CASES[name]
+    ctx = Context(csv_path, workdir)
+
+    times = []
+    result = None
+    for _ in range(repeat):
+        state = case.setup(ctx)
+        started = time.perf_counter()
+        result = case.run(ctx, state)
+        times.append(time.perf_counter() - started)
+        if getattr(result, 'status_code', 200) >= 400:
+            raise RuntimeError(
+                f"{name} answered {result.status_code}: {result.get_data(as_text=True)}"
+            )
+    size = response_bytes(ctx, result)
+
+    # Traced separately, as tracing slows Python-heavy code down
+    state = case.setup(ctx)
+    tracemalloc.start()
+    case.run(ctx, state)
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_seconds': statistics.median(times),
+        'min_seconds': min(times),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_alloc_mb': peak_alloc / 1024 ** 2,
+        'response_bytes': size,
+        'repeat': repeat
+    }
+
+
+def spawn_case(name: str, csv_path: Path, repeat: int) -> Dict[str, Any]:
+    """Run a case in a fresh interpreter inside a scratch working directory"""
+    with tempfile.TemporaryDirectory(prefix='yugen_bench_') as workdir:
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(
+                filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])
+            ),
+        )
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--child', name,
+             '--csv', str(csv_path), '--repeat', str(repeat)],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+    if completed.returncode != 0:
+        return {
+            'error': completed.stderr.strip().splitlines()[-1]
+            if completed.stderr
+            else 'failed'
+        }
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """Describe metrics that are worse than the baseline by more than tolerance"""
+    regressions = []
+    for name, metrics in results.items():
+        before = baseline.get(name)
+        if before is None or 'error' in metrics or 'error' in before:
+            continue
+        for key, label in COMPARED:
+            if before.get(key) and metrics[key] > before[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {label} {metrics[key]:.4g} vs {before[key]:.4g} "
+                    f"(x{metrics[key] / before[key]:.2f})"
+                )
+    return regressions
+
+
+def print_table(
+    results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]
+) -> None:
+    header = (
+        f"{'case':36} {'median s':>10} {'min s':>10} "
+        f"{'rss MB':>9} {'alloc MB':>9} {'bytes':>11}"
+    )
+    if baseline:
+        header += f" {'time vs base':>13}"
+    print(header)
+    for name, m in results.items():
+        if 'error' in m:
+            print(f"{name:36} error: {m['error']}")
+            continue
+        line = (
+            f"{name:36} {m['median_seconds']:10.4f} {m['min_seconds']:10.4f} "
+            f"{m['peak_rss_mb']:9.1f} {m['peak_alloc_mb']:9.1f} "
+            f"{m['response_bytes']:11d}"
+        )
+        before = (baseline or {}).get(name)
+        if before and before.get('median_seconds'):
+            line += f" {m['median_seconds'] / before['median_seconds']:12.2f}x"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from benchmarks.synthetic import DatasetSpec, write_csv
+
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '--cases', nargs='*', help='Case names (default: all); --list shows them'
+    )
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    parser.add_argument('--rows', type=int, default=defaults.rows)
+    parser.add_argument('--numeric', type=int, default=defaults.numeric)
+    parser.add_argument('--categorical', type=int, default=defaults.categorical)
+    parser.add_argument('--datetime', type=int, default=defaults.datetime)
+    parser.add_argument('--null-rate', type=float, default=defaults.null_rate)
+    parser.add_argument('--cardinality', type=int, default=defaults.cardinality)
+    parser.add_argument('--duplicate-rate', type=float, default=defaults.duplicate_rate)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.2,
+        help='Allowed relative slowdown or growth before a metric counts as a '
+        'regression',
+    )
+    parser.add_argument(
+        '--check', action='store_true', help='Exit with status 1 on regressions'
+    )
+    parser.add_argument('--output', type=Path, help='Write the results as JSON')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--csv', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.csv, Path.cwd(), args.repeat)))
+        return 0
+
+    from benchmarks.cases import CASES
+    if args.list:
+        for name, case in CASES.items():
+            print(f"{name:36} {case.description}")
+        return 0
+    names = args.cases or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    spec = DatasetSpec(
+        rows=args.rows,
+        numeric=args.numeric,
+        categorical=args.categorical,
+        datetime=args.datetime,
+        null_rate=args.null_rate,
+        cardinality=args.cardinality,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+    )
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = write_csv(spec, args.data_dir)
+    print(f"Dataset: {csv_path} ({csv_path.stat().st_size / 1024 ** 2:.1f} MB)")
+
+    results = {}
+    for name in names:
+        results[name] = spawn_case(name, csv_path, args.repeat)
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    baseline = None
+    if stored is not None:
+        if stored.get('spec') == spec.to_dict():
+            baseline = stored['results']
+        else:
+            print(
+                f"Baseline {args.baseline} was recorded for another dataset; "
+                "not comparing"
+            )
+    print_table(results, baseline)
+
+    report = {
+        'spec': spec.to_dict(),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        if stored is not None and stored.get('spec') == spec.to_dict():
+            # Keep baseline entries of cases that weren't run this time
+            report['results'] = {**stored['results'], **results}
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+
+    failed = [name for name, m in results.items() if 'error' in m]
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if args.check and (regressions or failed) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class DatasetSpec:
+    """Shape of a synthetic dataset"""
+    rows: int = 100_000
+    numeric: int = 8
+    categorical: int = 3
+    datetime: int = 1
+    null_rate: float = 0.02
+    # Distinct values per categorical column
+    cardinality: int = 50
+    # Share of rows that repeat an earlier row, for drop_duplicates
+    duplicate_rate: float = 0.01
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def generate(spec: DatasetSpec) -> pd.DataFrame:
+    """
+    Deterministic frame with a linear target so training has signal.
+    Columns: num_0.. (float, varied scales), cat_0.. (strings),
+    date_0.. (timestamps) and target.
+    """
+    rng = np.random.default_rng(spec.seed)
+    columns = {}
+    numeric = rng.normal(size=(spec.rows, spec.numeric)) * np.logspace(
+        0, 3, spec.numeric
+    )
+    for j in range(spec.numeric):
+        columns[f'num_{j}'] = numeric[:, j]
+    labels = np.array([f'value_{i}' for i in range(spec.cardinality)], dtype=object)
+    for j in range(spec.categorical):
+        # Zipf-like frequencies, as real categorical columns are rarely uniform
+        weights = 1.0 / np.arange(1, spec.cardinality + 1)
+        columns[f'cat_{j}'] = rng.choice(
+            labels, size=spec.rows, p=weights / weights.sum()
+        )
+    start = np.datetime64('2020-01-01T00:00:00')
+    for j in range(spec.datetime):
+        seconds = rng.integers(0, 4 * 365 * 24 * 3600, size=spec.rows)
+        columns[f'date_{j}'] = start + seconds.astype('timedelta64[s]')
+    df = pd.DataFrame(columns)
+
+    coefficients = rng.normal(size=spec.numeric) / np.logspace(0, 3, spec.numeric)
+    df['target'] = numeric @ coefficients + rng.normal(scale=0.1, size=spec.rows)
+
+    if spec.null_rate > 0:
+        for col in df.columns[:-1]:
+            mask = rng.random(spec.rows) < spec.null_rate
+            df.loc[mask, col] = None
+    if spec.duplicate_rate > 0 and spec.rows > 1:
+        count = int(spec.rows * spec.duplicate_rate)
+        targets = rng.choice(np.arange(1, spec.rows), size=count, replace=False)
+        sources = rng.integers(0, targets)
+        for col in df.columns:
+            values = df[col].to_numpy(copy=True)
+            values[targets] = values[sources]
+            df[col] = values
+    return df
+
+
+def write_csv(spec: DatasetSpec, directory: Path) -> Path:
+    """Write the dataset once per spec and return its path"""
+    name = '_'.join(f'{k}{v}' for k, v in spec.to_dict().items())
+    path = Path(directory) / f'synthetic_{name}.csv'
+    if not path.exists():
+        tmp_path = path.with_suffix('.tmp')
+        generate(spec).to_csv(tmp_path, index=False)
+        tmp_path.replace(path)
+    return path
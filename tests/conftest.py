@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import create_app
+
+
+def sample_frame(rows: int = 2000, seed: int = 0) -> pd.DataFrame:
+    """Mixed numeric, text and datetime columns with nulls and duplicate rows"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'a': rng.normal(50, 10, rows).round(1),
+        'b': rng.integers(0, 20, rows),
+        'c': rng.choice(['red', 'green', 'blue', 'amber'], rows),
+        'd': pd.date_range('2024-01-01', periods=rows, freq='h').astype(str),
+    })
+    df.loc[::17, 'a'] = np.nan
+    df.loc[::23, 'c'] = None
+    # Every tenth row appears twice
+    return pd.concat([df, df.iloc[::10]], ignore_index=True)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # create_app writes logs/ and instance/ to the working directory
+    monkeypatch.chdir(tmp_path)
+    app = create_app({
+        'TESTING': True,
+        'SECRET_KEY': 'test',
+        'DATASET_SPILL_DIR': tmp_path / 'spill',
+        'MODEL_DIR': tmp_path / 'models',
+        'COLUMNAR_CACHE_DIR': tmp_path / 'columnar',
+        'EXPORT_DIR': tmp_path / 'exports',
+    })
+    yield app
+    app.extensions['jobs'].shutdown()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """Upload a frame as CSV and return the response"""
+    def upload(df: pd.DataFrame, name: str = 'data.csv'):
+        body = io.BytesIO(df.to_csv(index=False).encode())
+        return client.post(
+            '/data/upload',
+            data={'file': (body, name)},
+            content_type='multipart/form-data',
+        )
+    return upload
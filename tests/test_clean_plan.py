@@ -0,0 +1,156 @@
+import pandas as pd
+import pytest
+
+from app.services.clean_plan import CleanPlan, filter_mask
+from app.utils.exceptions import ValidationError
+from tests.conftest import sample_frame
+
+
+def step(operation: str, **params):
+    return {'operation': operation, 'params': params}
+
+
+def run_in_order(df: pd.DataFrame, steps) -> pd.DataFrame:
+    """Each step as a plan of its own, so nothing is reordered or fused"""
+    for entry in steps:
+        df = CleanPlan([entry]).execute(df)
+    return df
+
+
+PLANS = [
+    # Filters on other columns move ahead of row-local column operations
+    [
+        step('fillna', columns=['a'], strategy='zero'),
+        step('clip', columns=['a'], method='bounds', lower=40, upper=60),
+        step('filter', column='b', op='>=', value=5),
+        step('drop_nulls', columns=['c']),
+    ],
+    # Filters reading a written column stay behind the write
+    [
+        step('fillna', columns=['a'], strategy='value', value=-1),
+        step('filter', column='a', op='<', value=0),
+    ],
+    # Aggregating operations see every row that reaches them
+    [
+        step('fillna', columns=['a'], strategy='median'),
+        step('clip', columns=['a'], method='iqr'),
+        step('filter', column='c', op='in', value=['red', 'blue']),
+        step('drop_duplicates'),
+    ],
+    # Dead writes are dropped with their column
+    [
+        step('cast', columns=['b'], dtype='str'),
+        step('fillna', columns=['c'], strategy='mode'),
+        step('drop_columns', columns=['b']),
+        step('filter', column='c', op='!=', value='amber'),
+    ],
+    [
+        step('drop_duplicates', columns=['b', 'c']),
+        step('cast', columns=['d'], dtype='datetime'),
+        step('filter', column='d', op='between',
+             value=['2024-01-10', '2024-02-01']),
+        step('cast', columns=['b'], dtype='float'),
+    ],
+]
+
+
+@pytest.mark.parametrize('steps', PLANS)
+def test_optimized_plan_matches_step_by_step(steps):
+    df = sample_frame()
+    expected = run_in_order(df, steps)
+    result = CleanPlan(steps).execute(df, chunk_rows=97)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_step_by_step_matches_pandas():
+    df = sample_frame()
+    steps = [
+        step('fillna', columns=['a'], strategy='zero'),
+        step('filter', column='b', op='>=', value=5),
+        step('drop_nulls', columns=['c']),
+        step('drop_duplicates'),
+    ]
+    expected = df.assign(a=df['a'].fillna(0))
+    expected = expected[expected['b'] >= 5].dropna(subset=['c']).drop_duplicates()
+    pd.testing.assert_frame_equal(CleanPlan(steps).execute(df), expected)
+    pd.testing.assert_frame_equal(run_in_order(df, steps), expected)
+
+
+def test_filters_move_ahead_of_row_local_operations():
+    steps = [
+        step('fillna', columns=['a'], strategy='zero'),
+        step('filter', column='b', op='>', value=3),
+    ]
+    stages = CleanPlan(steps).optimize(sample_frame().columns.tolist())
+    assert [s.kind for s in stages] == ['filter', 'column']
+
+
+def test_filter_not_moved_ahead_of_raising_cast():
+    df = pd.DataFrame({'a': [1.0, 2.5, 3.0], 'b': [1, 0, 1]})
+    steps = [
+        step('cast', columns=['a'], dtype='int'),
+        step('filter', column='b', op='==', value=1),
+    ]
+    stages = CleanPlan(steps).optimize(df.columns.tolist())
+    assert [s.kind for s in stages] == ['column', 'filter']
+    # Filtering first would hide the fractional value from the cast
+    with pytest.raises(ValidationError, match='fractional'):
+        CleanPlan(steps).execute(df)
+    with pytest.raises(ValidationError, match='fractional'):
+        run_in_order(df, steps)
+
+
+def test_filter_moves_ahead_of_coercing_cast():
+    steps = [
+        step('cast', columns=['c'], dtype='float', errors='coerce'),
+        step('filter', column='b', op='==', value=1),
+    ]
+    stages = CleanPlan(steps).optimize(sample_frame().columns.tolist())
+    assert [s.kind for s in stages] == ['filter', 'column']
+
+
+def test_category_cast_sees_every_row():
+    df = pd.DataFrame({'b': [1, 0, 0], 'c': ['x', 'y', 'z']})
+    steps = [
+        step('cast', columns=['c'], dtype='category'),
+        step('filter', column='b', op='==', value=0),
+    ]
+    result = CleanPlan(steps).execute(df)
+    assert result['c'].cat.categories.tolist() == ['x', 'y', 'z']
+    pd.testing.assert_frame_equal(result, run_in_order(df, steps))
+
+
+@pytest.mark.filterwarnings('ignore:Parsing dates')
+def test_datetime_cast_sees_every_row():
+    # The format is inferred from the first value: month first here
+    df = pd.DataFrame({'b': [1, 0], 'd': ['01/02/2024', '13/02/2024']})
+    steps = [
+        step('cast', columns=['d'], dtype='datetime', errors='coerce'),
+        step('filter', column='b', op='==', value=0),
+    ]
+    result = CleanPlan(steps).execute(df)
+    assert result['d'].isna().all()
+    pd.testing.assert_frame_equal(result, run_in_order(df, steps))
+
+
+def test_raising_cast_kept_when_its_column_is_dropped():
+    df = pd.DataFrame({'a': [1.0, 2.5], 'b': [1, 2]})
+    steps = [
+        step('cast', columns=['a'], dtype='int'),
+        step('drop_columns', columns=['a']),
+    ]
+    with pytest.raises(ValidationError, match='fractional'):
+        run_in_order(df, steps)
+    with pytest.raises(ValidationError, match='fractional'):
+        CleanPlan(steps).execute(df)
+    # A cast that can't fail is still dropped with its column
+    steps[0] = step('cast', columns=['a'], dtype='str')
+    assert [s.kind for s in CleanPlan(steps).optimize(['a', 'b'])] == ['project']
+
+
+def test_incomparable_filter_raises_validation_error():
+    df = sample_frame()
+    with pytest.raises(ValidationError, match='cannot apply'):
+        CleanPlan([step('filter', column='c', op='>', value=3)]).execute(df)
+    with pytest.raises(ValidationError, match='cannot apply'):
+        filter_mask(df, [{'column': 'c', 'op': '<', 'value': 3}])
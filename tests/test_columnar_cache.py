@@ -0,0 +1,53 @@
+import pandas as pd
+
+from app.services import columnar_cache as module
+from app.services.columnar_cache import ColumnarCache
+from tests.conftest import sample_frame
+
+
+def test_second_load_is_a_hit(tmp_path):
+    path = tmp_path / 'data.csv'
+    sample_frame().to_csv(path, index=False)
+    cache = ColumnarCache(cache_dir=tmp_path / 'cache')
+    calls = []
+
+    def reader(file_path):
+        calls.append(file_path)
+        return pd.read_csv(file_path)
+
+    first = cache.load(path, reader)
+    second = cache.load(path, reader)
+    assert calls == [path]
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Arrow reads missing text back as NaN, so compare the numeric columns
+    pd.testing.assert_frame_equal(first[['a', 'b']], second[['a', 'b']])
+    assert second['c'].isna().sum() == first['c'].isna().sum()
+
+
+def test_remembered_digest_skips_hashing(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('x\n1\n')
+    cache = ColumnarCache(cache_dir=tmp_path / 'cache')
+    cache.remember_digest(path, 'remembered')
+    assert cache.digest(path) == 'remembered'
+    # A rewritten file is hashed again
+    path.write_text('x\n1\n2\n')
+    assert cache.digest(path) != 'remembered'
+
+
+def test_digests_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'DIGEST_CACHE_SIZE', 3)
+    cache = ColumnarCache(cache_dir=tmp_path / 'cache')
+    paths = []
+    for i in range(5):
+        path = tmp_path / f'upload{i}.csv'
+        path.write_text(f'x\n{i}\n')
+        paths.append(path)
+        cache.digest(path)
+        if i == 2:
+            # Used again, so it outlives the older entries
+            cache.digest(paths[0])
+    assert len(cache._digests) == 3
+    assert [key[0] for key in cache._digests] == [
+        str(paths[0]), str(paths[3]), str(paths[4])
+    ]
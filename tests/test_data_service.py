@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+
+from app.services.data_service import DataService
+from app.utils.exceptions import ValidationError
+from tests.conftest import sample_frame
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'data.csv'
+    sample_frame().to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def service(csv_path):
+    service = DataService()
+    service.process_file(csv_path)
+    return service
+
+
+STEPS = [
+    {'operation': 'filter', 'params': {'column': 'b', 'op': '<', 'value': 15}},
+    {'operation': 'fillna', 'params': {'columns': ['a'], 'strategy': 'zero'}},
+    {'operation': 'drop_nulls', 'params': {'columns': ['c']}},
+    {'operation': 'drop_columns', 'params': {'columns': ['d']}},
+]
+
+
+def states(service: DataService):
+    """Frame after each step, run one clean request at a time"""
+    frames = [service.get_data().copy()]
+    for step in STEPS:
+        service.clean_data({'steps': [step]})
+        frames.append(service.get_data().copy())
+    return frames
+
+
+def test_undo_steps_back_through_each_state(service):
+    source = service.get_data().copy()
+    frames = states(service)
+    for expected in reversed(frames[:-1]):
+        service.undo()
+        pd.testing.assert_frame_equal(service.get_data(), expected)
+    with pytest.raises(ValidationError, match='Nothing to undo'):
+        service.undo()
+    # The source frame is never modified in place
+    pd.testing.assert_frame_equal(service.get_data(), source)
+
+
+def test_undo_one_step_of_a_combined_clean(service, csv_path):
+    eager = DataService()
+    eager.process_file(csv_path)
+    frames = states(eager)
+
+    # One request, but each step is logged and undone separately
+    service.clean_data({'steps': STEPS})
+    pd.testing.assert_frame_equal(service.get_data(), frames[-1])
+    assert len(service.clean_data({})['transformations']) == len(STEPS)
+    for expected in reversed(frames[:-1]):
+        service.undo()
+        pd.testing.assert_frame_equal(service.get_data(), expected)
+
+
+def test_redo_reapplies_undone_steps(service):
+    frames = states(service)
+    service.undo()
+    service.undo()
+    service.redo()
+    pd.testing.assert_frame_equal(service.get_data(), frames[-2])
+    service.redo()
+    pd.testing.assert_frame_equal(service.get_data(), frames[-1])
+    with pytest.raises(ValidationError, match='Nothing to redo'):
+        service.redo()
+
+
+def test_new_step_clears_redo(service):
+    states(service)
+    service.undo()
+    service.clean_data({'drop_duplicates': True})
+    with pytest.raises(ValidationError, match='Nothing to redo'):
+        service.redo()
+
+
+def test_reset_clears_history(service):
+    source = service.get_data()
+    states(service)
+    service.undo()
+    info = service.reset_data()
+    assert info['transformations'] == []
+    assert service.get_data() is source
+    with pytest.raises(ValidationError):
+        service.undo()
+    with pytest.raises(ValidationError):
+        service.redo()
+
+
+def test_history_does_not_share_caller_params(service):
+    params = {'columns': ['a'], 'strategy': 'zero'}
+    service.clean_data({'steps': [{'operation': 'fillna', 'params': params}]})
+    params['strategy'] = 'mean'
+    history = service.clean_data({})['transformations']
+    assert history == [{'operation': 'fillna', 'params': {
+        'columns': ['a'], 'strategy': 'zero'
+    }}]
+
+
+def test_adopted_source_shares_no_history(service):
+    other = DataService()
+    other.adopt_source(service)
+    assert other.get_data() is service.get_data()
+    assert other._fingerprints is not service._fingerprints
+    assert other._ingest_stats is not service._ingest_stats
+
+    other.clean_data({'drop_duplicates': True})
+    assert service.clean_data({})['transformations'] == []
+    with pytest.raises(ValidationError, match='Nothing to undo'):
+        service.undo()
+    # Hashes cached by one service are not visible to the other
+    other.duplicate_report()
+    assert service._fingerprints.nbytes == 0
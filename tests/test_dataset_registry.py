@@ -0,0 +1,131 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from app.services.dataset_registry import DatasetRegistry, valid_dataset_id
+from app.utils.exceptions import ValidationError
+from tests.conftest import sample_frame
+
+
+def load(registry: DatasetRegistry, path) -> str:
+    dataset_id = registry.create()
+    with registry.checkout(dataset_id) as dataset:
+        dataset.data_service.process_file(path)
+    return dataset_id
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'data.csv'
+    sample_frame().to_csv(path, index=False)
+    return path
+
+
+def test_spill_and_restore_round_trip(tmp_path, csv_path):
+    # A zero budget spills every dataset but the most recently used
+    registry = DatasetRegistry(memory_budget=0, spill_dir=tmp_path / 'spill')
+    first = load(registry, csv_path)
+    with registry.checkout(first) as dataset:
+        dataset.data_service.clean_data({'drop_duplicates': True})
+        expected = dataset.data_service.get_data().copy()
+        token = dataset.data_service.get_state_token()
+
+    load(registry, csv_path)
+    assert (tmp_path / 'spill' / f'{first}.pkl').exists()
+    assert registry.stats()['resident'] == 1
+
+    with registry.checkout(first) as dataset:
+        assert dataset.data_service.get_state_token() == token
+        pd.testing.assert_frame_equal(dataset.data_service.get_data(), expected)
+        # Undo history survives the round trip too
+        dataset.data_service.undo()
+        assert len(dataset.data_service.get_data()) > len(expected)
+
+
+def test_restore_in_another_registry(tmp_path, csv_path):
+    spill_dir = tmp_path / 'spill'
+    registry = DatasetRegistry(memory_budget=0, spill_dir=spill_dir)
+    first = load(registry, csv_path)
+    with registry.checkout(first) as dataset:
+        expected = dataset.data_service.get_data().copy()
+    load(registry, csv_path)
+
+    # Another worker process sees the spill file, not the entry
+    other = DatasetRegistry(spill_dir=spill_dir)
+    assert other.exists(first)
+    with other.checkout(first) as dataset:
+        pd.testing.assert_frame_equal(dataset.data_service.get_data(), expected)
+
+
+def test_remove_deletes_spill_file(tmp_path, csv_path):
+    registry = DatasetRegistry(memory_budget=0, spill_dir=tmp_path / 'spill')
+    first = load(registry, csv_path)
+    load(registry, csv_path)
+    removed = []
+    registry.on_remove(removed.append)
+
+    registry.remove(first)
+    assert not (tmp_path / 'spill' / f'{first}.pkl').exists()
+    assert not registry.exists(first)
+    assert removed == [first]
+    with pytest.raises(ValidationError):
+        with registry.checkout(first):
+            pass
+
+
+def test_expire_removes_idle_datasets(tmp_path, csv_path):
+    registry = DatasetRegistry(spill_dir=tmp_path / 'spill', ttl=0)
+    dataset_id = load(registry, csv_path)
+    assert registry.expire() == [dataset_id]
+    assert not registry.exists(dataset_id)
+
+
+@pytest.mark.parametrize('dataset_id', [
+    None,
+    '',
+    '../../etc/passwd',
+    'evil',
+    '0' * 31,
+    '0' * 33,
+    'A' * 32,
+    '0' * 31 + '\n',
+    12345,
+])
+def test_rejects_invalid_ids(tmp_path, dataset_id):
+    assert not valid_dataset_id(dataset_id)
+    registry = DatasetRegistry(spill_dir=tmp_path / 'spill')
+    assert not registry.exists(dataset_id)
+    with pytest.raises(ValidationError):
+        with registry.checkout(dataset_id):
+            pass
+    with pytest.raises(ValidationError):
+        registry.remove(dataset_id)
+
+
+def test_never_unpickles_files_under_forged_ids(tmp_path):
+    class Payload:
+        def __reduce__(self):
+            return (pytest.fail, ('forged spill file was unpickled',))
+
+    spill_dir = tmp_path / 'spill'
+    spill_dir.mkdir()
+    (spill_dir / 'evil.pkl').write_bytes(pickle.dumps(Payload()))
+    registry = DatasetRegistry(spill_dir=spill_dir)
+    assert not registry.exists('evil')
+    with pytest.raises(ValidationError):
+        with registry.checkout('evil'):
+            pass
+
+
+def test_created_ids_are_valid(tmp_path):
+    registry = DatasetRegistry(spill_dir=tmp_path / 'spill')
+    assert valid_dataset_id(registry.create())
+
+
+def test_forged_session_id_is_rejected(app, client, upload):
+    assert upload(sample_frame()).status_code == 200
+    with client.session_transaction() as session:
+        session['dataset_id'] = '../../tmp/evil'
+    response = client.get('/data/profile')
+    assert response.get_json() == {'error': 'No data loaded'}
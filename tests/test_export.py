@@ -0,0 +1,82 @@
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import export
+from app.services.export import ExportManager, iter_csv
+from tests.conftest import sample_frame
+
+
+@pytest.fixture
+def exports(tmp_path):
+    return ExportManager(directory=tmp_path / 'exports')
+
+
+def test_parquet_round_trip(exports):
+    df = sample_frame()
+    df['when'] = pd.to_datetime(df['d'])
+    df['kind'] = df['c'].astype('category')
+    path = exports.materialize(df, 'frame', 'parquet')
+    assert path.suffix == '.parquet'
+    pd.testing.assert_frame_equal(pd.read_parquet(path), df.reset_index(drop=True))
+
+
+def test_parquet_schema_comes_from_whole_frame(exports, monkeypatch):
+    monkeypatch.setattr(export, 'EXPORT_CHUNK_ROWS', 10)
+    # Null throughout the first row group only
+    df = pd.DataFrame({
+        'x': [None] * 10 + ['a', 'b', None, 'c'],
+        'y': [np.nan] * 10 + [1.5, 2.5, 3.5, np.nan],
+    })
+    path = exports.materialize(df, 'nulls', 'parquet')
+    pd.testing.assert_frame_equal(pd.read_parquet(path), df)
+
+
+def test_parquet_empty_frame(exports):
+    df = pd.DataFrame({'x': pd.Series([], dtype=np.int64)})
+    path = exports.materialize(df, 'empty', 'parquet')
+    pd.testing.assert_frame_equal(pd.read_parquet(path), df)
+
+
+def test_reuses_export_under_the_same_name(exports):
+    df = sample_frame()
+    path = exports.materialize(df, 'frame', 'parquet')
+    used = time.time() - 60
+    os.utime(path, (used, used))
+    # The frame isn't written again; the file is touched instead
+    assert exports.materialize(df.iloc[:5], 'frame', 'parquet') == path
+    assert len(pd.read_parquet(path)) == len(df)
+    assert path.stat().st_mtime > used
+
+
+def test_cleanup_removes_stale_exports(exports):
+    path = exports.materialize(sample_frame(), 'frame', 'parquet')
+    assert exports.cleanup() == 0
+    os.utime(path, (0, 0))
+    assert exports.cleanup() == 1
+    assert not path.exists()
+
+
+def test_csv_chunks_concatenate():
+    df = sample_frame()
+    text = ''.join(iter_csv(df, chunk_rows=300))
+    assert text == df.to_csv(index=False)
+
+
+def test_export_endpoint_follows_cleaning(app, client, upload):
+    df = sample_frame()
+    upload(df)
+    response = client.get('/data/export?format=parquet')
+    assert response.status_code == 200
+    assert len(pd.read_parquet(io.BytesIO(response.data))) == len(df)
+
+    client.post('/data/clean', json={'drop_duplicates': True})
+    response = client.get('/data/export?format=parquet')
+    cleaned = pd.read_parquet(io.BytesIO(response.data))
+    assert len(cleaned) == len(df.drop_duplicates())
+    # One file per data state
+    assert len(list((app.config['EXPORT_DIR']).glob('*.parquet'))) == 2
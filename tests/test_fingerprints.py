@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.services.clean_plan as clean_plan
+from app.services.clean_plan import CleanPlan
+from app.services.fingerprints import (
+    combine_hashes,
+    exact_codes,
+    group_rows,
+    hash_column,
+)
+from tests.conftest import sample_frame
+
+
+def frame_hashes(df: pd.DataFrame) -> np.ndarray:
+    return combine_hashes([hash_column(df[name]) for name in df.columns])
+
+
+def take_from(df: pd.DataFrame):
+    return lambda name, rows: df[name].iloc[rows]
+
+
+def test_groups_match_exact_codes_without_collisions():
+    df = sample_frame()[['b', 'c']]
+    calls = []
+
+    def exact():
+        calls.append(True)
+        return exact_codes(df)
+
+    codes, first, collisions = group_rows(
+        frame_hashes(df), list(df.columns), take_from(df), exact
+    )
+    assert collisions == 0
+    assert not calls
+    np.testing.assert_array_equal(codes, exact_codes(df))
+    np.testing.assert_array_equal(first, np.flatnonzero(~df.duplicated().to_numpy()))
+
+
+def test_hash_collisions_fall_back_to_exact_codes():
+    df = sample_frame()[['b', 'c']]
+    # Every row hashes into one of three buckets
+    hashes = frame_hashes(df) % np.uint64(3)
+    codes, first, collisions = group_rows(
+        hashes, list(df.columns), take_from(df), lambda: exact_codes(df)
+    )
+    assert collisions > 0
+    np.testing.assert_array_equal(codes, exact_codes(df))
+    np.testing.assert_array_equal(first, np.flatnonzero(~df.duplicated().to_numpy()))
+
+
+def test_equal_values_hash_equal():
+    series = pd.Series([0.0, -0.0, np.nan, np.nan, 1.5])
+    hashes = hash_column(series)
+    assert hashes[0] == hashes[1]
+    assert hashes[2] == hashes[3]
+
+
+@pytest.mark.parametrize('columns', [None, ['a'], ['b', 'c'], ['c', 'a']])
+def test_drop_duplicates_with_colliding_hashes(monkeypatch, columns):
+    df = sample_frame()
+    df.loc[::13, 'a'] = -0.0
+    df.loc[::19, 'a'] = 0.0
+    real = clean_plan.combine_hashes
+    monkeypatch.setattr(
+        clean_plan, 'combine_hashes', lambda arrays: real(arrays) % np.uint64(7)
+    )
+    params = {'columns': columns} if columns else {}
+    result = CleanPlan([{'operation': 'drop_duplicates', 'params': params}]).execute(df)
+    pd.testing.assert_frame_equal(result, df.drop_duplicates(columns))
@@ -0,0 +1,65 @@
+from tests.conftest import sample_frame
+
+
+def varies_on(response) -> set:
+    return {name.strip() for name in response.headers['Vary'].split(',')}
+
+
+def test_profile_not_modified_until_clean(client, upload):
+    upload(sample_frame())
+    response = client.get('/data/profile')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert {'Accept', 'Accept-Encoding'} <= varies_on(response)
+
+    cached = client.get('/data/profile', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+    assert {'Accept', 'Accept-Encoding'} <= varies_on(cached)
+
+    assert client.post('/data/clean', json={'drop_duplicates': True}).status_code == 200
+    stale = client.get('/data/profile', headers={'If-None-Match': etag})
+    assert stale.status_code == 200
+    assert stale.headers['ETag'] != etag
+    assert stale.get_json() != response.get_json()
+
+    # Undo returns to the old rows but not to the old ETag
+    client.post('/data/undo')
+    undone = client.get('/data/profile', headers={'If-None-Match': etag})
+    assert undone.status_code == 200
+    assert undone.headers['ETag'] not in (etag, stale.headers['ETag'])
+
+
+def test_visualize_not_modified_until_clean(client, upload):
+    upload(sample_frame())
+    url = '/data/visualize?type=histogram&x=a'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    # Another chart of the same data has its own ETag
+    other = '/data/visualize?type=histogram&x=b'
+    assert client.get(other, headers={'If-None-Match': etag}).status_code == 200
+
+    client.post('/data/clean', json={'drop_nulls': True})
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_reupload_changes_etag(client, upload):
+    upload(sample_frame())
+    etag = client.get('/data/profile').headers['ETag']
+    upload(sample_frame(seed=1))
+    assert client.get(
+        '/data/profile', headers={'If-None-Match': etag}
+    ).status_code == 200
+
+
+def test_etag_differs_by_representation(client, upload):
+    upload(sample_frame())
+    plain = client.get('/data/profile').headers['ETag']
+    gzipped = client.get('/data/profile', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers.get('Content-Encoding') == 'gzip'
+    assert gzipped.headers['ETag'] != plain
+    assert client.get(
+        '/data/profile',
+        headers={'If-None-Match': gzipped.headers['ETag'], 'Accept-Encoding': 'gzip'},
+    ).status_code == 304
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.clean_plan import CleanPlan, filter_mask
+from app.services.ingest import (
+    IngestStats,
+    combine_chunks,
+    downcast_chunk,
+    read_csv_chunked,
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 5_000
+    df = pd.DataFrame({
+        # First seen out of alphabetical order
+        'name': ['m', 'z'] + list(rng.choice(['a', 'b', 'm', 'z', None], rows - 2)),
+        'count': rng.integers(0, 100, rows),
+        'score': rng.random(rows).round(3),
+    })
+    path = tmp_path / 'data.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_downcast_keeps_values(csv_path):
+    df = pd.read_csv(csv_path)
+    small = downcast_chunk(df)
+    assert isinstance(small['name'].dtype, pd.CategoricalDtype)
+    assert small['count'].dtype == np.int32
+    pd.testing.assert_frame_equal(
+        small.astype({'name': object, 'count': np.int64}), df, check_dtype=False
+    )
+
+
+def test_chunked_read_matches_whole_read(csv_path):
+    whole = pd.read_csv(csv_path)
+    stats = IngestStats()
+    chunked = read_csv_chunked(csv_path, stats=stats, chunksize=700)
+    assert stats.chunks == 8
+    assert stats.rows == len(whole)
+    # Sorted categories, as a single chunk's astype('category') gives
+    assert chunked['name'].cat.categories.tolist() == ['a', 'b', 'm', 'z']
+    pd.testing.assert_series_equal(
+        chunked['name'].astype(object), whole['name'], check_names=False
+    )
+    np.testing.assert_array_equal(chunked['count'], whole['count'])
+
+
+def test_combine_chunks_sorts_categories():
+    chunks = [
+        pd.DataFrame({'x': pd.Series(['z', 'm'], dtype='category')}),
+        pd.DataFrame({'x': pd.Series(['b', 'a'], dtype='category')}),
+    ]
+    combined = combine_chunks(chunks)
+    assert combined['x'].cat.categories.tolist() == ['a', 'b', 'm', 'z']
+    assert combined['x'].tolist() == ['z', 'm', 'b', 'a']
+
+
+@pytest.mark.parametrize('params', [
+    {'column': 'name', 'op': '>', 'value': 'b'},
+    {'column': 'name', 'op': '<=', 'value': 'm'},
+    {'column': 'name', 'op': '!=', 'value': 'z'},
+    {'column': 'name', 'op': 'between', 'value': ['b', 'n']},
+    {'column': 'name', 'op': 'in', 'value': ['a', 'z']},
+])
+def test_filters_agree_across_ingest_paths(csv_path, params):
+    whole = pd.read_csv(csv_path)
+    chunked = read_csv_chunked(csv_path, chunksize=700)
+    np.testing.assert_array_equal(
+        filter_mask(chunked, [params]), filter_mask(whole, [params])
+    )
+    steps = [{'operation': 'filter', 'params': params}]
+    pd.testing.assert_index_equal(
+        CleanPlan(steps).execute(chunked).index, CleanPlan(steps).execute(whole).index
+    )
@@ -0,0 +1,178 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from app.services.columnar_cache import columnar_cache
+from app.services.data_service import DataService
+from app.services.job_queue import (
+    CANCELLED,
+    FAILED,
+    RUNNING,
+    SUCCEEDED,
+    JobCancelled,
+    JobQueue,
+    ThreadPoolBackend,
+)
+from app.utils.exceptions import ValidationError
+from tests.conftest import sample_frame
+
+TIMEOUT = 10
+
+
+@pytest.fixture
+def jobs():
+    jobs = JobQueue(backend=ThreadPoolBackend(max_workers=1))
+    yield jobs
+    jobs.shutdown()
+
+
+def wait_for(condition) -> None:
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_reports_progress_and_result(jobs):
+    release = threading.Event()
+
+    def work(job, rows):
+        job.report(rows_parsed=rows // 2)
+        release.wait(TIMEOUT)
+        job.report(rows_parsed=rows)
+        return {'rows': rows}
+
+    job = jobs.submit('upload', work, 10, owner='a')
+    wait_for(lambda: job.progress.get('rows_parsed') == 5)
+    assert job.to_dict()['status'] == RUNNING
+    assert 'result' not in job.to_dict()
+
+    release.set()
+    job.future.result(TIMEOUT)
+    data = jobs.get(job.id, owner='a').to_dict()
+    assert data['status'] == SUCCEEDED
+    assert data['progress'] == {'rows_parsed': 10}
+    assert data['result'] == {'rows': 10}
+
+
+def test_cancels_running_job_at_next_checkpoint(jobs):
+    started, release = threading.Event(), threading.Event()
+    checkpoints = []
+
+    def work(job):
+        started.set()
+        release.wait(TIMEOUT)
+        job.report(step=1)
+        checkpoints.append(1)
+
+    job = jobs.submit('clean', work)
+    started.wait(TIMEOUT)
+    jobs.cancel(job.id)
+    assert job.status == RUNNING
+    release.set()
+    job.future.result(TIMEOUT)
+    assert job.status == CANCELLED
+    assert checkpoints == []
+
+
+def test_cancels_queued_job_before_it_runs(jobs):
+    release = threading.Event()
+    ran = []
+    blocker = jobs.submit('train', lambda job: release.wait(TIMEOUT))
+    queued = jobs.submit('train', lambda job: ran.append(True))
+    assert jobs.cancel(queued.id).status == CANCELLED
+    release.set()
+    blocker.future.result(TIMEOUT)
+    assert ran == []
+    assert jobs.stats()[CANCELLED] == 1
+
+
+def test_records_failures(jobs):
+    def work(job):
+        raise ValueError('bad input')
+
+    job = jobs.submit('clean', work)
+    wait_for(lambda: job.status == FAILED)
+    assert job.to_dict()['error'] == 'bad input'
+
+
+def test_jobs_are_private_to_their_owner(jobs):
+    job = jobs.submit('clean', lambda job: None, owner='a')
+    with pytest.raises(ValidationError):
+        jobs.get(job.id, owner='b')
+    with pytest.raises(ValidationError):
+        jobs.cancel(job.id)
+
+
+def test_forgets_finished_jobs_after_ttl():
+    jobs = JobQueue(ttl=0)
+    job = jobs.submit('clean', lambda job: None)
+    job.future.result(TIMEOUT)
+    wait_for(lambda: job.finished_at is not None)
+    jobs.submit('clean', lambda job: None)
+    with pytest.raises(ValidationError):
+        jobs.get(job.id)
+    jobs.shutdown()
+
+
+def cancel(**progress):
+    raise JobCancelled('cancelled')
+
+
+@pytest.fixture
+def loaded(tmp_path, monkeypatch):
+    """A service with a cleaned upload, and a second file to upload over it"""
+    monkeypatch.setattr(columnar_cache, '_cache_dir', tmp_path / 'cache')
+    first, second = tmp_path / 'first.csv', tmp_path / 'second.csv'
+    sample_frame(seed=0).to_csv(first, index=False)
+    sample_frame(rows=500, seed=1).to_csv(second, index=False)
+    service = DataService()
+    service.process_file(first)
+    service.clean_data({'drop_duplicates': True})
+    return service, second
+
+
+def assert_unchanged(service: DataService, before: pd.DataFrame, token: str):
+    assert service.get_file_path().name == 'first.csv'
+    assert service.get_state_token() == token
+    pd.testing.assert_frame_equal(service.get_data(), before)
+    service.undo()
+    assert len(service.get_data()) > len(before)
+
+
+def test_cancelled_parse_keeps_previous_data(loaded):
+    service, second = loaded
+    before, token = service.get_data(), service.get_state_token()
+    with pytest.raises(JobCancelled):
+        service.process_file(second, progress=cancel)
+    assert_unchanged(service, before, token)
+
+
+def test_cancelled_cache_hit_keeps_previous_data(loaded):
+    service, second = loaded
+    # Parsed once, so the next upload of the file is a cache hit
+    DataService().process_file(second)
+    before, token = service.get_data(), service.get_state_token()
+    with pytest.raises(JobCancelled):
+        service.process_file(second, progress=cancel)
+    assert_unchanged(service, before, token)
+
+
+def test_async_upload(client):
+    response = client.post(
+        '/data/upload?async=true&filename=data.csv',
+        data=sample_frame().to_csv(index=False).encode(),
+    )
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+    wait_for(
+        lambda: client.get(status_url).get_json()['status'] not in ('queued', 'running')
+    )
+    job = client.get(status_url).get_json()
+    assert job['status'] == SUCCEEDED
+    assert job['result']['shape'] == list(sample_frame().shape)
+    # The export format defaults to the type of the completed upload
+    assert client.get('/data/export').mimetype == 'text/csv'
+    assert client.get('/jobs/unknown').status_code == 404
@@ -0,0 +1,36 @@
+import pstats
+from pathlib import Path
+
+from app import create_app
+from tests.conftest import sample_frame
+
+
+def test_metrics_report_aggregates(client, upload):
+    upload(sample_frame())
+    with client.session_transaction() as session:
+        dataset_id = session['dataset_id']
+    client.get('/data/profile')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'yugen_dataset_memory_bytes ' in text
+    assert 'yugen_datasets{state="resident"} 1' in text
+    assert 'yugen_request_seconds' in text
+    # Dataset ids are session keys, never labels
+    assert dataset_id not in text
+
+
+def test_profiles_default_to_the_instance_folder(app):
+    app = create_app({'MODEL_DIR': app.config['MODEL_DIR']})
+    assert app.config['PROFILE_DIR'] == Path(app.instance_path) / 'profiles'
+    app.extensions['jobs'].shutdown()
+
+
+def test_profiler_writes_stats(app, client, tmp_path):
+    app.config['PROFILER_ENABLED'] = True
+    app.config['PROFILE_DIR'] = tmp_path / 'profiles'
+    response = client.get('/metrics', headers={'X-Profile': '1'})
+    name = response.headers['X-Profile-File']
+    path = Path(app.config['PROFILE_DIR']) / name
+    assert pstats.Stats(str(path)).total_calls > 0
+    assert client.get('/metrics').headers.get('X-Profile-File') is None
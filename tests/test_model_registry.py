@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from app.services.model_registry import ModelRegistry, PredictionBatcher
+from app.utils.exceptions import DataProcessingError, ValidationError
+
+TIMEOUT = 10
+OWNER = 'a' * 32
+
+
+@pytest.fixture
+def trained():
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 3))
+    y = X @ np.array([1.0, -2.0, 0.5]) + 3
+    model = LinearRegression().fit(X, y)
+    results = {
+        'model_type': 'linear_regression',
+        'feature_columns': ['x0', 'x1', 'x2'],
+        'target_column': 'y',
+    }
+    means = {'x0': 0.5, 'x1': 0.25, 'x2': 0.75}
+    return model, results, means
+
+
+def test_register_and_predict(tmp_path, trained):
+    model, results, means = trained
+    registry = ModelRegistry(directory=tmp_path)
+    model_id = registry.register(model, results, means, owner=OWNER)
+    X = np.array([[0.1, 0.2, 0.3], [np.nan, 0.5, np.nan]])
+    # Missing inputs are filled with the training means
+    expected = model.predict(np.array([[0.1, 0.2, 0.3], [0.5, 0.5, 0.75]]))
+    np.testing.assert_allclose(registry.predict(model_id, X), expected)
+
+    metadata = registry.get_metadata(model_id, owner=OWNER)
+    assert metadata['version'] == 1
+    assert metadata['feature_columns'] == results['feature_columns']
+    assert [m['id'] for m in registry.list(OWNER)] == [model_id]
+    assert 'results' not in registry.list(OWNER)[0]
+
+
+def test_models_persist_across_registries(tmp_path, trained):
+    model, results, means = trained
+    first = ModelRegistry(directory=tmp_path)
+    model_id = first.register(model, results, means, owner=OWNER)
+    second_id = first.register(model, results, means, owner=OWNER)
+
+    registry = ModelRegistry(directory=tmp_path)
+    assert [m['id'] for m in registry.list(OWNER)] == [second_id, model_id]
+    assert registry.get_metadata(second_id, owner=OWNER)['version'] == 2
+    X = np.ones((4, 3))
+    np.testing.assert_allclose(registry.predict(model_id, X), model.predict(X))
+
+
+def test_models_are_private_to_their_dataset(tmp_path, trained):
+    registry = ModelRegistry(directory=tmp_path)
+    model_id = registry.register(*trained, owner=OWNER)
+    with pytest.raises(ValidationError):
+        registry.get_metadata(model_id, owner='b' * 32)
+    with pytest.raises(ValidationError):
+        registry.get_metadata(model_id)
+    assert registry.list('b' * 32) == []
+
+
+def test_remove_owner_deletes_artifacts(tmp_path, trained):
+    registry = ModelRegistry(directory=tmp_path)
+    model_id = registry.register(*trained, owner=OWNER)
+    other_id = registry.register(*trained, owner='b' * 32)
+    assert registry.remove_owner(OWNER) == 1
+    assert not list(tmp_path.glob(f'{model_id}.*'))
+    assert registry.list(OWNER) == []
+    with pytest.raises(ValidationError):
+        registry.predict(model_id, np.ones((1, 3)))
+    assert registry.list('b' * 32)[0]['id'] == other_id
+
+
+def test_unused_models_expire(tmp_path, trained):
+    registry = ModelRegistry(directory=tmp_path, ttl=3600)
+    model_id = registry.register(*trained, owner=OWNER)
+    used_id = registry.register(*trained, owner=OWNER)
+    stale = time.time() - 7200
+    for path in tmp_path.glob('*.json'):
+        os.utime(path, (stale, stale))
+    # Predicting counts as use
+    registry.predict(used_id, np.ones((1, 3)))
+    registry = ModelRegistry(directory=tmp_path, ttl=3600)
+    assert [m['id'] for m in registry.list(OWNER)] == [used_id]
+    assert not list(tmp_path.glob(f'{model_id}.*'))
+
+
+def test_missing_artifact_is_not_found(tmp_path, trained):
+    registry = ModelRegistry(directory=tmp_path)
+    model_id = registry.register(*trained, owner=OWNER)
+    (tmp_path / f'{model_id}.joblib').unlink()
+    with pytest.raises(ValidationError):
+        registry.predict(model_id, np.ones((1, 3)))
+
+
+class GatedModel:
+    """Sums the features; the first predict call waits until released"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def predict(self, X):
+        self.batches.append(len(X))
+        if len(self.batches) == 1:
+            self.release.wait(TIMEOUT)
+        return X.sum(axis=1)
+
+
+def test_concurrent_requests_are_scored_together():
+    model = GatedModel()
+    batcher = PredictionBatcher(model, np.zeros(2))
+    inputs = [np.full((i + 1, 2), float(i)) for i in range(5)]
+    results = {}
+
+    def score(i):
+        results[i] = batcher.predict(inputs[i])
+
+    threads = [threading.Thread(target=score, args=(i,)) for i in range(5)]
+    threads[0].start()
+    while not model.batches:
+        time.sleep(0.001)
+    # The others queue while the first request is being scored
+    for thread in threads[1:]:
+        thread.start()
+    while len(batcher._pending) < 4:
+        time.sleep(0.001)
+    model.release.set()
+    for thread in threads:
+        thread.join(TIMEOUT)
+
+    assert model.batches == [1, 2 + 3 + 4 + 5]
+    for i, X in enumerate(inputs):
+        np.testing.assert_array_equal(results[i], X.sum(axis=1))
+
+
+def test_batches_are_split_at_max_rows():
+    batcher = PredictionBatcher(GatedModel(), np.zeros(2), max_rows=4)
+    batcher._pending = [(np.ones((3, 2)), None), (np.ones((3, 2)), None)]
+    assert len(batcher._take_batch()) == 1
+    assert len(batcher._take_batch()) == 1
+    assert batcher._take_batch() == []
+
+
+def test_failed_batch_fails_every_request():
+    class Broken:
+        def predict(self, X):
+            raise ValueError('boom')
+
+    batcher = PredictionBatcher(Broken(), np.zeros(2))
+    with pytest.raises(DataProcessingError, match='boom'):
+        batcher.predict(np.ones((2, 2)))
+
+
+def test_train_and_predict_endpoints(app, client, upload):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((300, 2)), columns=['x0', 'x1'])
+    df['y'] = 2 * df['x0'] - df['x1']
+    upload(df)
+    response = client.post('/modeling', json={
+        'feature_columns': ['x0', 'x1'], 'target_column': 'y', 'test_size': 0.2
+    })
+    assert response.status_code == 200
+    model_id = response.get_json()['model_id']
+    assert (Path(app.config['MODEL_DIR']) / f'{model_id}.joblib').exists()
+    assert [m['id'] for m in client.get('/models').get_json()['models']] == [model_id]
+
+    response = client.post(
+        f'/models/{model_id}/predict', json={'rows': [[1.0, 1.0], [0.5, None]]}
+    )
+    assert response.status_code == 200
+    predictions = response.get_json()['predictions']
+    assert predictions[0] == pytest.approx(1.0)
+    assert predictions[1] == pytest.approx(1.0 - df['x1'].mean(), abs=0.05)
+
+    # Another session can't see or use the model
+    other = app.test_client()
+    assert other.get('/models').get_json()['models'] == []
+    assert other.get(f'/models/{model_id}').status_code == 404
+    assert other.post(
+        f'/models/{model_id}/predict', json={'rows': [[1.0, 1.0]]}
+    ).status_code == 404
+
+
+def test_reused_fit_is_registered_again(app, client, upload):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((300, 2)), columns=['x0', 'x1'])
+    df['y'] = df['x0'] + df['x1']
+    upload(df)
+    with client.session_transaction() as session:
+        dataset_id = session['dataset_id']
+    request = {'feature_columns': ['x0', 'x1'], 'target_column': 'y', 'test_size': 0.2}
+    first_id = client.post('/modeling', json=request).get_json()['model_id']
+    app.extensions['models'].remove_owner(dataset_id)
+
+    second_id = client.post('/modeling', json=request).get_json()['model_id']
+    assert second_id != first_id
+    response = client.post(f'/models/{second_id}/predict', json={'rows': [[1.0, 1.0]]})
+    assert response.status_code == 200
+    # The model service's cached results never carry a registry id
+    with app.extensions['datasets'].checkout(dataset_id) as dataset:
+        assert 'model_id' not in dataset.model_service.get_training_results()
@@ -0,0 +1,132 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.data_service import DataService
+from app.services.row_browser import filter_permutation, sort_permutation
+from app.utils.exceptions import ValidationError
+from tests.conftest import sample_frame
+
+
+def expected_order(series: pd.Series, descending: bool) -> list:
+    """Stable sort of the values as objects, missing values last"""
+    values = series.astype(object).reset_index(drop=True)
+    present = values[values.notna()]
+    order = present.sort_values(ascending=not descending, kind='stable').index
+    return list(order) + list(values.index[values.isna()])
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('series', [
+    pd.Series([3.0, None, 1.0, 3.0, 2.0, None]),
+    pd.Series(['m', 'z', None, 'a', 'b', 'a']),
+    # Categories in first-seen order, not value order
+    pd.Series(pd.Categorical(
+        ['m', 'z', None, 'a', 'b', 'a'], categories=['m', 'z', 'a', 'b']
+    )),
+])
+def test_sort_permutation(series, descending):
+    assert sort_permutation(series, descending).tolist() == expected_order(
+        series, descending
+    )
+
+
+def test_filter_permutation_matches_a_new_sort():
+    rng = np.random.default_rng(0)
+    series = pd.Series(rng.integers(0, 50, 1000))
+    mask = rng.random(1000) < 0.3
+    permutation = filter_permutation(sort_permutation(series), mask)
+    np.testing.assert_array_equal(
+        permutation, sort_permutation(series[mask].reset_index(drop=True))
+    )
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = tmp_path / 'data.csv'
+    sample_frame().to_csv(path, index=False)
+    service = DataService()
+    service.process_file(path)
+    return service
+
+
+def read_all(service: DataService, limit: int, **kwargs) -> pd.DataFrame:
+    """Every page of a view, following the keyset cursor"""
+    pages, after = [], None
+    while True:
+        page = service.get_rows(limit=limit, after=after, raw=True, **kwargs)
+        pages.append(page['data'])
+        after = page['next_after']
+        if after is None:
+            return pd.concat(pages)
+
+
+def test_offset_pages_cover_the_frame(service):
+    df = service.get_data()
+    first = service.get_rows(offset=0, limit=100, raw=True)
+    last = service.get_rows(offset=len(df) - 30, limit=100, raw=True)
+    assert first['total_rows'] == len(df)
+    pd.testing.assert_frame_equal(first['data'], df.iloc[:100])
+    pd.testing.assert_frame_equal(last['data'], df.iloc[-30:])
+    assert last['next_after'] is None
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('column', ['a', 'c'])
+def test_sorted_filtered_pages(service, column, descending):
+    df = service.get_data()
+    filters = [{'column': 'b', 'op': '<', 'value': 10}]
+    pages = read_all(
+        service, 97, sort=column, descending=descending, filters=filters
+    )
+    kept = df[df['b'] < 10]
+    expected = kept.iloc[expected_order(kept[column], descending)]
+    pd.testing.assert_frame_equal(pages, expected)
+
+
+def test_sort_follows_cleaning(service):
+    service.get_rows(sort='a', limit=10)
+    service.clean_data({'drop_duplicates': True})
+    df = service.get_data()
+    pages = read_all(service, 250, sort='a', descending=True)
+    pd.testing.assert_frame_equal(pages, df.iloc[expected_order(df['a'], True)])
+    # A column operation rewrites the values the sort reads
+    service.clean_data({'steps': [
+        {'operation': 'fillna', 'params': {'columns': ['a'], 'strategy': 'zero'}}
+    ]})
+    df = service.get_data()
+    pages = read_all(service, 250, sort='a')
+    pd.testing.assert_frame_equal(pages, df.iloc[expected_order(df['a'], False)])
+
+
+def test_rejects_bad_requests(service):
+    with pytest.raises(ValidationError):
+        service.get_rows(limit=0)
+    with pytest.raises(ValidationError):
+        service.get_rows(sort='missing')
+    with pytest.raises(ValidationError):
+        service.get_rows(columns=['missing'])
+    with pytest.raises(ValidationError):
+        service.get_rows(after=10**9)
+
+
+def test_rows_endpoint(client, upload):
+    upload(sample_frame())
+    filters = json.dumps([{'column': 'c', 'op': '==', 'value': 'red'}])
+    response = client.get(
+        f'/data/rows?sort=a&order=desc&limit=5&columns=a,c&filters={filters}'
+    )
+    assert response.status_code == 200
+    page = response.get_json()
+    assert page['columns'] == ['a', 'c']
+    assert len(page['index']) == 5
+    follow = client.get(
+        f"/data/rows?sort=a&order=desc&limit=5&filters={filters}"
+        f"&after={page['next_after']}"
+    ).get_json()
+    assert follow['offset'] == 5
+    assert set(follow['index']).isdisjoint(page['index'])
+    assert client.get('/data/rows?order=sideways').status_code == 400
+    assert client.get('/data/rows?filters=nope').status_code == 400
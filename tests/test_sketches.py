@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.sketches import (
+    FrequentItems,
+    HyperLogLog,
+    ProfileSketch,
+    TDigest,
+    hash_values,
+)
+
+
+@pytest.mark.parametrize('distinct', [10, 1_000, 200_000])
+def test_distinct_count_within_error_bound(distinct):
+    values = pd.Series(np.arange(distinct)).sample(frac=1.0, random_state=0)
+    sketch = HyperLogLog().update(hash_values(values))
+    # Four standard errors; small counts are exact under linear counting
+    assert abs(sketch.estimate() - distinct) <= 4 * sketch.relative_error * distinct
+
+
+def test_distinct_count_merges():
+    values = pd.Series(np.arange(100_000))
+    merged = HyperLogLog().update(hash_values(values[:60_000]))
+    merged.merge(HyperLogLog().update(hash_values(values[40_000:])))
+    whole = HyperLogLog().update(hash_values(values))
+    assert merged.estimate() == whole.estimate()
+
+
+def test_quantiles_within_rank_error():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(0, 1, 200_000)
+    digest = TDigest()
+    for chunk in np.array_split(values, 7):
+        digest.merge(TDigest().update(chunk))
+    qs = np.array([0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+    estimates = digest.quantiles(qs)
+    # Rank of each estimate among the values, against the requested rank
+    ranks = np.searchsorted(np.sort(values), estimates) / len(values)
+    assert np.all(np.abs(ranks - qs) <= digest.rank_error)
+    assert digest.count == len(values)
+    assert digest.quantiles([0.0, 1.0]).tolist() == [values.min(), values.max()]
+
+
+def test_frequent_items_undershoot_by_at_most_max_error():
+    rng = np.random.default_rng(0)
+    # Zipf-like: a few heavy values in a long tail
+    values = pd.Series(rng.zipf(1.5, 100_000) % 5_000).astype(str)
+    sketch = FrequentItems(capacity=50)
+    for start in range(0, len(values), 11_000):
+        chunk = values.iloc[start:start + 11_000]
+        sketch.merge(FrequentItems(capacity=50).update(chunk))
+    exact = values.value_counts()
+    top = sketch.top()
+    assert sketch.total == len(values)
+    assert sketch.max_error > 0
+    for value, count in top.items():
+        assert exact[value] - sketch.max_error <= count <= exact[value]
+    # Any value more frequent than the error bound is reported
+    for value in exact[exact > sketch.max_error].index:
+        assert value in top
+
+
+def test_profile_sketch_merges_exact_moments():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'x': rng.normal(10, 3, 50_000),
+        'y': rng.choice(['a', 'b', 'c'], 50_000),
+    })
+    df.loc[::11, 'x'] = np.nan
+    sketch = ProfileSketch()
+    for start in range(0, len(df), 7_000):
+        sketch.merge(ProfileSketch().update(df.iloc[start:start + 7_000]))
+    assert sketch.is_consistent()
+    summary = sketch.summarize(['x'], ['y'])
+    numeric = summary['numeric_summary']['x']
+    assert sketch.rows == len(df)
+    assert numeric['count'] == df['x'].count()
+    assert numeric['mean'] == pytest.approx(df['x'].mean())
+    assert numeric['std'] == pytest.approx(df['x'].std())
+    assert numeric['min'] == df['x'].min()
+    assert numeric['max'] == df['x'].max()
+    assert summary['categorical_summary']['y'] == df['y'].value_counts().to_dict()
+    assert summary['distinct']['y'] == 3
+    error = summary['error_bounds']['distinct_relative_std']
+    assert summary['distinct']['x'] == pytest.approx(df['x'].nunique(), rel=4 * error)
+
+
+def test_profile_sketch_flags_mixed_column_types():
+    sketch = ProfileSketch().update(pd.DataFrame({'x': [1, 2, 3]}))
+    sketch.merge(ProfileSketch().update(pd.DataFrame({'x': ['a', 'b']})))
+    assert not sketch.is_consistent()
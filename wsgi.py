@@ -1,7 +1,7 @@
-from app import create_app
-import webbrowser
-import time
 import os
+import webbrowser
+
+from app import create_app
 
 app = create_app()
 